@@ -12,9 +12,9 @@ from scc_dlm_conf import *
 from scc_layout_model import *
 from scc_dlm_model import *
 from scc_dlm_api import *
+from scc_config_loader import *
 from mqtt_client import *
 from scc_log import *
-import pandas as pd
 import sys
 import time
 from os import path
@@ -69,37 +69,9 @@ if __name__ == '__main__':
     scc_api = SccAPI()
     db_conn = scc_api.connect_database(dlm_cfg)
 
-    '''Read section connection info'''
-    section_conn_conf = SectionConfig()
-    section_conn_conf_data = section_conn_conf.read_cfg(
-        '../config/yard_config.conf')
-
-    yard_data = section_conn_conf_data['YARDS']
-    Log.logger.info(yard_data)
-    yard_data_len = len(yard_data)
-
-    for yard_idx in range(len(yard_data)):
-        for dpu_idx in range(len(yard_data[yard_idx]['DPU'])):
-            for section_idx in range(len(yard_data[yard_idx]['DPU'][dpu_idx]['SECTIONS'])):
-                yard_id = yard_data[yard_idx]['YARD_ID']
-                yard_name = yard_data[yard_idx]['YARD_NAME']
-
-                dpu_id = yard_data[yard_idx]['DPU'][dpu_idx]['DPU_ID']
-                dpu_name = yard_data[yard_idx]['DPU'][dpu_idx]['DPU_NAME']
-
-                section_id = yard_data[yard_idx]['DPU'][dpu_idx]['SECTIONS'][section_idx]['SECTION_ID']
-                section_name = yard_data[yard_idx]['DPU'][dpu_idx]['SECTIONS'][section_idx]['SECTION_NAME']
-               
-                dp_id = yard_data[yard_idx]['DPU'][dpu_idx]['SECTIONS'][section_idx]['DPS']
-                Log.logger.info(f'dp_id : {dp_id}')
-
-                yard_config_table = YardConfigInfo()
-                yard_config_table.yard_id = yard_id
-                yard_config_table.yard_name = yard_name
-                yard_config_table.dpu_id = dpu_id
-                yard_config_table.dpu_name = dpu_name
-                yard_config_table.section_id = section_id
-                yard_config_table.section_name = section_name
-                yard_config_table.dp_id = dp_id
-
-                yard_config_table.save()
+    '''Read yard configuration'''
+    try: #yard_config is changed only where yard_config.conf differs, in one transaction
+        load_conf_files(scc_api, yard_config_file='../config/yard_config.conf', scc_cfg=dlm_cfg) #running SCC is notified of changes
+    except Exception as ex:
+        Log.logger.critical(f'insert_yard_config: yard_config.conf not loaded, yard_config not changed: {ex}')
+        sys.exit(1)
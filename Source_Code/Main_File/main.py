@@ -11,12 +11,22 @@
 from scc_dlm_conf import *
 from scc_dlm_model import *
 from scc_dlm_api import *
+from scc_persistence import *
+from scc_delta_publish import *
+from scc_role_cache import *
+from scc_partition import *
+from scc_playback import *
+from scc_snapshot import *
+from scc_shard import *
+from scc_dispatch import *
+from scc_lanes import *
+from scc_metrics import *
+from scc_section_frame import *
 from common.mqtt_client import *
 from common.scc_log import *
 #from scc_trail_through import *
 from trail_through import *
 
-import pandas as pd
 import sys
 import time
 from os import path
@@ -34,6 +44,10 @@ TOTAL_DP = 3 #total number of dp
 
 
 class Point:
+    __slots__ = ("point_id", "point_status", "point_mode", "error_code", "section_id",
+                 "point_status_request", "last_pms_send_msg_ts", "last_pmm_recv_msg_ts",
+                 "username", "point_ip_address", "ts") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.point_id = "none"
         self.point_status = "none"
@@ -45,6 +59,7 @@ class Point:
         self.last_pmm_recv_msg_ts = 0.0
         self.username = "none"
         self.point_ip_address = "0.0.0.0"
+        self.ts = 0.0 #ts of last pms/point_info message
 
 
 class SectionConfig: #repeated from insert_conf.py to read and print configuration file
@@ -89,6 +104,14 @@ class Yard:
 
 
 class Section: #class initialising section variables.
+    __slots__ = ("yard_id", "yard_name", "dpu_id", "dpu_name", "section_id", "section_name",
+                 "section_status", "direction", "speed", "engine_axle_count", "torpedo_axle_count",
+                 "torpedo_status", "first_axle", "left_normal_section_id",
+                 "right_normal_section_id", "left_reverse_section_id", "right_reverse_section_id",
+                 "torpedo_id", "engine_id", "prev_axle_count", "error_code", "my_idx",
+                 "left_normal_section_status", "right_normal_section_status",
+                 "left_reverse_section_status", "right_reverse_section_status", "dp_id") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.yard_id = 0
         self.yard_name = "none"
@@ -118,28 +141,103 @@ class Section: #class initialising section variables.
         self.right_reverse_section_status = "none"
         self.dp_id = []
 
+
+class SectionRegistry: #section_id -> Section object, keeps yard_config insertion order for publishing
+    '''section objects indexed by section id'''
+
+    def __init__(self):
+        self.section_dict = {}
+
+    def add(self, section_obj): #add or replace section object of section_obj.section_id
+        self.section_dict[section_obj.section_id] = section_obj
+
+    def get(self, section_id): #section object of section_id, None if unknown
+        return self.section_dict.get(section_id)
+
+    def __contains__(self, section_id):
+        return section_id in self.section_dict
+
+    def __iter__(self): #iterate section objects in insertion order
+        return iter(self.section_dict.values())
+
+    def __len__(self):
+        return len(self.section_dict)
+
+
+class PointRegistry: #point_id -> Point object, keeps pms_config insertion order
+    '''point objects indexed by point id'''
+
+    def __init__(self):
+        self.point_dict = {}
+
+    def add(self, point_obj): #add or replace point object of point_obj.point_id
+        self.point_dict[point_obj.point_id] = point_obj
+
+    def get(self, point_id): #point object of point_id, None if unknown
+        return self.point_dict.get(point_id)
+
+    def update(self, point_info): #O(1) update from pms/point_info message, returns False for unknown point
+        point_obj = self.point_dict.get(point_info["point_id"])
+        if point_obj is None:
+            return False
+        point_obj.point_status = point_info["point_status"]
+        point_obj.point_mode = point_info["point_mode"]
+        point_obj.error_code = point_info["error_code"]
+        point_obj.ts = point_info["ts"]
+        return True
+
+    def __contains__(self, point_id):
+        return point_id in self.point_dict
+
+    def __iter__(self): #iterate point objects in insertion order
+        return iter(self.point_dict.values())
+
+    def __len__(self):
+        return len(self.point_dict)
+
+
 class Sccserver:
-    def __init__(self, mqtt_client):
+    def __init__(self, mqtt_client, persistence_queue=None, delta_publisher=None, role_cache=None, snapshot_serializer=None,
+                 forward_section_info=True, lanes_cfg=None, metrics=None, trail_through_cfg=None):
         try:
             self.scc_api = SccAPI() #initialising SccAPI class from scc_dlm_api module            
-            self.scc_tt = Trailthrough(mqtt_client) #initialising Trailthrough class from scc_trail_through module
+            trail_through_cfg = trail_through_cfg if trail_through_cfg is not None else {}
+            self.scc_tt = Trailthrough(
+                mqtt_client, vectorised=trail_through_cfg.get("VECTORISED", False)) #initialising Trailthrough class from scc_trail_through module, rules are walked one by one unless VECTORISED
             self.scc_tt.init_trail_through_info() #initialising init_trail_through_info method of Trailthrough class
+            self.scc_api.init_trail_through_sections(self.scc_tt.tt_rules.section_ids) #alert state of every point section with trail through rules
 
             self.mqtt_client = mqtt_client
+            self.persistence_queue = persistence_queue #write-behind queue, database inserts are done on its writer thread
+            if persistence_queue is None: #frames are written by self.scc_api on the callback thread
+                self.scc_api.init_train_trace_info()
+            self.delta_publisher = delta_publisher #change-only publisher of occ/section_delta, None if disabled
+            self.role_cache = role_cache if role_cache is not None else UserRoleCache(self.scc_api) #user roles of reset commands
+            self.snapshot_serializer = snapshot_serializer if snapshot_serializer is not None else SnapshotSerializer() #occ/section_info snapshots of section_obj_list
+            self.forward_section_info = forward_section_info #False in shard workers, supervisor forwards occ/section_info
+            self.lane_pipeline = LanePipeline.from_config(
+                [self.detect_stage_fn, self.publish_stage_fn, self.persist_stage_fn], lanes_cfg,
+                None if persistence_queue is None else lambda frame: persistence_queue.put(frame, block=False)) #priority lanes, None if disabled
+            self.metrics = metrics if metrics is not None else MetricsRegistry() #stage histograms, exported if METRICS is enabled
+            self.frame_latency = self.metrics.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": "frame"}) #whole sem/section_info callback
+            self.parse_latency = self.metrics.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": "parse"})
+            self.detect_latency = self.metrics.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": "detect"})
+            self.publish_latency = self.metrics.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": "publish"})
+            self.persist_latency = self.metrics.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": "persist"})
+            self.last_stats_log_ts = time.time()
             Log.logger.info("SCC Server initialised!!")
 
             self.yard_obj_list = []
-            self.section_obj_list = []
-            self.point_obj_list = []
+            self.section_obj_list = SectionRegistry() #section_id -> Section
+            self.point_obj_list = PointRegistry() #point_id -> Point
         except Exception as ex:
             Log.logger.critical(f'init exception: {ex}')
 
     def init_section_info(self): #appending section class objects to section_obj_list and assigning section id to each section 
-        for section_idx in range(TOTAL_SECTION): #appending section class objects to section_obj_list
-            self.section_obj_list.append(Section())
-
-        for section_idx in range(TOTAL_SECTION): #assigning section id to each section object eg:- S1, S2, S3
-            self.section_obj_list[section_idx].section_id = "S" + str(section_idx + 1)
+        for section_idx in range(TOTAL_SECTION): #adding section objects with section id eg:- S1, S2, S3
+            new_section_obj = Section()
+            new_section_obj.section_id = "S" + str(section_idx + 1)
+            self.section_obj_list.add(new_section_obj)
 
     def cwsm_section_reset_sub_fn(self, in_client, user_data, message): #method to publish section reset message and update event in event info table.
         '''cwsm section reset subscribe function'''
@@ -185,7 +283,7 @@ class Sccserver:
         '''check user role from database'''
         try:
             user_permission = False
-            user_roles = self.scc_api.get_user_roles(username) #method to row from database where username is equal to username passed in argument
+            user_roles = self.role_cache.get_user_roles(username) #roles from cache, database is queried on miss or after ttl
 
             if user_roles is not None: #if user role is not none & not empty.
                 if len(user_roles) != 0:
@@ -222,12 +320,7 @@ class Sccserver:
 
     def get_dp_list_of_section(self, section_id): #method to get dp list of section
         try:
-            for sec_idx in range(len(self.section_obj_list)): 
-                if self.section_obj_list[sec_idx].section_id == section_id: #matching section_id attribute with section_id in section_obj_list
-                    return self.section_obj_list[sec_idx].dp_id #if matches then it will return dp_id of that section
-                else:
-                    pass
-            return []
+            return self.scc_api.get_dp_list_of_section(section_id) #dp_id list of that section, from yard_config maps
         except Exception as ex:
             Log.logger.critical(f'get_dp_list_of_section: exception: {ex}')
 
@@ -263,8 +356,9 @@ class Sccserver:
                     new_section_config_obj.section_name = section_idx.section_name
                     new_section_config_obj.dp_id = section_idx.dp_id
 
-                    self.section_obj_list.append(new_section_config_obj) #appending section class's objects to section_obj_list
+                    self.section_obj_list.add(new_section_config_obj) #adding section class's objects to section registry
 
+                self.scc_api.load_yard_config_maps(db_yard_config_list) #section -> dpu and dp lookups of reset commands
             else:
                 pass
                 Log.logger.warning(f'yard configuration table found empty')
@@ -284,14 +378,14 @@ class Sccserver:
                         f'{db_section_idx.section_id}, {db_section_idx.left_normal}, {db_section_idx.right_normal}, {db_section_idx.left_reverse}, {db_section_idx.right_reverse}')
                     #logging layoutsectionconnection info with info level.
 
-                    for section_obj_idx in range(len(self.section_obj_list)): #iteration to upload section connections info to section_obj_list
-                        if self.section_obj_list[section_obj_idx].section_id == db_section_idx.section_id: #uploading row of layout section connections for which section_idx = passed section idx info to section_obj_list
-                            self.section_obj_list[section_obj_idx].left_normal_section_id = db_section_idx.left_normal
-                            self.section_obj_list[section_obj_idx].right_normal_section_id = db_section_idx.right_normal
-                            self.section_obj_list[section_obj_idx].left_reverse_section_id = db_section_idx.left_reverse
-                            self.section_obj_list[section_obj_idx].right_reverse_section_id = db_section_idx.right_reverse
-                        else:
-                            pass
+                    section_obj = self.section_obj_list.get(db_section_idx.section_id) #uploading row of layout section connections to section of same section id
+                    if section_obj is not None:
+                        section_obj.left_normal_section_id = db_section_idx.left_normal
+                        section_obj.right_normal_section_id = db_section_idx.right_normal
+                        section_obj.left_reverse_section_id = db_section_idx.left_reverse
+                        section_obj.right_reverse_section_id = db_section_idx.right_reverse
+                    else:
+                        pass
             else:
                 pass
                 Log.logger.warning(f'section connection table found empty') 
@@ -303,64 +397,51 @@ class Sccserver:
 
     def get_section_status(self, section_id): #method to get section status ( from section_obj_list) by passing section_id of that section.
         try:
-            for section_obj_idx in range(len(self.section_obj_list)):
-                if self.section_obj_list[section_obj_idx].section_id == section_id: #finding row in section_obj_list for which section_id = passed section_id
-                    return self.section_obj_list[section_obj_idx].section_status #returing section status of that passed section_id.
-                else:
-                    pass
+            section_obj = self.section_obj_list.get(section_id)
+            if section_obj is not None:
+                return section_obj.section_status #returing section status of that passed section_id.
             return "none"
         except Exception as ex:
             Log.logger.critical("fill section idx: exception: {ex}")
 
     def print_section_info(self): #method to print section info from section_obj_list.
         try:
-            for section_idx in range(len(self.section_obj_list)):
-                Log.logger.info(f'section id:{self.section_obj_list[section_idx].section_id},'
-                                f'section_status:{self.section_obj_list[section_idx].section_status},'
-                                f'torpedo_axle_count:{self.section_obj_list[section_idx].torpedo_axle_count},'
-                                f'engine_axle_count:{self.section_obj_list[section_idx].engine_axle_count},'
-                                f'direction: {self.section_obj_list[section_idx].direction},'
-                                f'speed: {self.section_obj_list[section_idx].speed},'
-                                f'torpedo_status: {self.section_obj_list[section_idx].torpedo_status},'
-                                f'first_axle: {self.section_obj_list[section_idx].first_axle}')
+            for section_obj in self.section_obj_list:
+                Log.logger.info(f'section id:{section_obj.section_id},'
+                                f'section_status:{section_obj.section_status},'
+                                f'torpedo_axle_count:{section_obj.torpedo_axle_count},'
+                                f'engine_axle_count:{section_obj.engine_axle_count},'
+                                f'direction: {section_obj.direction},'
+                                f'speed: {section_obj.speed},'
+                                f'torpedo_status: {section_obj.torpedo_status},'
+                                f'first_axle: {section_obj.first_axle}')
         except Exception as ex:
             Log.logger.info(f'print_section_info: exception: {ex}')
 
+    def construct_section_frame(self): #method to snapshot section_obj_list as a SectionFrame, payload is the JSON message
+        try:
+            return self.snapshot_serializer.frame(self.section_obj_list, time.time()) #sections unchanged since last snapshot are not encoded again
+        except Exception as e:
+            Log.logger.critical(f'construct_section_frame: exception : {e}')
+
     def construct_section_json_msg(self):#method to construct section_obj_list to json format.
         try:
-            section_msg_list = []
-            json_scc_msg = ""
-            for i in range(len(self.section_obj_list)):
-                section_msg = {
-                    "section_id": self.section_obj_list[i].section_id,
-                    "section_status": self.section_obj_list[i].section_status,
-                    "engine_axle_count": self.section_obj_list[i].engine_axle_count,
-                    "torpedo_axle_count": self.section_obj_list[i].torpedo_axle_count,
-                    "direction": self.section_obj_list[i].direction,
-                    "speed": self.section_obj_list[i].speed,
-                    "torpedo_status": self.section_obj_list[i].torpedo_status,
-                    "first_axle": self.section_obj_list[i].first_axle,
-                    "error_code": self.section_obj_list[i].error_code}
-                section_msg_list.append(section_msg) #appending section_msg to section_msg_list
-
-            scc_msg = {"ts": time.time(), "sections": section_msg_list}
-            json_scc_msg = json.dumps(scc_msg, indent=0) #converting section_obj_list to json format
-            return json_scc_msg
+            return self.construct_section_frame().to_json()
         except Exception as e:
             Log.logger.critical(f'construct_section_json_msg: exception : {e}')
 
     def publish_section_info(self, mqtt_client, scc_api): #method to publish data from section_info table to mqtt topic "occ/section_info"
         try:
             while True:
-                json_msg = self.construct_section_json_msg() #constructing section_obj_list to json format
+                frame = self.construct_section_frame() #snapshot of section_obj_list, encoded once and never parsed again
                 ''' insert section_info in database first before publish'''
-                scc_api.insert_section_info(json_msg) #insering section data into section info table.
-                scc_api.insert_section_playback_info(json_msg) #insering section data into section playback info table.
+                scc_api.insert_section_info(frame) #insering section data into section info table.
+                scc_api.insert_section_playback_info(frame) #insering section data into section playback info table.
                 # dlm_api.insert_train_trace_info(json_msg)
                 # dlm_api.yard_performance(json_msg)
 
                 ''' publish section_info '''
-                mqtt_client.pub("occ/section_info", json_msg) #publishing section data to mqtt topic "occ/section_info"
+                mqtt_client.pub("occ/section_info", frame.payload) #publishing section data to mqtt topic "occ/section_info"
                 time.sleep(1)
         except Exception as e:
             Log.logger.critical(f'publish_section_info: exception: {e}')
@@ -369,57 +450,84 @@ class Sccserver:
         '''subscribe sem/section_info receive from acp dpu'''
         try:
             ts_start = time.time() #initialising time stamp
+            perf_start = time.perf_counter()
+
+            frame = SectionFrame.from_payload(message.payload) #decode payload once, frame is shared by all consumers
+            self.parse_latency.record(time.perf_counter() - perf_start)
 
-            Log.logger.info(f'sem/section_info received time: {ts_start}') #logging section info received time stamp.
-            recv_msg = json.loads(message.payload) #convert message payload to python dictionary.
-            recv_json_msg = json.dumps(recv_msg, indent=0) #converting python dictionary to json format.
-            
-            json_msg = recv_json_msg
             '''get torpedo status of middle sections'''
-            #json_msg = self.scc_tt.find_torpedo_status(recv_json_msg)  #NOT REQUIRED IN HSM1 SCENARIO
-
-            ''' insert section_info in database first before publish'''
-            scc_api.insert_section_info(json_msg) #inserting json_msg into section info table
-            scc_api.insert_section_playback_info(json_msg) #inserting json_msg into section playback info table
-            scc_api.insert_train_trace_info(json_msg) #inserting json_msg into train trace info table
-            #scc_api.yard_performance(json_msg)
-            #scc_api.torpedo_performance(json_msg)
-
-            '''trail through early warning detection'''
-            tt_sec_list = self.scc_tt.detect_trail_through(
-                json_msg, self.point_obj_list) #detecting trail through
-
-            if len(tt_sec_list) != 0:
-                for sec_idx in range(len(tt_sec_list)):
-                    tt_msg = json.dumps(
-                        {"ts": time.time(), "section_id": (tt_sec_list[sec_idx]).lower()})
-                    mqtt_client.pub("scc/trail_through", tt_msg)
-            else:
-                pass
+            #frame = section_frame(self.scc_tt.find_torpedo_status(frame))  #NOT REQUIRED IN HSM1 SCENARIO
 
-            ''' publish section_info '''
-            mqtt_client.pub("occ/section_info", json_msg)
+            if self.lane_pipeline is not None:
+                self.lane_pipeline.put(frame, ts_start) #detect, publish and persist stages run on their own lanes
+            else: #alert and OCC publish never wait for persistence
+                self.detect_stage_fn(frame)
+                self.publish_stage_fn(frame)
+                self.persist_stage_fn(frame)
 
-            ts_end = time.time()
-            total_ts = ts_end - ts_start
-            Log.logger.info(f'scc evaluator function execution time {total_ts}')
+            self.frame_latency.record(time.perf_counter() - perf_start) #replaces per frame execution time log line
+            if ts_start - self.last_stats_log_ts >= STATS_LOG_INTERVAL:
+                self.last_stats_log_ts = ts_start
+                Log.logger.info(f'scc evaluator stats: frame: {self.frame_latency.summary()}, '
+                                f'detect: {self.detect_latency.summary()}')
 
         except Exception as ex:
             Log.logger.critical(f'evaluator_section_info_sub_fn: exception: {ex}')
 
+    def persist_stage_fn(self, frame): #lane 2, database persistence of frame
+        ''' hand section_info over to write-behind persistence queue, database is not touched on callback thread'''
+        perf_start = time.perf_counter()
+        if self.persistence_queue is not None:
+            self.persistence_queue.put(frame, block=False) #under block policy a full queue spills, callback never waits
+        else:
+            self.scc_api.insert_frame(frame) #section, section_playback and train_trace rows in one transaction
+            #self.scc_api.yard_performance(frame)
+            #self.scc_api.torpedo_performance(frame)
+        self.persist_latency.record(time.perf_counter() - perf_start)
+
+    def detect_stage_fn(self, frame): #lane 0, trail through detection and alert publish
+        '''trail through early warning detection'''
+        perf_start = time.perf_counter()
+        tt_sec_list = self.scc_tt.detect_trail_through(
+            frame, self.point_obj_list) #detecting trail through
+
+        if len(tt_sec_list) != 0:
+            for sec_idx in range(len(tt_sec_list)):
+                tt_msg = json.dumps(
+                    {"ts": time.time(), "section_id": (tt_sec_list[sec_idx]).lower()})
+                self.mqtt_client.pub("scc/trail_through", tt_msg)
+        else:
+            pass
+        self.detect_latency.record(time.perf_counter() - perf_start)
+
+    def publish_stage_fn(self, frame): #lane 1, OCC publish of frame
+        ''' publish section_info '''
+        perf_start = time.perf_counter()
+        if self.delta_publisher is not None:
+            self.delta_publisher.put(frame) #changed sections go out with next coalesced delta
+
+        if not self.forward_section_info:
+            pass
+        elif self.delta_publisher is None or self.delta_publisher.publish_section_info:
+            self.mqtt_client.pub("occ/section_info", frame.payload) #received payload is forwarded as it is, no re-serialisation
+        else:
+            pass
+        self.publish_latency.record(time.perf_counter() - perf_start)
+
     def load_point_config(self): #method logging point configuration (point id and section id) from pointconfig table.
         '''load point configuration from pms_config table'''
         try:
             point_config_obj = self.scc_tt.get_point_config() #function returning (point id and section id))
 
-            for point_idx in point_config_obj: #appending point configuration into point_obj_list
-                self.point_obj_list.append(Point())
-                self.point_obj_list[-1].point_id = point_idx.point_id
-                self.point_obj_list[-1].section_id = point_idx.section_id
+            for point_idx in point_config_obj: #adding point configuration into point registry
+                new_point_obj = Point()
+                new_point_obj.point_id = point_idx.point_id
+                new_point_obj.section_id = point_idx.section_id
+                self.point_obj_list.add(new_point_obj)
 
-            for point_idx in range(len(self.point_obj_list)): #logging point configuration
+            for point_obj in self.point_obj_list: #logging point configuration
                 Log.logger.info(
-                    f'point_id: {self.point_obj_list[point_idx].point_id}, section_id: {self.point_obj_list[point_idx].section_id}')
+                    f'point_id: {point_obj.point_id}, section_id: {point_obj.section_id}')
 
         except Exception as ex:
             Log.logger.critical(f'load_point_status: exception {ex}')
@@ -429,26 +537,19 @@ class Sccserver:
         try:
             msg_payload = json.loads(message.payload) #coverting message payload to python dictionary.
             #Log.logger.info(f'Point Info : {message.payload}')
-            for point_idx in range(len(self.point_obj_list)): #updating point_obj_list with passed message.
-                if self.point_obj_list[point_idx].point_id == msg_payload["point_id"]:
-                    self.point_obj_list[point_idx].point_status = msg_payload["point_status"]
-                    self.point_obj_list[point_idx].point_mode = msg_payload["point_mode"]
-                    self.point_obj_list[point_idx].error_code = msg_payload["error_code"]
-                    self.point_obj_list[point_idx].ts = msg_payload["ts"]
-                else:
-                    pass
+            self.point_obj_list.update(msg_payload) #O(1) update of point of passed message
             # self.print_point_info()
         except Exception as ex:
             Log.logger.critical(f'point_info_sub_fn: exception: {ex}') 
 
     def print_point_info(self): #method to print point info from point_obj_list.
         try:
-            for point_idx in range(len(self.point_obj_list)):
+            for point_obj in self.point_obj_list:
                 Log.logger.info(
-                    f'{self.point_obj_list[point_idx].ts},'
-                    f'{self.point_obj_list[point_idx].point_id},'
-                    f'{self.point_obj_list[point_idx].point_status},'
-                    f'{self.point_obj_list[point_idx].point_mode}')
+                    f'{point_obj.ts},'
+                    f'{point_obj.point_id},'
+                    f'{point_obj.point_status},'
+                    f'{point_obj.point_mode}')
         except Exception as ex:
             Log.logger.critical(f'print_point_info: exception: {ex}')
 
@@ -468,6 +569,72 @@ class Sccserver:
         except Exception as ex:
             Log.logger.critical(f'tt_info_sub_fn: exception: {ex}')
 
+def register_metrics(registry, *component_list): #histograms, queue depths and counters of every component which is not None
+    '''register metrics of SCC components and database pool, called once every topic is subscribed'''
+    database = get_database()
+    if isinstance(database, SccPooledDatabase):
+        database.register_metrics(registry) #checkout counters of this process
+    for component in component_list:
+        if component is not None:
+            component.register_metrics(registry)
+
+
+def run_shard_worker(shard_idx, dpu_id_list, conf_file, topic_prefix): #entry of a shard worker process, evaluates frames of dpu_id_list
+    '''shard worker process started by ShardSupervisor'''
+    if Log.logger is None:
+        my_log = Log()
+
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg(conf_file)
+    scc_api = SccAPI()
+    scc_api.connect_database(scc_cfg) #database pool of this process
+    scc_api.init_section_connections_info()
+    scc_api.init_train_trace_info()
+
+    persistence_cfg = dict(scc_cfg.persistence) #spill files of a worker are its own
+    persistence_cfg["SPILL_PATH"] = shard_spill_path(persistence_cfg.get("SPILL_PATH", DEFAULT_SPILL_PATH), shard_idx)
+    persistence_queue = PersistenceQueue.from_config(scc_api, persistence_cfg)
+    persistence_queue.start()
+
+    client_id = scc_cfg.scc_id + SHARD_CLIENT_SUFFIX + str(shard_idx)
+    mqtt_client = MqttClient(
+        scc_cfg.lmb['BROKER_IP_ADDRESS'],
+        scc_cfg.lmb['PORT'],
+        client_id,
+        scc_cfg.lmb["USERNAME"],
+        scc_cfg.lmb["PASSWORD"],
+        client_id)
+    mqtt_client.connect()
+    metrics_registry = MetricsRegistry({"scc_id": client_id})
+    metrics_exporter = MetricsExporter.from_config(
+        metrics_registry, mqtt_client, scc_cfg.metrics, port_offset=shard_idx + 1) #supervisor serves on HTTP_PORT
+    if metrics_exporter is not None:
+        mqtt_client = MetricsMqttClient(mqtt_client, metrics_registry)
+    dispatcher = AsyncDispatcher.from_config(mqtt_client, scc_cfg.dispatch)
+    if dispatcher is not None:
+        dispatcher.start()
+    subscriber = dispatcher if dispatcher is not None else mqtt_client
+
+    scc_server = Sccserver(mqtt_client, persistence_queue, forward_section_info=False, lanes_cfg=scc_cfg.lanes,
+                           metrics=metrics_registry, trail_through_cfg=scc_cfg.trail_through)
+    if scc_server.lane_pipeline is not None:
+        scc_server.lane_pipeline.start()
+    scc_server.load_point_config()
+    subscriber.sub("pms/point_info", scc_server.point_info_sub_fn)
+    for dpu_id in dpu_id_list: #frames of other dpus never reach this process
+        if dispatcher is not None: #one route for all dpus, evaluator state is not shared between executor threads
+            dispatcher.sub(topic_prefix + dpu_id, scc_server.evaluator_section_info_sub_fn, route_topic=topic_prefix + "+")
+        else:
+            mqtt_client.sub(topic_prefix + dpu_id, scc_server.evaluator_section_info_sub_fn)
+
+    if metrics_exporter is not None:
+        register_metrics(metrics_registry, persistence_queue, scc_server.lane_pipeline, dispatcher, scc_server.role_cache)
+        metrics_exporter.start()
+    close_connection()
+    Log.logger.info(f'scc shard worker {shard_idx} started, dpus: {dpu_id_list}')
+    threading.Event().wait()
+
+
 if __name__ == '__main__':
     '''Initialise logger'''
     if Log.logger is None:
@@ -483,7 +650,7 @@ if __name__ == '__main__':
 
     '''Create database model''' #creating tables of SectionInfo, DpInfo, SectionConfigInfo in database using create_tables method of PostgresqlDatabase class of peewee module
     if psql_db:
-        psql_db.create_tables([SectionInfo, DpInfo, SectionConfigInfo])
+        psql_db.create_tables([SectionInfo, DpInfo, SectionConfigInfo, SectionPlaybackPackedInfo])
     else:
         pass
 
@@ -492,6 +659,17 @@ if __name__ == '__main__':
 
     scc_api.init_section_connections_info() #initialising section connections info
     scc_api.init_train_trace_info() #initialising train trace info
+
+    '''start write-behind persistence queue''' #section frames are written to database by its writer thread
+    persistence_queue = PersistenceQueue.from_config(scc_api, scc_cfg.persistence)
+    persistence_queue.start()
+
+    '''start partition maintenance''' #creates daily partitions ahead and drops expired ones if enabled in scc.conf
+    partition_manager = PartitionManager.from_config(scc_cfg.partition)
+    if partition_manager is not None:
+        partition_manager.start()
+    else:
+        pass
     
     '''start MQTT client connection'''
     try: #block to connect mqtt client to broker
@@ -507,38 +685,106 @@ if __name__ == '__main__':
     except Exception as ex: #if any exception occurs then it will show error
         Log.logger.critical(f'mqtt exception: {ex}')
 
+    '''metrics''' #stage histograms, per topic counters and queue depths on HTTP endpoint and scc/metrics if enabled in scc.conf
+    metrics_registry = MetricsRegistry({"scc_id": scc_cfg.scc_id})
+    metrics_exporter = MetricsExporter.from_config(metrics_registry, mqtt_client, scc_cfg.metrics)
+    if metrics_exporter is not None:
+        mqtt_client = MetricsMqttClient(mqtt_client, metrics_registry) #counts every message published and subscribed below
+    else:
+        pass
+
+    '''start asyncio dispatcher''' #if enabled in scc.conf, every topic gets its own queue and handler task instead of sharing the paho thread
+    dispatcher = AsyncDispatcher.from_config(mqtt_client, scc_cfg.dispatch)
+    if dispatcher is not None:
+        dispatcher.start()
+    else:
+        pass
+    subscriber = dispatcher if dispatcher is not None else mqtt_client
+
+    '''start change-only section publisher''' #publishes occ/section_delta if enabled in scc.conf
+    delta_publisher = SectionDeltaPublisher.from_config(mqtt_client, scc_cfg.delta_publish)
+    if delta_publisher is not None:
+        delta_publisher.start()
+    else:
+        pass
+
     '''scc server'''
-    scc_server = Sccserver(mqtt_client) #creating object of Sccserver class and passing mqtt client object to it
+    role_cache = UserRoleCache.from_config(scc_api, scc_cfg.role_cache) #user roles of reset commands, cleared on cwsm/user_updated
+    snapshot_serializer = SnapshotSerializer.from_config(scc_cfg.snapshot) #encoder of occ/section_info snapshots
+    scc_server = Sccserver(mqtt_client, persistence_queue, delta_publisher, role_cache, snapshot_serializer,
+                           lanes_cfg=scc_cfg.lanes, metrics=metrics_registry, trail_through_cfg=scc_cfg.trail_through) #creating object of Sccserver class and passing mqtt client object to it
+    if scc_server.lane_pipeline is not None:
+        scc_server.lane_pipeline.start() #detect, publish and persist lanes of sem/section_info
+    else:
+        pass
     scc_server.fill_yard_config_info_from_db() #filling yard configuration info from database
     scc_server.fill_section_connections_info_from_db() #filling section connections info from database
 
     '''point configuration'''
     scc_server.load_point_config()
 
+    '''reload yard configuration maps when yard_config table changes'''
+    scc_server.scc_api.start_yard_config_reload(
+        scc_cfg.yard_config.get("RELOAD_INTERVAL_S", DEFAULT_YARD_CONFIG_RELOAD_INTERVAL_S))
+
     '''subscribe cwsm/section_reset mqtt topic'''
-    mqtt_client.sub("cwsm/section_reset", scc_server.cwsm_section_reset_sub_fn)
+    subscriber.sub("cwsm/section_reset", scc_server.cwsm_section_reset_sub_fn)
 
     '''subscribe cwsm/reset_dp mqtt topic'''
-    mqtt_client.sub("cwsm/dp_reset", scc_server.cwsm_dp_reset_sub_fn)
+    subscriber.sub("cwsm/dp_reset", scc_server.cwsm_dp_reset_sub_fn)
     
-    '''subscribe sem/section_info mqtt topic'''
-    mqtt_client.sub("sem/section_info",
-                    scc_server.evaluator_section_info_sub_fn)
+    '''subscribe sem/section_info mqtt topic''' #with SHARD enabled frames are evaluated by one worker process per yard or dpu
+    shard_supervisor = ShardSupervisor.from_config(mqtt_client, run_shard_worker, '../config/scc.conf', scc_cfg.shard, delta_publisher)
+    if shard_supervisor is not None:
+        shard_supervisor.start(scc_api.read_yard_config_info())
+        subscriber.sub(SECTION_INFO_TOPIC, shard_supervisor.section_info_sub_fn)
+    else:
+        subscriber.sub("sem/section_info",
+                       scc_server.evaluator_section_info_sub_fn)
 
     '''subscribe mqtt topic'''
-    mqtt_client.sub("scc/torpedo_info", scc_api.torpedo_info_sub_fn)
+    subscriber.sub("scc/torpedo_info", scc_api.torpedo_info_sub_fn)
 
     '''subscribe sem/section_info mqtt topic'''
-    mqtt_client.sub("pms/point_info",
-                    scc_server.point_info_sub_fn)
+    subscriber.sub("pms/point_info",
+                   scc_server.point_info_sub_fn)
 
     '''subscribe sem/section_info mqtt topic'''
-    mqtt_client.sub("scc/trail_through",
-                    scc_server.tt_info_sub_fn)
+    subscriber.sub("scc/trail_through",
+                   scc_server.tt_info_sub_fn)
 
     '''subscribe sem/section_info mqtt topic'''
-    mqtt_client.sub("cwsm/tt_clear",
-                    scc_server.tt_clear_sub_fn)
+    subscriber.sub("cwsm/tt_clear",
+                   scc_server.tt_clear_sub_fn)
+
+    '''subscribe scc/yard_config_updated mqtt topic'''
+    subscriber.sub("scc/yard_config_updated", scc_server.scc_api.yard_config_updated_sub_fn)
+
+    '''subscribe cwsm/user_updated mqtt topic'''
+    subscriber.sub(USER_UPDATED_TOPIC, role_cache.user_updated_sub_fn)
+
+    '''subscribe occ/playback_request and occ/playback_stop mqtt topics''' #frames of a time range are streamed on occ/playback/<session>
+    playback_server = PlaybackServer.from_config(mqtt_client, scc_cfg.playback)
+    subscriber.sub(PLAYBACK_REQUEST_TOPIC, playback_server.playback_request_sub_fn)
+    subscriber.sub(PLAYBACK_STOP_TOPIC, playback_server.playback_stop_sub_fn)
+
+    '''subscribe occ/section_resync mqtt topic'''
+    if delta_publisher is not None:
+        subscriber.sub(DEFAULT_RESYNC_TOPIC, delta_publisher.resync_sub_fn)
+    else:
+        pass
+
+    '''start metrics exporter'''
+    if metrics_exporter is not None:
+        register_metrics(metrics_registry, persistence_queue, scc_server.lane_pipeline, dispatcher, role_cache,
+                         delta_publisher, partition_manager, shard_supervisor)
+        metrics_exporter.start()
+    else:
+        pass
+
+    '''return start-up connection of main thread to pool''' #callbacks and worker threads check out their own connections
+    close_connection()
+
     # while True:
     #     pass
     # removing the infinite loop and calling the mqtt_client loop
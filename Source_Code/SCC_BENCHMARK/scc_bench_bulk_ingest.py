@@ -0,0 +1,104 @@
+'''
+*****************************************************************************
+*File : scc_bench_bulk_ingest.py
+*Module : SCC
+*Purpose : Benchmark per frame inserts against batched COPY ingestion
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import argparse
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from scc_dlm_model import *
+from scc_dlm_api import *
+sys.path.insert(1, "./common")
+
+BENCH_TS_OFFSET = 1000.0 #benchmark rows use ts below BENCH_TS_LIMIT so they can be deleted afterwards
+BENCH_TS_LIMIT = 1000000.0
+
+
+def make_frames(total_frames, total_sections): #generate synthetic section messages
+    frame_list = []
+    for frame_idx in range(total_frames):
+        sections = []
+        for section_idx in range(total_sections):
+            torpedo_axle_count = (frame_idx + section_idx) % 17
+            sections.append({
+                "section_id": "S" + str(section_idx + 1),
+                "section_status": "occupied" if torpedo_axle_count != 0 else "cleared",
+                "engine_axle_count": 0,
+                "torpedo_axle_count": torpedo_axle_count,
+                "direction": "in" if frame_idx % 40 < 20 else "out",
+                "speed": 10,
+                "torpedo_status": "loaded",
+                "first_axle": "torpedo",
+                "error_code": 0})
+        frame_list.append(json.dumps(
+            {"ts": BENCH_TS_OFFSET + frame_idx, "sections": sections}, indent=0))
+    return frame_list
+
+
+def delete_bench_rows(): #remove rows written by benchmark
+    SectionInfo.delete().where(SectionInfo.ts < BENCH_TS_LIMIT).execute()
+    SectionPlaybackInfo.delete().where(SectionPlaybackInfo.ts < BENCH_TS_LIMIT).execute()
+    TrainTraceInfo.delete().where(TrainTraceInfo.ts < BENCH_TS_LIMIT).execute()
+
+
+def bench_per_frame(frame_list): #current path, one insert_many and two save() calls per frame
+    scc_api = SccAPI()
+    scc_api.init_train_trace_info()
+    ts_start = time.time()
+    for json_msg in frame_list:
+        scc_api.insert_section_info(json_msg)
+        scc_api.insert_section_playback_info(json_msg)
+        scc_api.insert_train_trace_info(json_msg)
+    return time.time() - ts_start
+
+
+def bench_bulk(frame_list, batch_size, copy_enabled): #bulk path, one transaction per batch_size frames
+    scc_api = SccAPI()
+    scc_api.init_train_trace_info()
+    scc_api.copy_enabled = copy_enabled
+    ts_start = time.time()
+    for batch_idx in range(0, len(frame_list), batch_size):
+        scc_api.bulk_insert_frames(frame_list[batch_idx:batch_idx + batch_size])
+    return time.time() - ts_start
+
+
+if __name__ == '__main__':
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="section ingestion benchmark")
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--sections", type=int, default=22)
+    parser.add_argument("--batch", type=int, default=50)
+    args = parser.parse_args()
+
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    SccAPI().connect_database(scc_cfg) #binds models to pooled database
+
+    frame_list = make_frames(args.frames, args.sections)
+    total_rows = args.frames * (args.sections + 1) #section rows plus one playback row per frame, train trace rows are not counted
+
+    delete_bench_rows()
+    per_frame_time = bench_per_frame(frame_list)
+    delete_bench_rows()
+    insert_time = bench_bulk(frame_list, args.batch, False)
+    delete_bench_rows()
+    copy_time = bench_bulk(frame_list, args.batch, True)
+    delete_bench_rows()
+
+    print(f'frames: {args.frames}, sections: {args.sections}, batch: {args.batch}')
+    print(f'per frame insert : {total_rows / per_frame_time:12.0f} rows/s ({per_frame_time:.3f} s)')
+    print(f'batched INSERT   : {total_rows / insert_time:12.0f} rows/s ({insert_time:.3f} s)')
+    print(f'batched COPY     : {total_rows / copy_time:12.0f} rows/s ({copy_time:.3f} s)')
@@ -0,0 +1,65 @@
+'''
+*****************************************************************************
+*File : scc_bench_cold_start.py
+*Module : SCC
+*Purpose : Benchmark cold start import time of main.py and the configuration insert scripts
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import argparse
+import subprocess
+sys.path.insert(1, "./common")
+
+SCRIPT_LIST = ["main", "insert_conf", "insert_yard_config"] #modules imported in a fresh interpreter, their __main__ block is not run
+
+
+def cold_start(module_name): #seconds for a fresh interpreter to import module_name and exit
+    ts_start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", "import " + module_name], capture_output=True, text=True)
+    secs = time.perf_counter() - ts_start
+    if result.returncode != 0:
+        raise RuntimeError(f'import {module_name} failed: {result.stderr.strip().splitlines()[-1:]}')
+    return secs
+
+
+def import_breakdown(module_name, top): #slowest imports done by module_name, by cumulative time, from python -X importtime
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module_name],
+                            capture_output=True, text=True)
+    import_list = []
+    in_module = False
+    for line in reversed(result.stderr.splitlines()): #a module is reported after the modules it imports
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, imported = line[len("import time:"):].split("|")
+        level = (len(imported) - len(imported.lstrip()) - 1) // 2 #nested imports are indented by two spaces per level
+        if level == 0:
+            in_module = imported.strip() == module_name
+        elif in_module:
+            import_list.append((int(cumulative_us), imported.strip()))
+    return sorted(import_list, reverse=True)[:top]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="cold start import benchmark")
+    parser.add_argument("--modules", nargs="+", default=SCRIPT_LIST)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=8, help="slowest imports listed per module")
+    args = parser.parse_args()
+
+    baseline_list = sorted(cold_start("sys") for repeat_idx in range(args.repeat)) #interpreter start up alone
+    print(f'interpreter only    : median {baseline_list[len(baseline_list) // 2] * 1000:8.1f} ms')
+    for module_name in args.modules:
+        try:
+            secs_list = sorted(cold_start(module_name) for repeat_idx in range(args.repeat))
+        except RuntimeError as ex:
+            print(f'{module_name:20s}: {ex}')
+            continue
+        print(f'{module_name:20s}: median {secs_list[len(secs_list) // 2] * 1000:8.1f} ms  '
+              f'min {secs_list[0] * 1000:8.1f} ms  max {secs_list[-1] * 1000:8.1f} ms')
+        for cumulative_us, imported in import_breakdown(module_name, args.top):
+            print(f'    {cumulative_us / 1000:8.1f} ms  {imported}')
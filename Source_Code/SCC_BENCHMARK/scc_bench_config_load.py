@@ -0,0 +1,83 @@
+'''
+*****************************************************************************
+*File : scc_bench_config_load.py
+*Module : SCC
+*Purpose : Benchmark configuration load of a synthetic plant, first load, unchanged reload and small change
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import argparse
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from scc_dlm_api import *
+from scc_db_pool import *
+from scc_config_loader import *
+sys.path.insert(1, "./common")
+
+SECTIONS_PER_DPU = 50
+
+
+def make_plant(total_sections, dps_per_section, changed_sections=0): #section.conf, section_connections.conf and yard_config.conf data
+    section_cfg = {"SECTION": []}
+    section_connections_cfg = {"SECTIONS": []}
+    yard_cfg = {"YARDS": [{"YARD_ID": "Y1", "YARD_NAME": "BENCH", "DPU": []}]}
+    for section_idx in range(total_sections):
+        section_id = "S" + str(section_idx)
+        dp_list = [f'D{section_idx}_{dp_idx}' for dp_idx in range(dps_per_section)]
+        direction = "OUT" if section_idx < changed_sections else "IN" #changed sections get another DP_DIRECTION
+        half = dps_per_section // 2
+        section_cfg["SECTION"].append({
+            "SECTION_ID": section_id,
+            "SECTION_IN": [{"DP_ID": dp_id, "DP_DIRECTION": direction} for dp_id in dp_list[:half]],
+            "SECTION_OUT": [{"DP_ID": dp_id, "DP_DIRECTION": "OUT"} for dp_id in dp_list[half:]]})
+        section_connections_cfg["SECTIONS"].append({
+            "SECTION_ID": section_id, "LEFT_NORMAL": "S" + str(section_idx - 1), "RIGHT_NORMAL": "S" + str(section_idx + 1),
+            "LEFT_REVERSE": None, "RIGHT_REVERSE": None})
+        if section_idx % SECTIONS_PER_DPU == 0:
+            dpu_idx = section_idx // SECTIONS_PER_DPU
+            yard_cfg["YARDS"][0]["DPU"].append({"DPU_ID": "DPU" + str(dpu_idx), "DPU_NAME": "DPU" + str(dpu_idx), "SECTIONS": []})
+        yard_cfg["YARDS"][0]["DPU"][-1]["SECTIONS"].append({"SECTION_ID": section_id, "SECTION_NAME": section_id, "DPS": dp_list})
+    return [(SECTION_CONFIG_TABLE, section_config_rows(section_cfg)),
+            (SECTION_CONNECTIONS_TABLE, section_connections_rows(section_connections_cfg)),
+            (YARD_CONFIG_TABLE, yard_config_rows(yard_cfg))]
+
+
+def bench(name, scc_api, table_rows_list):
+    ts_start = time.perf_counter()
+    diff_list = load_config(scc_api, table_rows_list)
+    secs = time.perf_counter() - ts_start
+    changes = ", ".join(f'{config_table.name} +{len(table_diff.insert_rows)}/-{len(table_diff.delete_ids)}'
+                        for config_table, table_diff in diff_list)
+    print(f'{name:16s}: {secs * 1000:8.1f} ms  ({changes})')
+
+
+if __name__ == '__main__':
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="configuration load benchmark, tables are restored afterwards")
+    parser.add_argument("--sections", type=int, default=5000)
+    parser.add_argument("--dps", type=int, default=4, help="detection points per section")
+    parser.add_argument("--changed", type=int, default=10, help="sections changed by last load")
+    args = parser.parse_args()
+
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    scc_api = SccAPI()
+    scc_api.connect_database(scc_cfg)
+
+    print(f'sections: {args.sections}, detection points: {args.sections * args.dps}')
+    with get_database().atomic() as transaction: #loads run in savepoints, rolled back at end
+        empty_list = [(config_table, []) for config_table, row_list in make_plant(0, args.dps)]
+        load_config(scc_api, empty_list) #empty tables first, so first load inserts everything
+        bench("first load", scc_api, make_plant(args.sections, args.dps))
+        bench("unchanged", scc_api, make_plant(args.sections, args.dps))
+        bench("small change", scc_api, make_plant(args.sections, args.dps, args.changed))
+        transaction.rollback()
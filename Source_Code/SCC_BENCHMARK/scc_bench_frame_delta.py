@@ -0,0 +1,89 @@
+'''
+*****************************************************************************
+*File : scc_bench_frame_delta.py
+*Module : SCC
+*Purpose : Benchmark incremental section frame evaluation against full evaluation
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import random
+import argparse
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+import scc_trail_through
+from scc_trail_through import *
+from scc_bench_tt_vector import make_layout, make_points
+sys.path.insert(1, "./common")
+
+
+def make_changing_frames(total_frames, total_sections, changes_per_frame): #synthetic frames, changes_per_frame sections differ from previous frame
+    section_dict = {}
+    for section_idx in range(total_sections):
+        section_id = "S" + str(section_idx + 1)
+        section_dict[section_id] = {
+            "section_id": section_id,
+            "section_status": "cleared",
+            "engine_axle_count": 0,
+            "torpedo_axle_count": 0,
+            "direction": "none",
+            "speed": 10,
+            "torpedo_status": "none",
+            "first_axle": "none",
+            "error_code": 0}
+
+    frame_list = []
+    for frame_idx in range(total_frames):
+        for section_id in random.sample(list(section_dict), changes_per_frame):
+            section_dict[section_id]["section_status"] = random.choice(["occupied", "cleared"])
+            section_dict[section_id]["torpedo_axle_count"] = random.randint(0, 8)
+            section_dict[section_id]["direction"] = random.choice(["in", "out"])
+        frame_list.append(SectionFrame.from_dict({"ts": float(frame_idx), "sections": list(section_dict.values())}))
+    return frame_list
+
+
+def run(tt, layout, frame_list, point_obj_list, full_evaluation): #detect trail through and torpedo status over all frames
+    scc_trail_through.DELTA_FULL_EVALUATION_RATIO = -1.0 if full_evaluation else DELTA_FULL_EVALUATION_RATIO
+    tt.load_topology(layout[0], layout[1])
+
+    result_list = []
+    ts_start = time.perf_counter()
+    for frame_idx, frame in enumerate(frame_list):
+        if frame_idx % 2 == 0:
+            result_list.append(tt.detect_trail_through(frame, point_obj_list))
+        else:
+            result_list.append(tt.find_torpedo_status(frame) is not None)
+    result_list.append([sec_obj.torpedo_status for sec_obj in tt.tt_sec_obj_list]) #torpedo status of every section after last frame
+    secs = time.perf_counter() - ts_start
+    scc_trail_through.DELTA_FULL_EVALUATION_RATIO = DELTA_FULL_EVALUATION_RATIO
+    return result_list, secs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="incremental section frame evaluation benchmark")
+    parser.add_argument("--sections", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--changes", type=int, nargs="+", default=[1, 10, 100, 1000], help="changed sections per frame")
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel("WARNING") #per frame info lines would dominate the measurement
+
+    tt = Trailthrough(None)
+    layout = make_layout(args.sections, 4)
+    point_obj_list = make_points(layout[1])
+    print(f'sections: {args.sections}, frames: {args.frames}, vectorised: {tt.vectorised}')
+    for changes_per_frame in args.changes:
+        random.seed(1)
+        frame_list = make_changing_frames(args.frames, args.sections, changes_per_frame)
+        full_result, full_secs = run(tt, layout, frame_list, point_obj_list, True)
+        delta_result, delta_secs = run(tt, layout, frame_list, point_obj_list, False)
+        print(f'changes/frame: {changes_per_frame:6d}  full: {full_secs / args.frames * 1000:8.3f} ms/frame'
+              f'  incremental: {delta_secs / args.frames * 1000:8.3f} ms/frame  results identical: {full_result == delta_result}')
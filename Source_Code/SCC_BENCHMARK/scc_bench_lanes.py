@@ -0,0 +1,113 @@
+'''
+*****************************************************************************
+*File : scc_bench_lanes.py
+*Module : SCC
+*Purpose : Benchmark trail through alert latency under database load, serial evaluator against priority lanes
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import queue
+import random
+import argparse
+import threading
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_trail_through import *
+from scc_metrics import *
+from scc_lanes import *
+from scc_bench_tt_vector import make_layout, make_frames, make_points
+sys.path.insert(1, "./common")
+
+
+class BenchStages: #evaluator stages with a database write of fixed duration
+    def __init__(self, tt, point_obj_list, db_ms):
+        self.tt = tt
+        self.point_obj_list = point_obj_list
+        self.db_secs = db_ms / 1000.0
+        self.published = 0
+
+    def detect_stage_fn(self, frame):
+        self.tt.detect_trail_through(frame, self.point_obj_list)
+
+    def publish_stage_fn(self, frame):
+        self.published += 1
+
+    def persist_stage_fn(self, frame): #section, playback and train trace inserts of a loaded database
+        time.sleep(self.db_secs)
+
+
+def feed(frame_list, rate, put_fn): #call put_fn(frame, receive ts) at rate frames/s
+    interval = 1.0 / rate
+    start_ts = time.time()
+    for frame_idx, frame in enumerate(frame_list):
+        wait = start_ts + frame_idx * interval - time.time()
+        if wait > 0:
+            time.sleep(wait)
+        put_fn(frame, time.time())
+
+
+def run_serial(stages, frame_list, rate): #evaluator without lanes, callback thread persists then detects then publishes
+    alert_latency = LatencyHistogram()
+    frame_queue = queue.Queue() #paho inbound queue
+
+    def callback_fn():
+        for frame_idx in range(len(frame_list)):
+            receive_ts, frame = frame_queue.get()
+            stages.persist_stage_fn(frame)
+            stages.detect_stage_fn(frame)
+            alert_latency.record(time.time() - receive_ts)
+            stages.publish_stage_fn(frame)
+
+    callback_thread = threading.Thread(target=callback_fn)
+    callback_thread.start()
+    feed(frame_list, rate, lambda frame, receive_ts: frame_queue.put((receive_ts, frame)))
+    callback_thread.join()
+    return alert_latency.summary()
+
+
+def run_lanes(stages, frame_list, rate, alert_budget_ms):
+    pipeline = LanePipeline([stages.detect_stage_fn, stages.publish_stage_fn, stages.persist_stage_fn],
+                            queue_size=len(frame_list), alert_budget_ms=alert_budget_ms)
+    pipeline.start()
+    feed(frame_list, rate, pipeline.put)
+    while any(lane.latency.count < len(frame_list) for lane in pipeline.lane_list):
+        time.sleep(0.05)
+    return pipeline.get_stats()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="trail through alert latency under database load, serial against priority lanes")
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=20.0, help="frames/s received")
+    parser.add_argument("--db-ms", type=float, default=80.0, help="database write time per frame")
+    parser.add_argument("--budget-ms", type=int, default=DEFAULT_ALERT_BUDGET_MS)
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel("ERROR") #per frame info and over budget lines would dominate the measurement
+
+    random.seed(1)
+    tt = Trailthrough(None)
+    layout = make_layout(args.sections, 4)
+    tt.load_topology(layout[0], layout[1])
+    frame_list = make_frames(args.frames, args.sections)
+    stages = BenchStages(tt, make_points(layout[1]), args.db_ms)
+
+    print(f'sections: {args.sections}, frames: {args.frames}, rate: {args.rate}/s, db write: {args.db_ms} ms/frame, '
+          f'alert budget: {args.budget_ms} ms')
+    serial = run_serial(stages, frame_list, args.rate)
+    print(f'serial  alert : p50 {serial["p50_ms"]:9.3f} ms  p99 {serial["p99_ms"]:9.3f} ms  max {serial["max_ms"]:9.3f} ms')
+    lanes = run_lanes(stages, frame_list, args.rate, args.budget_ms)
+    for lane_name in LANE_NAME_LIST:
+        lane = lanes[lane_name]
+        print(f'lanes {lane_name:8s}: p50 {lane["p50_ms"]:9.3f} ms  p99 {lane["p99_ms"]:9.3f} ms  max {lane["max_ms"]:9.3f} ms')
+    print(f'alert p99 within budget: {lanes["detect"]["p99_ms"] <= args.budget_ms}, over budget frames: {lanes["over_budget"]}')
@@ -0,0 +1,87 @@
+'''
+*****************************************************************************
+*File : scc_bench_metrics.py
+*Module : SCC
+*Purpose : Benchmark per frame cost of the execution time log line against stage histograms, and render time of the metrics endpoint
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import os
+import time
+import logging
+import argparse
+import tempfile
+import tracemalloc
+
+'''Import SCC packages '''
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+STAGE_LIST = ["frame", "parse", "detect", "publish", "persist"]
+
+
+def bench_log_line(frames): #us/frame of an info level execution time line written to a log file
+    log_file = tempfile.NamedTemporaryFile(suffix=".log", delete=False)
+    log_file.close()
+    logger = logging.getLogger("scc_bench_metrics")
+    logger.propagate = False
+    handler = logging.FileHandler(log_file.name)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+    start = time.perf_counter()
+    for frame_idx in range(frames):
+        ts_start = time.time()
+        ts_end = time.time()
+        total_ts = ts_end - ts_start
+        logger.info(f'scc evaluator function execution time {total_ts}')
+    secs = time.perf_counter() - start
+
+    logger.removeHandler(handler)
+    handler.close()
+    os.remove(log_file.name)
+    return secs / frames * 1000000
+
+
+def bench_histograms(frames): #us/frame and bytes/frame left allocated by recording every stage of a frame
+    registry = MetricsRegistry({"scc_id": "SCC_BENCH"})
+    histogram_list = [registry.histogram(STAGE_METRIC, STAGE_METRIC_HELP, {"stage": stage}) for stage in STAGE_LIST]
+
+    start = time.perf_counter()
+    for frame_idx in range(frames):
+        for histogram in histogram_list:
+            perf_start = time.perf_counter()
+            histogram.record(time.perf_counter() - perf_start)
+    secs = time.perf_counter() - start
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for frame_idx in range(frames):
+        for histogram in histogram_list:
+            perf_start = time.perf_counter()
+            histogram.record(time.perf_counter() - perf_start)
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return secs / frames * 1000000, retained / frames, registry
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="per frame cost of execution time log line against stage histograms")
+    parser.add_argument("--frames", type=int, default=100000)
+    args = parser.parse_args()
+
+    log_us = bench_log_line(args.frames)
+    histogram_us, retained, registry = bench_histograms(args.frames)
+    start = time.perf_counter()
+    text = registry.render_prometheus()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f'frames: {args.frames}')
+    print(f'execution time log line   : {log_us:8.3f} us/frame')
+    print(f'{len(STAGE_LIST)} stage histograms        : {histogram_us:8.3f} us/frame, {retained:.3f} bytes/frame retained')
+    print(f'prometheus render         : {render_ms:8.3f} ms, {len(text)} bytes')
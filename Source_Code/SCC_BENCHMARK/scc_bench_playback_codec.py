@@ -0,0 +1,118 @@
+'''
+*****************************************************************************
+*File : scc_bench_playback_codec.py
+*Module : SCC
+*Purpose : Benchmark bytes per frame and decode throughput of packed section playback records against JSON
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import datetime, timezone
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from scc_section_frame import *
+from scc_db_pool import *
+from scc_playback import *
+sys.path.insert(1, "./common")
+
+
+def synthetic_day(total_seconds, frame_interval_s, total_sections, changes_per_frame): #yield frames of a yard, changes_per_frame sections change per frame
+    section_dict = {}
+    for section_idx in range(total_sections):
+        section_id = "S" + str(section_idx + 1)
+        section_dict[section_id] = {
+            "section_id": section_id,
+            "section_status": "cleared",
+            "engine_axle_count": 0,
+            "torpedo_axle_count": 0,
+            "direction": "none",
+            "speed": 0,
+            "torpedo_status": "none",
+            "first_axle": "none",
+            "error_code": 0}
+
+    ts = 1614556800.0 #2021-03-01 00:00 UTC
+    for frame_idx in range(int(total_seconds / frame_interval_s)):
+        for section_id in random.sample(list(section_dict), changes_per_frame):
+            section = section_dict[section_id]
+            section["section_status"] = random.choice(["occupied", "cleared"])
+            section["engine_axle_count"] = random.randint(0, 12)
+            section["torpedo_axle_count"] = random.randint(0, 8)
+            section["direction"] = random.choice(["in", "out"])
+            section["speed"] = round(random.uniform(0, 25), 2)
+        yield SectionFrame.from_dict({"ts": ts + frame_idx * frame_interval_s, "sections": list(section_dict.values())})
+
+
+def recorded_day(day): #yield frames of section_playback of a UTC day YYYY-MM-DD
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    database = init_db(scc_cfg)
+    start_ts = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+    with database.connection_context():
+        for ts, sections in read_playback(start_ts, start_ts + 86400):
+            yield SectionFrame.from_dict({"ts": ts, "sections": sections})
+
+
+def bench(frame_iter, keyframe_interval_s):
+    encoder = PlaybackEncoder(keyframe_interval_s)
+    record_list = []
+    total_frames = 0
+    json_bytes = 0
+    json_decode_secs = 0.0
+    encode_secs = 0.0
+    for frame in frame_iter:
+        text = json.dumps(frame.section_dicts()) #as stored by JSONField of section_playback
+        json_bytes += len(text.encode())
+        ts_start = time.perf_counter()
+        json.loads(text)
+        json_decode_secs += time.perf_counter() - ts_start
+
+        ts_start = time.perf_counter()
+        record_list.append(encoder.encode(frame))
+        encode_secs += time.perf_counter() - ts_start
+        total_frames += 1
+
+    decoder = PlaybackDecoder()
+    ts_start = time.perf_counter()
+    for record in record_list:
+        decoder.decode(record)
+    packed_decode_secs = time.perf_counter() - ts_start
+
+    packed_bytes = sum(map(len, record_list))
+    keyframes = sum(1 for record in record_list if record[0] == RECORD_KEYFRAME)
+    print(f'frames: {total_frames}, keyframes: {keyframes}, keyframe interval: {keyframe_interval_s}s')
+    print(f'json  : {json_bytes / total_frames:10.1f} bytes/frame  {json_bytes / 1e6:10.2f} MB'
+          f'  decode {total_frames / json_decode_secs:10.0f} frames/s')
+    print(f'packed: {packed_bytes / total_frames:10.1f} bytes/frame  {packed_bytes / 1e6:10.2f} MB'
+          f'  decode {total_frames / packed_decode_secs:10.0f} frames/s  encode {total_frames / encode_secs:10.0f} frames/s')
+    print(f'size ratio: {json_bytes / packed_bytes:.1f}x')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="packed section playback records against JSON, bytes per frame and decode throughput")
+    parser.add_argument("--day", help="UTC day YYYY-MM-DD read from section_playback, synthetic day if not given")
+    parser.add_argument("--seconds", type=int, default=86400, help="length of synthetic day")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between two synthetic frames")
+    parser.add_argument("--sections", type=int, default=22)
+    parser.add_argument("--changes", type=int, default=2, help="changed sections per synthetic frame")
+    parser.add_argument("--keyframe-interval", type=int, default=DEFAULT_KEYFRAME_INTERVAL_S)
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+
+    if args.day is not None:
+        frame_iter = recorded_day(args.day)
+    else:
+        random.seed(1)
+        frame_iter = synthetic_day(args.seconds, args.interval, args.sections, args.changes)
+    bench(frame_iter, args.keyframe_interval)
@@ -0,0 +1,410 @@
+'''
+*****************************************************************************
+*File : scc_bench_replay.py
+*Module : SCC
+*Purpose : Replay benchmark of the evaluator, trail through detection, train trace and yard performance, without broker, DPUs or PMS
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from peewee import SqliteDatabase
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from scc_db_pool import *
+from scc_dlm_model import *
+from scc_layout_model import *
+from scc_dlm_api import *
+from scc_playback import *
+from scc_playback_codec import *
+from scc_section_frame import *
+from scc_metrics import *
+import main as scc_main
+sys.path.insert(1, "./common")
+
+TARGET_EVALUATOR = "evaluator" #Sccserver.evaluator_section_info_sub_fn, parse, detect, publish and inserts of one frame
+TARGET_DETECT = "detect_trail_through" #Trailthrough.detect_trail_through
+TARGET_TRAIN_TRACE = "insert_train_trace_info" #SccAPI.insert_train_trace_info
+TARGET_YARD_PERFORMANCE = "yard_performance" #SccAPI.yard_performance
+TARGET_LIST = [TARGET_EVALUATOR, TARGET_DETECT, TARGET_TRAIN_TRACE, TARGET_YARD_PERFORMANCE]
+DB_SQLITE = "sqlite"
+DB_POSTGRES = "postgres"
+DEFAULT_PG_DB = "scc_bench" #local benchmark database, its tables are emptied between targets
+DEFAULT_RESULTS_FILE = "scc_bench_results.jsonl" #one line per run, compared with previous run of the same workload
+DEFAULT_ALLOC_FRAMES = 200 #frames replayed under tracemalloc
+SYNTHETIC_TS = 1614556800.0 #2021-03-01 00:00 UTC
+BENCH_MODEL_LIST = [LayoutSectionConnectionsInfo, PointConfig, SectionInfo, SectionPlaybackInfo, SectionPlaybackPackedInfo,
+                    TrainTraceInfo, YardPerformanceInfo, TorpedoPerformanceInfo, EventInfo, TrailThroughInfo, TrailThroughPlayback]
+OUTPUT_MODEL_LIST = BENCH_MODEL_LIST[2:] #tables written by the targets
+
+
+class StubMessage: #paho MQTTMessage fields read by SCC handlers
+    def __init__(self, topic, payload):
+        self.topic = topic
+        self.payload = payload
+
+
+class StubMqttClient: #in-process MQTT client, published messages are counted, subscribed handlers are called by deliver
+    def __init__(self):
+        self.handler_dict = {}
+        self.published = {} #topic -> messages
+
+    def connect(self):
+        pass
+
+    def sub(self, topic, handler_fn):
+        self.handler_dict[topic] = handler_fn
+
+    def pub(self, topic, msg):
+        self.published[topic] = self.published.get(topic, 0) + 1
+
+    def deliver(self, topic, payload):
+        self.handler_dict[topic](self, None, StubMessage(topic, payload))
+
+
+class Workload: #layout, point configuration and frames of one benchmark run
+    def __init__(self, source, layout_list, point_list, frame_list):
+        self.source = source
+        self.layout_list = layout_list #layout_section_connections rows as dicts
+        self.point_list = point_list #pms_config rows as dicts
+        self.frame_list = frame_list #{"ts": ..., "sections": [...]} dicts
+        self.payload_list = [json.dumps(frame).encode() for frame in frame_list] #sem/section_info payloads
+        self.section_frame_list = [SectionFrame.from_payload(payload) for payload in self.payload_list]
+
+    def total_sections(self):
+        return len(self.frame_list[0]["sections"]) if len(self.frame_list) != 0 else 0
+
+
+def synthetic_workload(total_sections, total_frames, changes_per_frame, point_step): #circular yard, trains move 4 axles per change
+    layout_list = []
+    point_list = []
+    for section_idx in range(total_sections):
+        section_id = "S" + str(section_idx + 1)
+        branch_id = "S" + str((section_idx + total_sections // 2) % total_sections + 1)
+        point = section_idx % point_step == 0 #point diverges on left or right side, alternately
+        layout_list.append({
+            "section_id": section_id,
+            "left_normal": "S" + str((section_idx - 1) % total_sections + 1),
+            "right_normal": "S" + str((section_idx + 1) % total_sections + 1),
+            "left_reverse": branch_id if point and (section_idx // point_step) % 2 == 0 else "NONE",
+            "right_reverse": branch_id if point and (section_idx // point_step) % 2 == 1 else "NONE"})
+        if point:
+            point_list.append({"section_id": section_id, "point_id": "P" + section_id})
+
+    section_dict = {}
+    for layout in layout_list:
+        section_dict[layout["section_id"]] = {
+            "section_id": layout["section_id"],
+            "section_status": "cleared",
+            "engine_axle_count": 0,
+            "torpedo_axle_count": 0,
+            "direction": "none",
+            "speed": 0,
+            "torpedo_status": "none",
+            "first_axle": "none",
+            "error_code": 0}
+
+    frame_list = []
+    for frame_idx in range(total_frames):
+        for section_id in random.sample(list(section_dict), min(changes_per_frame, total_sections)):
+            section = section_dict[section_id]
+            torpedo_axle_count = (section["torpedo_axle_count"] + 4) % 20 #0, 4, 8, 12, 16: entry, train trace and exit records
+            section["torpedo_axle_count"] = torpedo_axle_count
+            section["engine_axle_count"] = 4 if torpedo_axle_count != 0 else 0
+            section["section_status"] = "occupied" if torpedo_axle_count != 0 else "cleared"
+            section["direction"] = "in" if torpedo_axle_count != 0 else "out"
+            section["speed"] = round(random.uniform(0, 25), 2)
+            section["torpedo_status"] = "loaded" if torpedo_axle_count >= 8 else "none"
+            section["first_axle"] = "engine" if torpedo_axle_count != 0 else "none"
+        frame_list.append({"ts": SYNTHETIC_TS + frame_idx, "sections": [dict(section) for section in section_dict.values()]})
+    return Workload(f'synthetic:{total_sections}', layout_list, point_list, frame_list)
+
+
+def export_day(day, export_file): #write layout, points and section_playback frames of a UTC day YYYY-MM-DD from scc.conf database
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    scc_api = SccAPI()
+    database = scc_api.connect_database(scc_cfg)
+    packed = scc_api.playback_encoder is not None
+    keyframe_interval_s = scc_api.playback_encoder.keyframe_interval if packed else DEFAULT_KEYFRAME_INTERVAL_S
+    start_ts = datetime.strptime(day, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp()
+
+    total_frames = 0
+    with database.connection_context(), open(export_file, "w") as out_file:
+        out_file.write(json.dumps({
+            "layout": list(LayoutSectionConnectionsInfo.select(
+                LayoutSectionConnectionsInfo.section_id, LayoutSectionConnectionsInfo.left_normal,
+                LayoutSectionConnectionsInfo.right_normal, LayoutSectionConnectionsInfo.left_reverse,
+                LayoutSectionConnectionsInfo.right_reverse).dicts()),
+            "points": list(PointConfig.select(PointConfig.section_id, PointConfig.point_id).dicts())}) + "\n")
+        for ts, sections in read_playback(start_ts, start_ts + 86400, packed=packed, keyframe_interval_s=keyframe_interval_s):
+            out_file.write(json.dumps({"ts": ts, "sections": sections}) + "\n")
+            total_frames += 1
+    return total_frames
+
+
+def replay_workload(export_file, max_frames): #workload of an export_day file, first max_frames frames if max_frames is not 0
+    frame_list = []
+    with open(export_file) as in_file:
+        header = json.loads(in_file.readline())
+        for line in in_file:
+            frame_list.append(json.loads(line))
+            if max_frames != 0 and len(frame_list) >= max_frames:
+                break
+    return Workload(os.path.basename(export_file), header["layout"], header["points"], frame_list)
+
+
+def point_info_payloads(workload): #pms/point_info of every point, random status and mode as seen during a shift
+    return [json.dumps({
+        "ts": SYNTHETIC_TS,
+        "point_id": point["point_id"],
+        "point_status": random.choice(["normal", "reverse", "fault"]),
+        "point_mode": random.choice(["auto", "manual"]),
+        "error_code": "0"}).encode() for point in workload.point_list]
+
+
+def open_database(db_kind, sqlite_file, pg_db): #bind models to benchmark database, returns it and whether playback is packed
+    if db_kind == DB_SQLITE: #JSONField of section_playback is PostgreSQL only, SQLite stores packed records
+        return bind_db(SqliteDatabase(sqlite_file)), True
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    if scc_cfg.json_data["DATABASE"]["DB_NAME"] == pg_db: #tables of benchmark database are emptied
+        raise ValueError(f'{pg_db} is the database of scc.conf, use a separate database for the benchmark')
+    scc_cfg.json_data["DATABASE"]["DB_NAME"] = pg_db
+    packed = scc_cfg.json_data.get("PLAYBACK", {}).get("FORMAT", PLAYBACK_FORMAT_JSON) == PLAYBACK_FORMAT_PACKED
+    return SccAPI().connect_database(scc_cfg), packed
+
+
+def load_database(database, workload): #create benchmark tables and store layout and points of workload
+    if isinstance(database, SqliteDatabase): #BRIN indexes are PostgreSQL only, benchmark tables hold benchmark rows only
+        for model in BENCH_MODEL_LIST:
+            model._schema.create_table(safe=True)
+    else:
+        database.create_tables(BENCH_MODEL_LIST)
+    for model in BENCH_MODEL_LIST:
+        model.delete().execute()
+    with database.atomic():
+        for row_idx in range(0, len(workload.layout_list), INSERT_BATCH_ROWS):
+            LayoutSectionConnectionsInfo.insert_many(workload.layout_list[row_idx:row_idx + INSERT_BATCH_ROWS]).execute()
+        for row_idx in range(0, len(workload.point_list), INSERT_BATCH_ROWS):
+            PointConfig.insert_many(workload.point_list[row_idx:row_idx + INSERT_BATCH_ROWS]).execute()
+
+
+def clear_output_tables():
+    for model in OUTPUT_MODEL_LIST:
+        model.delete().execute()
+
+
+class Runner: #builds fresh objects of the SCC code under test for each pass
+    def __init__(self, workload, packed_playback, point_payload_list):
+        self.workload = workload
+        self.packed_playback = packed_playback
+        self.point_payload_list = point_payload_list
+        self.mqtt_client = None
+        self.scc_server = None
+
+    def new_api(self): #SccAPI as set up by main.py
+        scc_api = SccAPI()
+        if self.packed_playback:
+            scc_api.playback_encoder = PlaybackEncoder(DEFAULT_KEYFRAME_INTERVAL_S)
+        scc_api.init_section_connections_info()
+        scc_api.init_train_trace_info()
+        return scc_api
+
+    def new_server(self): #Sccserver without lanes or persistence queue, every stage runs in the callback
+        self.mqtt_client = StubMqttClient()
+        scc_main.scc_api = self.new_api() #inserts of persist stage go through the module level SccAPI of main.py
+        self.scc_server = scc_main.Sccserver(self.mqtt_client, persistence_queue=None, forward_section_info=True)
+        self.scc_server.load_point_config()
+        self.mqtt_client.sub("pms/point_info", self.scc_server.point_info_sub_fn)
+        self.mqtt_client.sub("sem/section_info", self.scc_server.evaluator_section_info_sub_fn)
+        for payload in self.point_payload_list:
+            self.mqtt_client.deliver("pms/point_info", payload)
+        return self.scc_server
+
+    def target(self, target_name): #return (call_fn, input list) of target, call_fn(item) handles one frame
+        if target_name == TARGET_EVALUATOR:
+            self.new_server()
+            mqtt_client = self.mqtt_client
+            return lambda payload: mqtt_client.deliver("sem/section_info", payload), self.workload.payload_list
+
+        if target_name == TARGET_DETECT:
+            scc_server = self.new_server() #trail through detector and point registry as built by Sccserver
+            scc_tt = scc_server.scc_tt
+            point_obj_list = scc_server.point_obj_list
+            return lambda frame: scc_tt.detect_trail_through(frame, point_obj_list), self.workload.section_frame_list
+
+        scc_api = self.new_api()
+        if target_name == TARGET_TRAIN_TRACE:
+            return scc_api.insert_train_trace_info, self.workload.section_frame_list
+        return scc_api.yard_performance, self.workload.section_frame_list
+
+
+def time_target(runner, target_name): #frames/s and per frame latency histogram of one pass over all frames
+    clear_output_tables()
+    call_fn, item_list = runner.target(target_name)
+    latency = LatencyHistogram()
+    run_start = time.perf_counter()
+    for item in item_list:
+        call_start = time.perf_counter()
+        call_fn(item)
+        latency.record(time.perf_counter() - call_start)
+    run_secs = time.perf_counter() - run_start
+    return len(item_list) / run_secs if run_secs > 0 else 0.0, latency
+
+
+def alloc_target(runner, target_name, alloc_frames): #mean peak KiB allocated within one frame, blocks left allocated per frame
+    clear_output_tables()
+    call_fn, item_list = runner.target(target_name)
+    item_list = item_list[:alloc_frames]
+    peak_bytes = 0
+    tracemalloc.start()
+    blocks_before = sys.getallocatedblocks()
+    for item in item_list:
+        tracemalloc.reset_peak()
+        current_before = tracemalloc.get_traced_memory()[0]
+        call_fn(item)
+        peak_bytes += tracemalloc.get_traced_memory()[1] - current_before
+    blocks_after = sys.getallocatedblocks()
+    tracemalloc.stop()
+    return peak_bytes / len(item_list) / 1024, (blocks_after - blocks_before) / len(item_list)
+
+
+def version_label(): #git revision of source tree, "unknown" outside a checkout
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True, timeout=10,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or "unknown"
+    except Exception:
+        return "unknown"
+
+
+def previous_result(results_file, workload_key): #last stored result of the same workload, None if there is none
+    previous = None
+    if os.path.exists(results_file):
+        with open(results_file) as in_file:
+            for line in in_file:
+                record = json.loads(line)
+                if record.get("workload") == workload_key:
+                    previous = record
+    return previous
+
+
+def change_text(new_value, old_value): #relative change in percent
+    if not old_value:
+        return "     n/a"
+    return f'{(new_value - old_value) / old_value * 100:+7.1f}%'
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="replay benchmark of evaluator, trail through, train trace and yard performance")
+    parser.add_argument("--export", metavar="FILE", help="write layout, points and section_playback of --day to FILE and exit")
+    parser.add_argument("--day", help="UTC day YYYY-MM-DD of section_playback to export")
+    parser.add_argument("--replay", metavar="FILE", help="replay frames of an --export FILE instead of synthetic frames")
+    parser.add_argument("--sections", type=int, default=22, help="sections of synthetic yard")
+    parser.add_argument("--frames", type=int, default=2000, help="synthetic frames, or first frames of --replay (0 is all)")
+    parser.add_argument("--changes", type=int, default=2, help="sections changing per synthetic frame")
+    parser.add_argument("--point-step", type=int, default=4, help="every n-th synthetic section has a point")
+    parser.add_argument("--db", choices=[DB_SQLITE, DB_POSTGRES], default=DB_SQLITE)
+    parser.add_argument("--sqlite-file", help="SQLite database file, a temporary file by default")
+    parser.add_argument("--pg-db", default=DEFAULT_PG_DB, help="local PostgreSQL database of --db postgres, never the scc.conf one")
+    parser.add_argument("--targets", nargs="+", choices=TARGET_LIST, default=TARGET_LIST)
+    parser.add_argument("--alloc-frames", type=int, default=DEFAULT_ALLOC_FRAMES, help="frames replayed under tracemalloc, 0 skips it")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="results file, one JSON line per run")
+    parser.add_argument("--label", help="version label of stored result, git describe by default")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel(args.log_level)
+
+    if args.export:
+        if not args.day:
+            parser.error("--export needs --day")
+        print(f'{args.export}: {export_day(args.day, args.export)} frames of {args.day}')
+        sys.exit(0)
+
+    random.seed(1)
+    if args.replay:
+        workload = replay_workload(args.replay, args.frames)
+    else:
+        workload = synthetic_workload(args.sections, args.frames, args.changes, args.point_step)
+    point_payload_list = point_info_payloads(workload)
+
+    sqlite_file = None
+    if args.db == DB_SQLITE:
+        sqlite_file = args.sqlite_file or tempfile.NamedTemporaryFile(suffix=".sqlite", delete=False).name
+    database, packed_playback = open_database(args.db, sqlite_file, args.pg_db)
+    load_database(database, workload)
+    runner = Runner(workload, packed_playback, point_payload_list)
+
+    workload_key = f'{workload.source}|frames={len(workload.frame_list)}|changes={args.changes}|db={args.db}'
+    result = {
+        "ts": time.time(),
+        "label": args.label or version_label(),
+        "workload": workload_key,
+        "python": platform.python_version(),
+        "targets": {}}
+    previous = previous_result(args.results, workload_key)
+
+    print(f'workload: {workload_key}, sections: {workload.total_sections()}, points: {len(workload.point_list)}')
+    if previous is not None:
+        print(f'compared with: {previous["label"]} ({datetime.fromtimestamp(previous["ts"]).isoformat(timespec="seconds")})')
+    print(f'{"target":24s} {"frames/s":>10s} {"p50 ms":>9s} {"p99 ms":>9s} {"KiB/frame":>10s} {"blocks/frame":>12s}'
+          f'{"  frames/s   p99" if previous is not None else ""}')
+    for target_name in args.targets:
+        frames_per_s, latency = time_target(runner, target_name)
+        summary = latency.summary()
+        stage_dict = None
+        if target_name == TARGET_EVALUATOR: #stage histograms of the timed pass are kept by Sccserver
+            scc_server = runner.scc_server
+            stage_dict = {stage: histogram.summary() for stage, histogram in [
+                ("parse", scc_server.parse_latency), ("persist", scc_server.persist_latency),
+                ("detect", scc_server.detect_latency), ("publish", scc_server.publish_latency)]}
+            alerts = runner.mqtt_client.published.get("scc/trail_through", 0)
+        target_result = {
+            "frames_per_s": round(frames_per_s, 1),
+            "p50_ms": summary["p50_ms"],
+            "p99_ms": summary["p99_ms"]}
+        alloc_text = f'{"-":>10s} {"-":>12s}'
+        if args.alloc_frames > 0:
+            alloc_kib, retained_blocks = alloc_target(runner, target_name, args.alloc_frames)
+            target_result["alloc_kib_per_frame"] = round(alloc_kib, 3)
+            target_result["retained_blocks_per_frame"] = round(retained_blocks, 3)
+            alloc_text = f'{alloc_kib:10.2f} {retained_blocks:12.2f}'
+        if stage_dict is not None:
+            target_result["alerts"] = alerts
+            target_result["stages"] = {stage: {"p50_ms": stage_summary["p50_ms"], "p99_ms": stage_summary["p99_ms"]}
+                                       for stage, stage_summary in stage_dict.items()}
+        result["targets"][target_name] = target_result
+
+        line = f'{target_name:24s} {frames_per_s:10.1f} {summary["p50_ms"]:9.3f} {summary["p99_ms"]:9.3f} {alloc_text}'
+        previous_target = previous["targets"].get(target_name) if previous is not None else None
+        if previous_target is not None:
+            line += f' {change_text(frames_per_s, previous_target["frames_per_s"])} {change_text(summary["p99_ms"], previous_target["p99_ms"])}'
+        print(line)
+        if stage_dict is not None:
+            print('  ' + ', '.join(f'{stage} p50 {stage_summary["p50_ms"]:.3f} p99 {stage_summary["p99_ms"]:.3f} ms'
+                                   for stage, stage_summary in stage_dict.items()) + f', alerts: {alerts}')
+
+    with open(args.results, "a") as out_file:
+        out_file.write(json.dumps(result) + "\n")
+    print(f'result stored in {args.results} as {result["label"]}')
+
+    database.close()
+    if sqlite_file is not None and args.sqlite_file is None:
+        os.remove(sqlite_file)
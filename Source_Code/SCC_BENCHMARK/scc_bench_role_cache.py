@@ -0,0 +1,86 @@
+'''
+*****************************************************************************
+*File : scc_bench_role_cache.py
+*Module : SCC
+*Purpose : Benchmark reset command role check latency with and without user role cache
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import argparse
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from scc_dlm_model import *
+from scc_dlm_api import *
+from scc_role_cache import *
+sys.path.insert(1, "./common")
+
+BENCH_USER_PREFIX = "scc_bench_user_" #benchmark users are deleted afterwards
+ADMIN_ROLE_LIST = ["Command Center Admin", "Admin"]
+
+
+def create_bench_users(total_users): #insert benchmark users into user_details table
+    for user_idx in range(total_users):
+        OccUserInfo.create(username=BENCH_USER_PREFIX + str(user_idx), password="none", email="none",
+                           firstname="bench", roles=["Admin"])
+
+
+def delete_bench_users():
+    OccUserInfo.delete().where(OccUserInfo.username.startswith(BENCH_USER_PREFIX)).execute()
+
+
+def make_reset_burst(total_cmds, total_users): #cwsm/section_reset payloads, users take turns
+    return [json.dumps({"username": BENCH_USER_PREFIX + str(cmd_idx % total_users), "section_id": "S1",
+                        "section_name": "S1"}) for cmd_idx in range(total_cmds)]
+
+
+def bench(get_user_roles, burst): #per command seconds of payload decode and role check, as done by cwsm_section_reset_sub_fn
+    latency_list = []
+    for payload in burst:
+        ts_start = time.perf_counter()
+        reset_msg = json.loads(payload)
+        user_roles = get_user_roles(reset_msg["username"])
+        assert user_roles is not None and any(role in ADMIN_ROLE_LIST for role in user_roles)
+        latency_list.append(time.perf_counter() - ts_start)
+    latency_list.sort()
+    return latency_list
+
+
+def print_latency(name, latency_list):
+    p50 = latency_list[len(latency_list) // 2] * 1000000
+    p99 = latency_list[int(len(latency_list) * 0.99)] * 1000000
+    print(f'{name:12s}: p50 {p50:10.1f} us  p99 {p99:10.1f} us  total {sum(latency_list) * 1000:10.1f} ms')
+
+
+if __name__ == '__main__':
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel("WARNING") #get_user_roles logs every lookup
+
+    parser = argparse.ArgumentParser(description="user role cache benchmark")
+    parser.add_argument("--commands", type=int, default=1000, help="reset commands in burst")
+    parser.add_argument("--users", type=int, default=5, help="operators sending resets")
+    parser.add_argument("--ttl", type=int, default=DEFAULT_TTL_S)
+    args = parser.parse_args()
+
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    scc_api = SccAPI()
+    scc_api.connect_database(scc_cfg) #binds models to pooled database
+    delete_bench_users()
+    create_bench_users(args.users)
+    burst = make_reset_burst(args.commands, args.users)
+
+    role_cache = UserRoleCache(scc_api, ttl_s=args.ttl)
+    print(f'commands: {args.commands}, users: {args.users}, ttl: {args.ttl}s')
+    print_latency("no cache", bench(scc_api.get_user_roles, burst))
+    print_latency("role cache", bench(role_cache.get_user_roles, burst))
+    print(f'role cache stats: {role_cache.get_stats()}')
+    delete_bench_users()
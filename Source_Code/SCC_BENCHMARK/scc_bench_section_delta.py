@@ -0,0 +1,85 @@
+'''
+*****************************************************************************
+*File : scc_bench_section_delta.py
+*Module : SCC
+*Purpose : Benchmark bytes and client parse cost of occ/section_delta against full occ/section_info frames
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import random
+import argparse
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_delta_publish import *
+from scc_bench_frame_delta import make_changing_frames
+sys.path.insert(1, "./common")
+
+
+class RecordingClient: #MQTT client stand-in, keeps published payloads
+    def __init__(self):
+        self.msg_list = []
+
+    def pub(self, topic, json_msg):
+        self.msg_list.append(json_msg)
+
+
+def run(frame_list, frames_per_delta): #publish frames_per_delta frames per coalesced delta, returns payloads
+    recording_client = RecordingClient()
+    publisher = SectionDeltaPublisher(recording_client, keyframe_interval_s=3600)
+    for frame_idx, frame in enumerate(frame_list):
+        publisher.put(frame)
+        if (frame_idx + 1) % frames_per_delta == 0:
+            publisher.flush()
+    publisher.flush()
+    return recording_client.msg_list
+
+
+def parse_full(frame_list): #seconds OCC spends decoding every full frame
+    ts_start = time.perf_counter()
+    for frame in frame_list:
+        json.loads(frame.payload)
+    return time.perf_counter() - ts_start
+
+
+def parse_delta(msg_list): #seconds OCC spends applying every delta message, and the rebuilt section table
+    client = SectionDeltaClient()
+    ts_start = time.perf_counter()
+    for json_msg in msg_list:
+        assert client.apply(json_msg)
+    return time.perf_counter() - ts_start, client.sections
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="occ/section_delta publish benchmark")
+    parser.add_argument("--sections", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=40)
+    parser.add_argument("--changes", type=int, nargs="+", default=[1, 10, 100, 1000], help="changed sections per frame")
+    parser.add_argument("--coalesce", type=int, default=1, help="frames per published delta")
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel("WARNING")
+
+    print(f'sections: {args.sections}, frames: {args.frames}, frames per delta: {args.coalesce}')
+    for changes_per_frame in args.changes:
+        random.seed(1)
+        frame_list = make_changing_frames(args.frames, args.sections, changes_per_frame)
+        msg_list = run(frame_list, args.coalesce)
+        full_bytes = sum(len(frame.payload) for frame in frame_list[1:])
+        delta_bytes = sum(len(json_msg) for json_msg in msg_list[1:]) #first message is the initial keyframe
+        full_secs = parse_full(frame_list[1:])
+        delta_secs, section_dict = parse_delta(msg_list)
+        identical = section_dict == {section["section_id"]: section for section in frame_list[-1].section_dicts()}
+        frames = len(frame_list) - 1
+        print(f'changes/frame: {changes_per_frame:6d}  bytes/frame full: {full_bytes / frames:10.0f}'
+              f'  delta: {delta_bytes / frames:10.0f}  parse ms/frame full: {full_secs / frames * 1000:8.3f}'
+              f'  delta: {delta_secs / frames * 1000:8.3f}  client table identical: {identical}')
@@ -0,0 +1,103 @@
+'''
+*****************************************************************************
+*File : scc_bench_snapshot.py
+*Module : SCC
+*Purpose : Benchmark occ/section_info snapshot encoding, per tick dicts and json.dumps against SnapshotSerializer
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import random
+import argparse
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_snapshot import *
+sys.path.insert(1, "./common")
+
+
+class BenchSection: #published fields of main.py Section
+    __slots__ = SectionState._fields
+
+    def __init__(self, section_id):
+        self.section_id = section_id
+        self.section_status = "cleared"
+        self.engine_axle_count = 0
+        self.torpedo_axle_count = 0
+        self.direction = "none"
+        self.speed = 10
+        self.torpedo_status = "loaded"
+        self.first_axle = "torpedo"
+        self.error_code = 0
+
+
+def legacy_snapshot(section_obj_list): #Sccserver.construct_section_json_msg before snapshot serializer, parsed again by both inserts
+    section_msg_list = []
+    for section_obj in section_obj_list:
+        section_msg = {
+            "section_id": section_obj.section_id,
+            "section_status": section_obj.section_status,
+            "engine_axle_count": section_obj.engine_axle_count,
+            "torpedo_axle_count": section_obj.torpedo_axle_count,
+            "direction": section_obj.direction,
+            "speed": section_obj.speed,
+            "torpedo_status": section_obj.torpedo_status,
+            "first_axle": section_obj.first_axle,
+            "error_code": section_obj.error_code}
+        section_msg_list.append(section_msg)
+    json_msg = json.dumps({"ts": time.time(), "sections": section_msg_list}, indent=0)
+    section_frame(json_msg) #insert_section_info
+    section_frame(json_msg) #insert_section_playback_info
+    return json_msg
+
+
+def change_sections(section_obj_list, changes_per_tick):
+    for section_obj in random.sample(section_obj_list, changes_per_tick):
+        section_obj.section_status = random.choice(["occupied", "cleared"])
+        section_obj.torpedo_axle_count = random.randint(0, 8)
+        section_obj.direction = random.choice(["in", "out"])
+
+
+def bench(name, total_sections, total_ticks, changes_per_tick, snapshot_fn):
+    random.seed(1)
+    section_obj_list = [BenchSection("S" + str(section_idx + 1)) for section_idx in range(total_sections)]
+    snapshot_fn(section_obj_list) #first snapshot encodes every section
+    payload_bytes = 0
+    ts_start = time.perf_counter()
+    for tick_idx in range(total_ticks):
+        change_sections(section_obj_list, changes_per_tick)
+        payload_bytes += len(snapshot_fn(section_obj_list))
+    secs = time.perf_counter() - ts_start
+    print(f'{name:16s}: {secs / total_ticks * 1000:9.3f} ms/tick  {payload_bytes / total_ticks:10.0f} bytes/tick')
+    return json.loads(snapshot_fn(section_obj_list))["sections"]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="occ/section_info snapshot encoding benchmark")
+    parser.add_argument("--sections", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--changed", type=float, default=0.01, help="fraction of sections changed per tick")
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+
+    print(f'orjson: {orjson_available()}')
+    for total_sections in args.sections:
+        changes_per_tick = max(1, int(total_sections * args.changed))
+        print(f'sections: {total_sections}, changed/tick: {changes_per_tick}')
+        legacy_sections = bench("dicts + dumps", total_sections, args.ticks, changes_per_tick, legacy_snapshot)
+        result_list = []
+        for json_backend in [JSON_BACKEND_STD, JSON_BACKEND_ORJSON]:
+            if json_backend == JSON_BACKEND_ORJSON and not orjson_available():
+                continue
+            serializer = SnapshotSerializer(json_backend)
+            result_list.append(bench("snapshot " + json_backend, total_sections, args.ticks, changes_per_tick,
+                                     lambda section_obj_list: serializer.frame(section_obj_list, time.time()).payload))
+        print(f'sections identical: {all(sections == legacy_sections for sections in result_list)}')
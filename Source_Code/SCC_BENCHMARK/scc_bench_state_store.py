@@ -0,0 +1,117 @@
+'''
+*****************************************************************************
+*File : scc_bench_state_store.py
+*Module : SCC
+*Purpose : Benchmark memory and scan throughput of section state storage
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import argparse
+import tracemalloc
+
+'''Import SCC packages '''
+from scc_section_frame import *
+sys.path.insert(1, "./common")
+
+SECTION_FIELD_LIST = ["section_id", "left_normal", "right_normal", "left_reverse", "right_reverse",
+                      "engine_axle_count", "torpedo_axle_count", "section_status", "point_id",
+                      "point_status", "point_mode", "point_error", "torpedo_status", "direction",
+                      "speed", "first_axle", "error_code"] #same fields as Sec of scc_trail_through.py
+
+
+class DictSec: #section record with per-instance __dict__ (previous layout)
+    def __init__(self):
+        for field in SECTION_FIELD_LIST:
+            setattr(self, field, "none")
+
+
+class SlotSec: #section record with __slots__
+    __slots__ = tuple(SECTION_FIELD_LIST)
+
+    def __init__(self):
+        for field in SECTION_FIELD_LIST:
+            setattr(self, field, "none")
+
+
+def make_frame(total_sections, frame_idx): #synthetic section frame
+    sections = []
+    for section_idx in range(total_sections):
+        torpedo_axle_count = (frame_idx + section_idx) % 17
+        sections.append({
+            "section_id": "S" + str(section_idx + 1),
+            "section_status": "occupied" if torpedo_axle_count != 0 else "cleared",
+            "engine_axle_count": 0,
+            "torpedo_axle_count": torpedo_axle_count,
+            "direction": "in" if (frame_idx + section_idx) % 40 < 20 else "out",
+            "speed": 10,
+            "torpedo_status": "loaded",
+            "first_axle": "torpedo",
+            "error_code": 0})
+    return SectionFrame.from_dict({"ts": float(frame_idx), "sections": sections})
+
+
+def build_records(record_cls, frame): #record objects filled from frame
+    record_list = []
+    for section in frame.sections:
+        record = record_cls()
+        record.section_id = section.section_id
+        record.section_status = section.section_status
+        record.direction = section.direction
+        record.torpedo_axle_count = section.torpedo_axle_count
+        record.engine_axle_count = section.engine_axle_count
+        record.torpedo_status = section.torpedo_status
+        record.speed = section.speed
+        record.error_code = section.error_code
+        record_list.append(record)
+    return record_list
+
+
+def measure_memory(build_fn, frame): #bytes allocated while building state store
+    tracemalloc.start()
+    store = build_fn(frame)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, allocated
+
+
+def scan_records(record_list): #count occupied sections moving out
+    occupied_out = 0
+    for record in record_list:
+        if record.section_status == "occupied" and record.direction == "out":
+            occupied_out += 1
+    return occupied_out
+
+
+def time_it(fn, arg, repeat): #scans per second
+    ts_start = time.perf_counter()
+    for repeat_idx in range(repeat):
+        fn(arg)
+    return repeat / (time.perf_counter() - ts_start)
+
+
+def bench(total_sections, repeat):
+    frame = make_frame(total_sections, 0)
+    dict_records, dict_bytes = measure_memory(lambda f: build_records(DictSec, f), frame)
+    slot_records, slot_bytes = measure_memory(lambda f: build_records(SlotSec, f), frame)
+
+    assert scan_records(dict_records) == scan_records(slot_records)
+
+    print(f'sections: {total_sections}')
+    print(f'  bytes/section   dict: {dict_bytes / total_sections:8.1f}  slots: {slot_bytes / total_sections:8.1f}')
+    print(f'  scans/s         dict: {time_it(scan_records, dict_records, repeat):8.1f}'
+          f'  slots: {time_it(scan_records, slot_records, repeat):8.1f}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="section state storage benchmark")
+    parser.add_argument("--sections", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    for total_sections in args.sections:
+        bench(total_sections, args.repeat)
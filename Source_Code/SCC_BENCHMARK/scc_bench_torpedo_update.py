@@ -0,0 +1,86 @@
+'''
+*****************************************************************************
+*File : scc_bench_torpedo_update.py
+*Module : SCC
+*Purpose : Benchmark yard performance update by torpedo_id at 10M rows, without and with torpedo_id index
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import random
+import argparse
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from peewee import *
+from scc_dlm_model import *
+from scc_db_pool import *
+sys.path.insert(1, "./common")
+
+
+class BenchYardPerformanceInfo(YardPerformanceInfo):
+    '''copy of yard_performance table, dropped afterwards'''
+    class Meta:
+        table_name = "scc_bench_yard_performance"
+
+
+def fill_table(total_rows): #one record per torpedo, filled by the server in a single statement
+    database = get_database()
+    BenchYardPerformanceInfo._schema.create_table(safe=False) #table only, torpedo_id index is created later
+    database.execute_sql(
+        f'INSERT INTO "{BenchYardPerformanceInfo._meta.table_name}" (engine_id, torpedo_id, entry_ts) '
+        f"SELECT 'E' || (g % 50), 'T' || g, g FROM generate_series(1, %s) g", (total_rows,))
+    database.execute_sql(f'ANALYZE "{BenchYardPerformanceInfo._meta.table_name}"')
+
+
+def update_train_exit_info(torpedo_id, exit_time): #same query as SccAPI.update_train_exit_info
+    yard_perf_table = BenchYardPerformanceInfo.select().where(BenchYardPerformanceInfo.torpedo_id == torpedo_id).get()
+    yard_perf_table.exit_ts = exit_time
+    yard_perf_table.save()
+
+
+def bench(name, total_rows, total_updates):
+    latency_list = []
+    for update_idx in range(total_updates):
+        torpedo_id = "T" + str(random.randint(1, total_rows))
+        ts_start = time.perf_counter()
+        update_train_exit_info(torpedo_id, time.time())
+        latency_list.append(time.perf_counter() - ts_start)
+    latency_list.sort()
+    p50 = latency_list[len(latency_list) // 2] * 1000
+    p99 = latency_list[int(len(latency_list) * 0.99)] * 1000
+    print(f'{name:12s}: {total_updates:6d} updates  p50 {p50:10.3f} ms  p99 {p99:10.3f} ms')
+
+
+if __name__ == '__main__':
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="yard performance update latency without and with torpedo_id index")
+    parser.add_argument("--rows", type=int, default=10000000)
+    parser.add_argument("--updates-no-index", type=int, default=20, help="each update scans the whole table")
+    parser.add_argument("--updates", type=int, default=1000)
+    args = parser.parse_args()
+
+    scc_cfg = SccDlmConfRead()
+    scc_cfg.read_cfg('../config/scc.conf')
+    database = init_db(scc_cfg)
+
+    with database.connection_context():
+        ts_start = time.time()
+        fill_table(args.rows)
+        print(f'rows: {args.rows}, filled in {time.time() - ts_start:.1f}s')
+        try:
+            bench("no index", args.rows, args.updates_no_index)
+            ts_start = time.time()
+            BenchYardPerformanceInfo._schema.create_indexes(safe=True)
+            database.execute_sql(f'ANALYZE "{BenchYardPerformanceInfo._meta.table_name}"')
+            print(f'torpedo_id index created in {time.time() - ts_start:.1f}s')
+            bench("index", args.rows, args.updates)
+        finally:
+            BenchYardPerformanceInfo.drop_table(safe=True)
@@ -0,0 +1,143 @@
+'''
+*****************************************************************************
+*File : scc_bench_tt_vector.py
+*Module : SCC
+*Purpose : Benchmark vectorised trail through rule evaluation against the rule by rule loop
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_trail_through import *
+sys.path.insert(1, "./common")
+
+POINT_SECTION_STEP = 4 #default, every 4th section of synthetic layout has a point
+
+
+def make_layout(total_sections, point_step): #synthetic circular layout, section connections and point records
+    section_connections_list = []
+    point_config_list = []
+    for section_idx in range(total_sections):
+        section_id = "S" + str(section_idx + 1)
+        prev_id = "S" + str((section_idx - 1) % total_sections + 1)
+        next_id = "S" + str((section_idx + 1) % total_sections + 1)
+        branch_id = "S" + str((section_idx + total_sections // 2) % total_sections + 1)
+        left_reverse = "NONE"
+        right_reverse = "NONE"
+
+        if section_idx % point_step == 0: #point diverges on left or right side, alternately
+            point_config_list.append(SimpleNamespace(section_id=section_id, point_id="P" + section_id))
+            if (section_idx // point_step) % 2 == 0:
+                left_reverse = branch_id
+            else:
+                right_reverse = branch_id
+        section_connections_list.append(SimpleNamespace(
+            section_id=section_id, left_normal=prev_id, right_normal=next_id,
+            left_reverse=left_reverse, right_reverse=right_reverse))
+    return section_connections_list, point_config_list
+
+
+def make_frames(total_frames, total_sections): #synthetic section frames
+    frame_list = []
+    for frame_idx in range(total_frames):
+        sections = []
+        for section_idx in range(total_sections):
+            sections.append({
+                "section_id": "S" + str(section_idx + 1),
+                "section_status": random.choice(["occupied", "cleared"]),
+                "engine_axle_count": 0,
+                "torpedo_axle_count": random.randint(0, 4),
+                "direction": random.choice(["in", "out"]),
+                "speed": 10,
+                "torpedo_status": "loaded",
+                "first_axle": "torpedo",
+                "error_code": 0})
+        frame_list.append(SectionFrame.from_dict({"ts": float(frame_idx), "sections": sections}))
+    return frame_list
+
+
+def make_points(point_config_list): #point objects with random status and mode
+    return [SimpleNamespace(point_id=point.point_id,
+                            point_status=random.choice(["normal", "reverse", "fault"]),
+                            point_mode=random.choice(["auto", "manual"])) for point in point_config_list]
+
+
+def run(tt, layout, frame_list, point_obj_list, vectorised): #detect trail through over all frames, returns results and seconds
+    tt.vectorised = vectorised #TRAIL_THROUGH.VECTORISED
+    tt.load_topology(layout[0], layout[1])
+    tt.prev_section_list = {}
+
+    result_list = []
+    ts_start = time.perf_counter()
+    for frame in frame_list:
+        result_list.append(tt.detect_trail_through(frame, point_obj_list))
+    return result_list, time.perf_counter() - ts_start
+
+
+def run_predicate(tt, frame_list): #time of trail through rule evaluation only, state already loaded by run()
+    scalar_secs = 0.0
+    vector_secs = 0.0
+    prev_frame = frame_list[0]
+    prev_frame_arrays = tt.tt_vector.load_frame(prev_frame)
+    for frame in frame_list[1:]:
+        frame_arrays = tt.tt_vector.load_frame(frame)
+        for section in frame.sections: #scalar loop reads section state from tt_sec_obj_list
+            sec_obj = tt.tt_sec_obj_list[tt.topology.section_index[section.section_id]]
+            sec_obj.section_status = section.section_status
+            sec_obj.direction = section.direction
+        tt.prev_section_list = prev_frame.section_index
+
+        ts_start = time.perf_counter()
+        scalar_result = tt.find_trail_through_sections(frame.section_index)
+        scalar_secs += time.perf_counter() - ts_start
+
+        ts_start = time.perf_counter()
+        vector_result = tt.tt_vector.detect(frame_arrays, prev_frame_arrays)
+        vector_secs += time.perf_counter() - ts_start
+
+        assert scalar_result == vector_result
+        prev_frame = frame
+        prev_frame_arrays = frame_arrays
+    return scalar_secs, vector_secs
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="trail through detection benchmark")
+    parser.add_argument("--sections", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--point-step", type=int, default=POINT_SECTION_STEP, help="one point section every N sections")
+    args = parser.parse_args()
+
+    if Log.logger is None:
+        my_log = Log()
+    Log.logger.setLevel("WARNING") #per detection info lines would dominate the measurement
+
+    random.seed(1)
+    tt = Trailthrough(None)
+    layout = make_layout(args.sections, args.point_step)
+    frame_list = make_frames(args.frames, args.sections)
+    point_obj_list = make_points(layout[1])
+
+    scalar_result, scalar_secs = run(tt, layout, frame_list, point_obj_list, False)
+    vector_result, vector_secs = run(tt, layout, frame_list, point_obj_list, True)
+
+    print(f'sections: {args.sections}, frames: {args.frames}, rules: '
+          f'{len(tt.tt_rules)}, numpy: {numpy_available()}')
+    print(f'per frame, scalar          : {args.frames / scalar_secs:10.1f} frames/s')
+    print(f'per frame, vectorised      : {args.frames / vector_secs:10.1f} frames/s')
+    print(f'results identical: {scalar_result == vector_result}')
+
+    if tt.tt_vector is not None:
+        scalar_secs, vector_secs = run_predicate(tt, frame_list)
+        print(f'predicate only, scalar     : {(len(frame_list) - 1) / scalar_secs:10.1f} frames/s')
+        print(f'predicate only, vectorised : {(len(frame_list) - 1) / vector_secs:10.1f} frames/s')
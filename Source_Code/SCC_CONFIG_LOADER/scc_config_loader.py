@@ -0,0 +1,236 @@
+'''
+*****************************************************************************
+*File : scc_config_loader.py
+*Module : SCC
+*Purpose : Load section.conf, section_connections.conf and yard_config.conf into database, changes only, in one transaction
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import argparse
+from os import path
+from typing import NamedTuple
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from peewee import *
+from scc_dlm_model import *
+from scc_layout_model import *
+from scc_dlm_api import *
+from scc_db_pool import *
+from mqtt_client import *
+sys.path.insert(1, "./common")
+
+SECTION_CONF_FILE = "../config/section.conf"
+SECTION_CONNECTIONS_CONF_FILE = "../config/section_connections.conf"
+YARD_CONFIG_CONF_FILE = "../config/yard_config.conf"
+DELETE_BATCH_ROWS = 1000 #row ids per DELETE statement
+YARD_CONFIG_UPDATED_TOPIC = "scc/yard_config_updated" #running SCC reloads yard_config maps on this topic
+LOADER_CLIENT_SUFFIX = "_config_loader" #MQTT client id of loader is <SCC_ID>_config_loader
+NOTIFY_FLUSH_S = 1 #time given to MQTT network thread to send notification before loader exits
+
+
+class ConfigTable(NamedTuple): #configuration table loaded from a conf file
+    name: str
+    model: object
+    key_field_list: tuple #fields identifying one row, e.g. section_id
+    value_field_list: tuple #remaining fields, row is updated when they differ
+    copy: bool #rows can be written with COPY, False for array columns
+
+
+class TableDiff(NamedTuple): #changes needed to turn current table rows into conf file rows
+    insert_rows: list #rows of key and value fields, new or changed
+    delete_ids: list #ids of rows missing from conf file, changed or duplicated
+    unchanged: int
+
+
+SECTION_CONFIG_TABLE = ConfigTable(
+    "occ_config", SectionConfigInfo, ("section_id", "section_type", "dp_id"), ("dp_direction",), True)
+SECTION_CONNECTIONS_TABLE = ConfigTable(
+    "layout_section_connections", LayoutSectionConnectionsInfo, ("section_id",),
+    ("left_normal", "right_normal", "left_reverse", "right_reverse"), True)
+YARD_CONFIG_TABLE = ConfigTable(
+    "yard_config", YardConfigInfo, ("section_id",),
+    ("yard_id", "yard_name", "dpu_id", "dpu_name", "section_name", "dp_id"), False)
+
+
+def read_conf_file(file_name): #parsed JSON of conf file, raises if missing or invalid
+    if not path.exists(file_name):
+        raise FileNotFoundError(f'{file_name} not found')
+    with open(file_name) as f:
+        return json.load(f)
+
+
+def section_config_rows(section_cfg): #occ_config rows of section.conf, one per section and detection point
+    row_list = []
+    for section in section_cfg["SECTION"]:
+        for section_type in ["SECTION_IN", "SECTION_OUT"]:
+            for dp in section[section_type]:
+                row_list.append((section["SECTION_ID"], section_type, dp["DP_ID"], dp["DP_DIRECTION"]))
+    return row_list
+
+
+def section_connections_rows(section_connections_cfg): #layout_section_connections rows of section_connections.conf
+    return [(section["SECTION_ID"], section["LEFT_NORMAL"], section["RIGHT_NORMAL"],
+             section["LEFT_REVERSE"], section["RIGHT_REVERSE"]) for section in section_connections_cfg["SECTIONS"]]
+
+
+def yard_config_rows(yard_cfg): #yard_config rows of yard_config.conf, one per section
+    row_list = []
+    for yard in yard_cfg["YARDS"]:
+        for dpu in yard["DPU"]:
+            for section in dpu["SECTIONS"]:
+                row_list.append((section["SECTION_ID"], yard["YARD_ID"], yard["YARD_NAME"], dpu["DPU_ID"],
+                                 dpu["DPU_NAME"], section["SECTION_NAME"], tuple(section["DPS"])))
+    return row_list
+
+
+def diff_table(config_table, row_list):
+    '''compare conf file rows (key fields then value fields) with current table rows'''
+    key_len = len(config_table.key_field_list)
+    model = config_table.model
+    field_list = config_table.key_field_list + config_table.value_field_list
+
+    new_dict = {}
+    for row in row_list: #last row of a duplicated key wins, as the last save() did before
+        new_dict[row[:key_len]] = row[key_len:]
+
+    current_dict = {}
+    delete_ids = []
+    query = model.select(model.id, *[getattr(model, field) for field in field_list])
+    for current_row in model._meta.database.execute(query).fetchall(): #raw driver rows, peewee row conversion dominated load time
+        row_id = current_row[0]
+        key = current_row[1:key_len + 1]
+        value = tuple(tuple(item) if isinstance(item, list) else item for item in current_row[key_len + 1:]) #array columns
+        if key in current_dict: #duplicate left by an earlier load
+            delete_ids.append(row_id)
+        else:
+            current_dict[key] = (row_id, value)
+
+    insert_rows = []
+    unchanged = 0
+    for key, value in new_dict.items():
+        current = current_dict.pop(key, None)
+        if current is not None and current[1] == value:
+            unchanged += 1
+            continue
+        if current is not None: #changed row is replaced
+            delete_ids.append(current[0])
+        insert_rows.append(key + value)
+    delete_ids.extend(row_id for row_id, value in current_dict.values()) #rows no longer in conf file
+    return TableDiff(insert_rows, delete_ids, unchanged)
+
+
+def apply_diff(scc_api, config_table, table_diff): #write diff of one table, caller holds transaction
+    model = config_table.model
+    for delete_ids in chunked(table_diff.delete_ids, DELETE_BATCH_ROWS):
+        model.delete().where(model.id.in_(delete_ids)).execute()
+
+    field_list = config_table.key_field_list + config_table.value_field_list
+    if config_table.copy:
+        scc_api.bulk_insert_rows(model, field_list, table_diff.insert_rows)
+    else:
+        insert_rows = [tuple(list(item) if isinstance(item, tuple) else item for item in row)
+                       for row in table_diff.insert_rows] #array columns
+        for batch in chunked(insert_rows, INSERT_BATCH_ROWS):
+            model.insert_many(batch, fields=[getattr(model, field) for field in field_list]).execute()
+
+
+def load_config(scc_api, table_rows_list, dry_run=False):
+    '''diff conf file rows of every table against database and apply all changes in one transaction'''
+    diff_list = []
+    with get_database().atomic() as transaction: #nothing is written if any table fails
+        for config_table, row_list in table_rows_list:
+            table_diff = diff_table(config_table, row_list)
+            diff_list.append((config_table, table_diff))
+            if not dry_run:
+                apply_diff(scc_api, config_table, table_diff)
+        if dry_run:
+            transaction.rollback()
+
+    for config_table, table_diff in diff_list:
+        Log.logger.info(
+            f'scc_config_loader: {config_table.name}: inserted {len(table_diff.insert_rows)}, '
+            f'deleted {len(table_diff.delete_ids)}, unchanged {table_diff.unchanged}{" (dry run)" if dry_run else ""}')
+    return diff_list
+
+
+def notify_yard_config_updated(scc_cfg, table_diff):
+    '''publish scc/yard_config_updated, running SCC reloads yard_config maps without waiting for RELOAD_INTERVAL_S'''
+    try:
+        client_id = scc_cfg.scc_id + LOADER_CLIENT_SUFFIX
+        mqtt_client = MqttClient(
+            scc_cfg.lmb['BROKER_IP_ADDRESS'],
+            scc_cfg.lmb['PORT'],
+            client_id,
+            scc_cfg.lmb["USERNAME"],
+            scc_cfg.lmb["PASSWORD"],
+            client_id)
+        mqtt_client.connect()
+        mqtt_client.pub(YARD_CONFIG_UPDATED_TOPIC, json.dumps(
+            {"ts": time.time(), "inserted": len(table_diff.insert_rows), "deleted": len(table_diff.delete_ids)}))
+        time.sleep(NOTIFY_FLUSH_S)
+        Log.logger.info(f'scc_config_loader: {YARD_CONFIG_UPDATED_TOPIC} published')
+    except Exception as ex: #load is committed, maps are reloaded by reload thread instead
+        Log.logger.critical(f'scc_config_loader: notify_yard_config_updated: exception: {ex}, '
+                            f'yard_config maps reload within YARD_CONFIG.RELOAD_INTERVAL_S')
+
+
+def load_conf_files(scc_api, section_file=None, section_connections_file=None, yard_config_file=None, dry_run=False,
+                    scc_cfg=None):
+    '''parse passed conf files and load them, files are parsed before database is touched, scc_cfg broker is notified of yard_config changes'''
+    table_rows_list = []
+    if section_file is not None:
+        table_rows_list.append((SECTION_CONFIG_TABLE, section_config_rows(read_conf_file(section_file))))
+    if section_connections_file is not None:
+        table_rows_list.append(
+            (SECTION_CONNECTIONS_TABLE, section_connections_rows(read_conf_file(section_connections_file))))
+    if yard_config_file is not None:
+        table_rows_list.append((YARD_CONFIG_TABLE, yard_config_rows(read_conf_file(yard_config_file))))
+    diff_list = load_config(scc_api, table_rows_list, dry_run)
+
+    for config_table, table_diff in diff_list:
+        if config_table is YARD_CONFIG_TABLE and not dry_run and scc_cfg is not None and \
+                (len(table_diff.insert_rows) != 0 or len(table_diff.delete_ids) != 0):
+            notify_yard_config_updated(scc_cfg, table_diff)
+        else:
+            pass
+    return diff_list
+
+
+if __name__ == '__main__':
+    '''Initialise logger'''
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="load SCC configuration files into database")
+    parser.add_argument("--section", nargs="?", const=SECTION_CONF_FILE, help="section.conf -> occ_config")
+    parser.add_argument("--section-connections", nargs="?", const=SECTION_CONNECTIONS_CONF_FILE,
+                        help="section_connections.conf -> layout_section_connections")
+    parser.add_argument("--yard-config", nargs="?", const=YARD_CONFIG_CONF_FILE, help="yard_config.conf -> yard_config")
+    parser.add_argument("--dry-run", action="store_true", help="report changes without writing them")
+    args = parser.parse_args()
+    if args.section is None and args.section_connections is None and args.yard_config is None: #no file selected, load all
+        args.section = SECTION_CONF_FILE
+        args.section_connections = SECTION_CONNECTIONS_CONF_FILE
+        args.yard_config = YARD_CONFIG_CONF_FILE
+
+    '''database'''
+    dlm_cfg = SccDlmConfRead()
+    dlm_cfg.read_cfg('../config/scc.conf')
+    scc_api = SccAPI()
+    scc_api.connect_database(dlm_cfg)
+
+    ts_start = time.time()
+    try:
+        load_conf_files(scc_api, args.section, args.section_connections, args.yard_config, args.dry_run, dlm_cfg)
+    except Exception as ex:
+        Log.logger.critical(f'scc_config_loader: load failed, database not changed: {ex}')
+        sys.exit(1)
+    Log.logger.info(f'scc_config_loader: loaded in {time.time() - ts_start:.3f}s')
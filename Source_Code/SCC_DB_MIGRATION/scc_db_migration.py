@@ -0,0 +1,113 @@
+'''
+*****************************************************************************
+*File : scc_db_migration.py
+*Module : SCC
+*Purpose : Create indexes declared in scc_dlm_model on an existing database without blocking writers
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import argparse
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from peewee import *
+from scc_dlm_model import *
+from scc_db_pool import *
+sys.path.insert(1, "./common")
+
+MIGRATED_MODEL_LIST = [SectionInfo, SectionPlaybackInfo, SectionPlaybackPackedInfo, TrainTraceInfo, EventInfo, YardPerformanceInfo,
+                       TorpedoPerformanceInfo, YardConfigInfo, OccUserInfo] #models with indexes declared
+
+
+def index_sql(database, index): #CREATE INDEX CONCURRENTLY IF NOT EXISTS statement of a model index
+    sql, params = database.get_sql_context().sql(index.safe(True)).query()
+    return sql.replace(" INDEX ", " INDEX CONCURRENTLY ", 1), params
+
+
+def index_valid(database, index_name): #True for a usable index, False for one left invalid by a failed build, None if missing
+    cursor = database.execute_sql(
+        "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = %s",
+        (index_name,))
+    row = cursor.fetchone()
+    return row[0] if row is not None else None
+
+
+def duplicate_values(database, model, field): #values of field held by more than one row, unique index can not be built
+    cursor = database.execute_sql(
+        f'SELECT "{field.column_name}" FROM "{model._meta.table_name}" '
+        f'GROUP BY "{field.column_name}" HAVING count(*) > 1 LIMIT 10')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def migrate_model(database, model, dry_run=False): #create missing indexes of model, return False if one could not be built
+    table_name = model._meta.table_name
+    if not database.table_exists(table_name):
+        Log.logger.warning(f'scc_db_migration: table {table_name} does not exist, skipped')
+        return True
+
+    migrated = True
+    for index in model._meta.fields_to_index():
+        valid = index_valid(database, index._name)
+        if valid:
+            continue
+        if index._unique:
+            duplicate_list = []
+            for field in index._expressions:
+                duplicate_list.extend(duplicate_values(database, model, field))
+            if len(duplicate_list) != 0:
+                Log.logger.critical(
+                    f'scc_db_migration: {index._name} not created, duplicate values in {table_name}: {duplicate_list}')
+                migrated = False
+                continue
+
+        sql, params = index_sql(database, index)
+        if dry_run:
+            Log.logger.info(f'scc_db_migration: {sql}')
+            continue
+        if valid is False: #previous concurrent build failed, IF NOT EXISTS would keep the invalid index
+            database.execute_sql(f'DROP INDEX CONCURRENTLY IF EXISTS "{index._name}"')
+        ts_start = time.time()
+        database.execute_sql(sql, params)
+        Log.logger.info(f'scc_db_migration: {index._name} created in {time.time() - ts_start:.1f}s')
+
+    if not dry_run:
+        database.execute_sql(f'ANALYZE "{table_name}"') #planner statistics for the new indexes
+    return migrated
+
+
+def migrate(database, model_list=MIGRATED_MODEL_LIST, dry_run=False): #create missing indexes of all models
+    '''apply model indexes to an existing database'''
+    database.connection().autocommit = True #CREATE INDEX CONCURRENTLY can not run in a transaction block
+    migrated = True
+    for model in model_list:
+        try:
+            if not migrate_model(database, model, dry_run):
+                migrated = False
+        except Exception as ex:
+            Log.logger.critical(f'scc_db_migration: {model._meta.table_name}: exception: {ex}')
+            migrated = False
+    return migrated
+
+
+if __name__ == '__main__':
+    '''Initialise logger'''
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="create indexes declared in scc_dlm_model on existing tables")
+    parser.add_argument("--dry-run", action="store_true", help="log CREATE INDEX statements without running them")
+    args = parser.parse_args()
+
+    cfg = SccDlmConfRead()
+    cfg.read_cfg('../config/scc.conf')
+    database = init_db(cfg)
+
+    with database.connection_context():
+        if not migrate(database, dry_run=args.dry_run):
+            sys.exit(1)
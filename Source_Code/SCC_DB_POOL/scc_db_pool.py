@@ -0,0 +1,127 @@
+'''
+*****************************************************************************
+*File : scc_db_pool.py
+*Module : SCC
+*Purpose : Process wide pooled PostgreSQL database shared by SccAPI, Trailthrough and the model modules
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import threading
+from contextlib import nullcontext
+from peewee import DatabaseProxy
+from playhouse.pool import PooledPostgresqlExtDatabase, MaxConnectionsExceeded
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+DEFAULT_PORT = 5432
+DEFAULT_MAX_CONNECTIONS = 8 #one per database thread (mqtt callbacks, persistence writer, reload threads) plus spare
+DEFAULT_STALE_TIMEOUT_S = 300 #idle connections older than this are closed instead of reused
+DEFAULT_CHECKOUT_TIMEOUT_S = 10 #thread waits this long for a free connection, then MaxConnectionsExceeded is raised
+
+
+class SccPooledDatabase(PooledPostgresqlExtDatabase):
+    '''pooled database, every thread checks out its own connection, checkout wait time is measured'''
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool_stats = StatsCounters("db_pool", [
+            "checkouts",
+            "timeouts", #checkouts which found no free connection within timeout
+            "wait_seconds"]) #checkout wait of all checkouts
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+
+    def connect(self, reuse_if_open=False): #check out a pooled connection for calling thread
+        ts_start = time.perf_counter()
+        try:
+            opened = super().connect(reuse_if_open)
+        except MaxConnectionsExceeded:
+            self.pool_stats.timeouts.inc()
+            Log.logger.critical(f'scc_db_pool: connect: no free connection, stats: {self.get_pool_stats()}')
+            raise
+
+        if opened:
+            wait = time.perf_counter() - ts_start
+            self.pool_stats.checkouts.inc()
+            self.pool_stats.wait_seconds.inc(wait)
+            self.last_wait = wait
+            if wait > self.max_wait:
+                self.max_wait = wait
+            self.pool_stats.log(self.get_pool_stats)
+        return opened
+
+    def get_pool_stats(self): #return copy of checkout counters and pool occupancy
+        checkouts = self.pool_stats.checkouts.value
+        return {
+            "max_connections": self._max_connections,
+            "in_use": len(self._in_use),
+            "idle": len(self._connections),
+            "checkouts": checkouts,
+            "timeouts": self.pool_stats.timeouts.value,
+            "avg_wait": self.pool_stats.wait_seconds.value / checkouts if checkouts != 0 else 0.0,
+            "max_wait": self.max_wait,
+            "last_wait": self.last_wait}
+
+    def register_metrics(self, registry): #export checkout counters, total checkout wait and pool occupancy
+        self.pool_stats.register(registry)
+        registry.gauge("scc_db_pool_in_use", "pooled connections checked out", None, lambda: len(self._in_use))
+        registry.gauge("scc_db_pool_max_wait_seconds", "longest connection checkout wait", None, lambda: self.max_wait)
+
+
+database_proxy = DatabaseProxy() #database of all models, bound by init_db
+scc_db = None #process wide database, created by first init_db(cfg) call
+scc_db_lock = threading.Lock()
+
+
+def init_db(cfg): #create process wide pooled database from DATABASE and DATABASE_POOL of scc.conf and bind models to it
+    '''initialise shared pooled database'''
+    global scc_db
+    with scc_db_lock:
+        if scc_db is None:
+            database_cfg = cfg.json_data["DATABASE"]
+            pool_cfg = cfg.json_data.get("DATABASE_POOL", {})
+            scc_db = SccPooledDatabase(
+                database_cfg["DB_NAME"],
+                user=database_cfg["USER"],
+                password=database_cfg["PASSWORD"],
+                host=database_cfg["HOST"],
+                port=DEFAULT_PORT,
+                max_connections=pool_cfg.get("MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS),
+                stale_timeout=pool_cfg.get("STALE_TIMEOUT_S", DEFAULT_STALE_TIMEOUT_S),
+                timeout=pool_cfg.get("CHECKOUT_TIMEOUT_S", DEFAULT_CHECKOUT_TIMEOUT_S))
+            database_proxy.initialize(scc_db)
+            Log.logger.info(
+                f'scc_db_pool: database {database_cfg["DB_NAME"]} pooled, max connections: {scc_db._max_connections}')
+        return scc_db
+
+
+def bind_db(database): #use database (eg:- SQLite of benchmark harness) as process wide database and bind models to it
+    '''bind models to passed database instead of pooled PostgreSQL'''
+    global scc_db
+    with scc_db_lock:
+        scc_db = database
+        database_proxy.initialize(database)
+        return scc_db
+
+
+def get_database(): #return process wide pooled database, None until init_db is called
+    return scc_db
+
+
+def connection_context(): #connection of calling thread for a with block, returned to pool at exit
+    if scc_db is None: #init_db not called yet, there is no pooled connection to return
+        return nullcontext()
+    return scc_db.connection_context()
+
+
+def close_connection(): #return connection of calling thread to pool
+    if scc_db is not None and not scc_db.is_closed():
+        scc_db.close()
@@ -0,0 +1,199 @@
+'''
+*****************************************************************************
+*File : scc_delta_publish.py
+*Module : SCC
+*Purpose : Coalesced change-only publishing of section information with periodic keyframes
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import threading
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+DEFAULT_TOPIC = "occ/section_delta"
+DEFAULT_RESYNC_TOPIC = "occ/section_resync" #clients publish here when they miss a sequence number
+DEFAULT_KEYFRAME_INTERVAL_S = 10 #seconds between two full keyframes
+DEFAULT_COALESCE_MS = 200 #changes of all frames received within this window go out as one delta
+
+MSG_TYPE_KEYFRAME = "keyframe" #all known sections, clients replace their section table
+MSG_TYPE_DELTA = "delta" #sections changed since previous message, clients apply it on top of their table
+
+
+class SectionDeltaPublisher:
+    '''publish sections changed since previous message on occ/section_delta, with sequence numbers and keyframes'''
+
+    def __init__(self, mqtt_client, topic=DEFAULT_TOPIC, keyframe_interval_s=DEFAULT_KEYFRAME_INTERVAL_S,
+                 coalesce_ms=DEFAULT_COALESCE_MS, publish_section_info=True):
+        self.mqtt_client = mqtt_client
+        self.topic = topic
+        self.keyframe_interval = keyframe_interval_s
+        self.coalesce_interval = coalesce_ms / 1000.0
+        self.publish_section_info = publish_section_info #full frames are still forwarded to occ/section_info
+
+        self.prev_frame_dict = {} #dpu_id -> last frame of that dpu, frames carrying a dpu_id are diffed per dpu
+        self.snapshot = {} #section_id -> SectionState, last known state of every section, sent as keyframe
+        self.pending = {} #section_id -> SectionState changed since last published message
+        self.pending_removed = set() #section ids removed since last published message
+        self.seq = 0 #sequence number of last published message
+        self.keyframe_requested = True #first message is always a keyframe
+        self.last_keyframe_ts = 0.0
+        self.lock = threading.Lock() #guards section state, sequence number and publish order
+
+        self.stats = StatsCounters("delta_publish", [
+            "frames", "keyframes", "deltas", "resyncs",
+            "sections", #sections sent in keyframes and deltas
+            "bytes", #bytes published on delta topic
+            "full_bytes"]) #bytes of received frames, what full snapshot forwarding publishes
+        self.wake_event = threading.Event() #set by resync request, publisher thread sends keyframe without waiting
+        self.publisher_thread = threading.Thread(
+            target=self.publisher_fn, name="scc_delta_publisher", daemon=True)
+
+    @classmethod
+    def from_config(cls, mqtt_client, delta_cfg): #create delta publisher from DELTA_PUBLISH section of scc.conf, None if disabled
+        '''create delta publisher from configuration'''
+        if delta_cfg is None:
+            delta_cfg = {}
+        if not delta_cfg.get("ENABLED", False):
+            return None
+        return cls(
+            mqtt_client,
+            topic=delta_cfg.get("TOPIC", DEFAULT_TOPIC),
+            keyframe_interval_s=delta_cfg.get("KEYFRAME_INTERVAL_S", DEFAULT_KEYFRAME_INTERVAL_S),
+            coalesce_ms=delta_cfg.get("COALESCE_MS", DEFAULT_COALESCE_MS),
+            publish_section_info=delta_cfg.get("PUBLISH_SECTION_INFO", True))
+
+    def start(self): #start publisher thread
+        try:
+            self.publisher_thread.start()
+            Log.logger.info(
+                f'scc_delta_publish: publisher started, topic: {self.topic}, keyframe interval: '
+                f'{self.keyframe_interval}s, coalesce interval: {self.coalesce_interval}s, '
+                f'occ/section_info: {self.publish_section_info}')
+        except Exception as ex:
+            Log.logger.critical(f'scc_delta_publish: start: exception: {ex}')
+
+    def put(self, frame): #called from MQTT callback thread, records changed sections of frame for next message
+        '''merge changes of section frame into pending delta'''
+        try:
+            with self.lock:
+                if frame.dpu_id == NO_DPU_ID: #sections missing from frame may belong to another dpu, they are left unchanged
+                    delta = FrameDelta(tuple(section for section in frame.sections
+                                             if self.snapshot.get(section.section_id) != section), ())
+                else:
+                    delta = frame_delta(self.prev_frame_dict.get(frame.dpu_id), frame)
+                    self.prev_frame_dict[frame.dpu_id] = frame
+                    if delta is None: #first frame of this dpu, all its sections are new
+                        delta = FrameDelta(frame.sections, ())
+
+                for section in delta.changed:
+                    self.snapshot[section.section_id] = section
+                    self.pending[section.section_id] = section
+                    self.pending_removed.discard(section.section_id)
+                for section_id in delta.removed:
+                    self.snapshot.pop(section_id, None)
+                    self.pending.pop(section_id, None)
+                    self.pending_removed.add(section_id)
+
+                self.stats.frames.inc()
+                self.stats.full_bytes.inc(len(frame.payload))
+        except Exception as ex:
+            Log.logger.critical(f'scc_delta_publish: put: exception: {ex}')
+
+    def resync_sub_fn(self, in_client, user_data, message):
+        '''subscribe occ/section_resync, client missed a sequence number and needs a keyframe'''
+        try:
+            Log.logger.info(f'scc_delta_publish: resync requested: {message.payload}')
+            with self.lock:
+                self.keyframe_requested = True #requests of several clients before next flush share one keyframe
+                self.stats.resyncs.inc()
+            self.wake_event.set()
+        except Exception as ex:
+            Log.logger.critical(f'scc_delta_publish: resync_sub_fn: exception: {ex}')
+
+    def flush(self): #publish keyframe when due or requested, else pending delta, returns published message type or None
+        with self.lock:
+            if len(self.snapshot) == 0 and len(self.pending_removed) == 0: #no frame received yet
+                return None
+
+            ts = time.time()
+            if self.keyframe_requested or ts - self.last_keyframe_ts >= self.keyframe_interval:
+                self.publish(MSG_TYPE_KEYFRAME, self.snapshot.values(), None)
+                self.keyframe_requested = False
+                self.last_keyframe_ts = ts
+                self.stats.keyframes.inc()
+                msg_type = MSG_TYPE_KEYFRAME
+            elif len(self.pending) != 0 or len(self.pending_removed) != 0:
+                self.publish(MSG_TYPE_DELTA, self.pending.values(), self.pending_removed)
+                self.stats.deltas.inc()
+                msg_type = MSG_TYPE_DELTA
+            else:
+                return None
+
+            self.pending = {}
+            self.pending_removed = set()
+            return msg_type
+
+    def publish(self, msg_type, sections, removed): #publish one message with next sequence number, caller holds lock
+        self.seq += 1
+        section_msg_list = [section._asdict() for section in sections]
+        scc_msg = {"ts": time.time(), "seq": self.seq, "type": msg_type, "sections": section_msg_list}
+        if removed is not None:
+            scc_msg["removed"] = list(removed)
+        json_msg = json.dumps(scc_msg, separators=(",", ":"))
+        self.mqtt_client.pub(self.topic, json_msg)
+
+        self.stats.sections.inc(len(section_msg_list))
+        self.stats.bytes.inc(len(json_msg))
+
+    def get_stats(self): #return copy of delta publish counters
+        return dict(self.stats.get(), seq=self.seq)
+
+    def register_metrics(self, registry): #export delta publish counters, bytes against full_bytes is the saving
+        self.stats.register(registry)
+
+    def publisher_fn(self): #publisher thread, one message per coalesce interval
+        '''publish coalesced section changes'''
+        while True:
+            try:
+                self.wake_event.wait(self.coalesce_interval)
+                self.wake_event.clear()
+                self.flush()
+                self.stats.log(self.get_stats)
+            except Exception as ex:
+                Log.logger.critical(f'scc_delta_publish: publisher_fn: exception: {ex}')
+
+
+class SectionDeltaClient:
+    '''client side section table rebuilt from occ/section_delta messages'''
+
+    def __init__(self):
+        self.sections = {} #section_id -> section dict
+        self.seq = None #sequence number of last applied message, None until first keyframe
+
+    def apply(self, payload): #apply one message, returns False if a message was missed and a resync is needed
+        scc_msg = json.loads(payload)
+        if scc_msg["type"] == MSG_TYPE_KEYFRAME:
+            self.sections = {section["section_id"]: section for section in scc_msg["sections"]}
+            self.seq = scc_msg["seq"]
+            return True
+
+        if self.seq is None or scc_msg["seq"] != self.seq + 1: #gap, deltas are ignored until next keyframe
+            self.seq = None
+            return False
+
+        for section in scc_msg["sections"]:
+            self.sections[section["section_id"]] = section
+        for section_id in scc_msg["removed"]:
+            self.sections.pop(section_id, None)
+        self.seq = scc_msg["seq"]
+        return True
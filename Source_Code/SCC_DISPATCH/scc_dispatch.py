@@ -0,0 +1,185 @@
+'''
+*****************************************************************************
+*File : scc_dispatch.py
+*Module : SCC
+*Purpose : asyncio dispatch of MQTT messages, one bounded queue and handler task per topic, blocking handlers in executor
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_metrics import *
+from scc_db_pool import *
+sys.path.insert(1, "./common")
+
+DEFAULT_QUEUE_SIZE = 1000 #messages waiting per topic, a lossless topic beyond it is counted and logged
+DEFAULT_EXECUTOR_WORKERS = 4 #threads of blocking handlers, at most one call per topic is in flight
+POOL_RESERVED_CONNECTIONS = 4 #pooled connections of persistence writer, yard_config reload, partition and playback threads
+DEFAULT_INLINE_TOPICS = ["pms/point_info"] #handlers cheap enough to run on the event loop itself
+DEFAULT_DROP_OLDEST_TOPICS = ["pms/point_info"] #state topics, a newer message replaces an older one, oldest is dropped when full
+
+
+class TopicRoute: #queue and handler of one subscribed topic
+    def __init__(self, topic, handler_fn, inline, queue_size, drop_oldest):
+        self.topic = topic
+        self.handler_fn = handler_fn #paho style handler_fn(in_client, user_data, message)
+        self.inline = inline
+        self.drop_oldest = drop_oldest
+        self.queue_size = queue_size
+        self.queue = asyncio.Queue(queue_size if drop_oldest else 0) #(receive ts, in_client, user_data, message), used on event loop only
+        self.stats = StatsCounters("dispatch", [
+            "received", "handled",
+            "dropped", #oldest messages dropped because queue was full, drop oldest topics only
+            "over_limit", #messages queued beyond queue size, lossless topics only
+            "failed"]) #handler raised
+        self.max_wait = 0.0 #longest time from paho receive to handler start, seconds
+        self.max_depth = 0 #high-water mark of queue depth
+        self.over_limit_logged = False #queue beyond queue size is logged once until it drains
+        self.task = None
+
+
+def receive_ts(message): #monotonic time paho read message from socket, now if client does not stamp it
+    timestamp = getattr(message, "timestamp", 0)
+    return timestamp if timestamp else time.monotonic()
+
+
+class AsyncDispatcher:
+    '''moves MQTT messages from paho network thread to an asyncio event loop, a slow topic never delays another topic'''
+
+    def __init__(self, mqtt_client, queue_size=DEFAULT_QUEUE_SIZE, executor_workers=DEFAULT_EXECUTOR_WORKERS,
+                 inline_topics=DEFAULT_INLINE_TOPICS, drop_oldest_topics=DEFAULT_DROP_OLDEST_TOPICS):
+        self.mqtt_client = mqtt_client
+        self.queue_size = queue_size
+        self.inline_topic_set = set(inline_topics)
+        self.drop_oldest_topic_set = set(drop_oldest_topics) #every other topic is lossless, frames and commands are never dropped
+        self.route_dict = {} #topic -> TopicRoute
+        database = get_database()
+        if isinstance(database, SccPooledDatabase) and executor_workers + POOL_RESERVED_CONNECTIONS > database._max_connections:
+            pool_workers = max(1, database._max_connections - POOL_RESERVED_CONNECTIONS)
+            Log.logger.warning(
+                f'scc_dispatch: {executor_workers} executor workers and {POOL_RESERVED_CONNECTIONS} other database threads '
+                f'exceed {database._max_connections} pooled connections, {pool_workers} workers used')
+            executor_workers = pool_workers
+        self.executor_workers = executor_workers
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="scc_dispatch_worker")
+        self.loop.set_default_executor(self.executor)
+        self.loop_thread = threading.Thread(target=self.loop_fn, name="scc_dispatch", daemon=True)
+        self.lock = threading.Lock() #guards route_dict and stats read from other threads
+
+    @classmethod
+    def from_config(cls, mqtt_client, dispatch_cfg): #create dispatcher from DISPATCH section of scc.conf, None if disabled
+        '''create dispatcher from configuration'''
+        if dispatch_cfg is None or not dispatch_cfg.get("ENABLED", False):
+            return None
+        return cls(
+            mqtt_client,
+            queue_size=dispatch_cfg.get("QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            executor_workers=dispatch_cfg.get("EXECUTOR_WORKERS", DEFAULT_EXECUTOR_WORKERS),
+            inline_topics=dispatch_cfg.get("INLINE_TOPICS", DEFAULT_INLINE_TOPICS),
+            drop_oldest_topics=dispatch_cfg.get("DROP_OLDEST_TOPICS", DEFAULT_DROP_OLDEST_TOPICS))
+
+    def start(self): #start event loop thread
+        self.loop_thread.start()
+        asyncio.run_coroutine_threadsafe(self.stats_fn(), self.loop)
+        Log.logger.info(
+            f'scc_dispatch: started, queue size: {self.queue_size}, executor workers: {self.executor_workers}, inline topics: {sorted(self.inline_topic_set)}, '
+            f'drop oldest topics: {sorted(self.drop_oldest_topic_set)}')
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.executor.shutdown(wait=False)
+
+    def loop_fn(self): #event loop thread
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def sub(self, topic, handler_fn, route_topic=None): #same signature as MqttClient.sub, handler_fn runs from topic task
+        '''subscribe topic through dispatcher, topics with the same route_topic share one queue and handler task'''
+        if route_topic is None:
+            route_topic = topic
+        with self.lock:
+            route = self.route_dict.get(route_topic)
+        if route is None: #handler of a shared route never runs concurrently with itself
+            route = TopicRoute(route_topic, handler_fn, route_topic in self.inline_topic_set, self.queue_size,
+                               route_topic in self.drop_oldest_topic_set)
+            with self.lock:
+                self.route_dict[route_topic] = route
+            asyncio.run_coroutine_threadsafe(self.start_route(route), self.loop).result()
+        self.mqtt_client.sub(topic, lambda in_client, user_data, message: self.receive(
+            route, (receive_ts(message), in_client, user_data, message)))
+
+    def receive(self, route, item): #runs on paho thread, never waits, paho keeps reading every topic
+        self.loop.call_soon_threadsafe(self.enqueue, route, item)
+
+    async def start_route(self, route):
+        route.task = asyncio.get_running_loop().create_task(self.topic_fn(route), name="scc_dispatch_" + route.topic)
+
+    def enqueue(self, route, item): #runs on event loop, called for every message from paho thread
+        route.stats.received.inc()
+        if route.drop_oldest and route.queue.full(): #state topic handler is behind, newest message matters most
+            route.queue.get_nowait()
+            route.stats.dropped.inc()
+        route.queue.put_nowait(item)
+        depth = route.queue.qsize()
+        if depth > route.max_depth:
+            route.max_depth = depth
+        if depth > route.queue_size: #lossless topic handler is behind, message is kept
+            route.stats.over_limit.inc()
+            if not route.over_limit_logged:
+                route.over_limit_logged = True
+                Log.logger.warning(f'scc_dispatch: {route.topic}: {depth} messages queued, over queue size {route.queue_size}')
+
+    async def topic_fn(self, route): #handler task of one topic, messages of a topic are handled in arrival order
+        loop = asyncio.get_running_loop()
+        while True:
+            ts, in_client, user_data, message = await route.queue.get()
+            if route.queue.empty():
+                route.over_limit_logged = False
+            wait = time.monotonic() - ts #includes time paho thread was held by a handler outside dispatcher
+            if wait > route.max_wait:
+                route.max_wait = wait
+            try:
+                if route.inline:
+                    route.handler_fn(in_client, user_data, message)
+                else: #handler may wait on database, event loop stays free for other topics
+                    await loop.run_in_executor(None, self.run_handler, route, in_client, user_data, message)
+                route.stats.handled.inc()
+            except Exception as ex:
+                route.stats.failed.inc()
+                Log.logger.critical(f'scc_dispatch: {route.topic}: exception: {ex}')
+
+    def run_handler(self, route, in_client, user_data, message): #executor thread, pooled connection is returned after every call
+        with connection_context():
+            route.handler_fn(in_client, user_data, message)
+
+    async def stats_fn(self): #log statistics every STATS_LOG_INTERVAL
+        while True:
+            await asyncio.sleep(STATS_LOG_INTERVAL)
+            Log.logger.info(f'scc_dispatch: stats: {self.get_stats()}')
+
+    def get_stats(self): #return per topic counters and queue depth
+        with self.lock:
+            route_list = list(self.route_dict.values())
+        return {
+            route.topic: dict(route.stats.get(), depth=route.queue.qsize(), max_depth=route.max_depth,
+                              max_wait_ms=round(route.max_wait * 1000, 3))
+            for route in route_list}
+
+    def register_metrics(self, registry): #export counters and queue depth of every subscribed topic
+        with self.lock:
+            route_list = list(self.route_dict.values())
+        for route in route_list:
+            route.stats.register(registry, {"topic": route.topic})
+            registry.gauge(QUEUE_DEPTH_METRIC, QUEUE_DEPTH_METRIC_HELP, {"queue": "dispatch " + route.topic}, route.queue.qsize)
+            registry.gauge("scc_dispatch_max_depth", "high-water mark of dispatch queue depth", {"topic": route.topic},
+                           lambda route=route: route.max_depth)
@@ -11,6 +11,11 @@
 '''Import python packages'''
 '''Import SCC packages '''
 import sys
+import io
+import time
+import threading
+from types import MappingProxyType
+from typing import NamedTuple
 from scc_dlm_conf import *
 from scc_log import *
 import json
@@ -18,6 +23,9 @@ from peewee import * #module for database operations
 from datetime import datetime, timedelta
 from scc_dlm_model import *
 from scc_layout_model import *
+from scc_section_frame import *
+from scc_db_pool import *
+from scc_playback import *
 sys.path.insert(2, "./common")
 
 
@@ -37,8 +45,50 @@ MIDDLE_SECTION_LIST = [
     "S10",
     "S11"] #initializing list of middle section
 
+SECTION_INFO_FIELD_LIST = [
+    "ts",
+    "section_id",
+    "section_status",
+    "engine_axle_count",
+    "torpedo_axle_count",
+    "direction",
+    "speed",
+    "torpedo_status",
+    "first_axle"] #column order of section table rows built by section_info_rows()
+
+TRAIN_TRACE_FIELD_LIST = SECTION_INFO_FIELD_LIST + ["torpedo_id", "engine_id"] #column order of train_trace table rows
+SECTION_PLAYBACK_FIELD_LIST = ["ts", "sections"] #column order of section_playback table rows
+SECTION_PLAYBACK_PACKED_FIELD_LIST = ["ts", "data"] #column order of section_playback_packed table rows
+DEFAULT_YARD_CONFIG_RELOAD_INTERVAL_S = 60 #seconds between two yard_config reads of reload thread
+INSERT_BATCH_ROWS = 1000 #rows per multi-row INSERT, keeps statement under PostgreSQL parameter limit
+
+
+class YardConfigMaps(NamedTuple): #read only lookup maps built from yard_config table, replaced as a whole on reload
+    section_dpu: MappingProxyType #section_id -> dpu_id
+    section_dp: MappingProxyType #section_id -> tuple of dp_id
+    dpu_sections: MappingProxyType #dpu_id -> tuple of section_id, in table order
+
+    @classmethod
+    def from_records(cls, yard_config_records): #build maps from yard_config rows
+        section_dpu = {}
+        section_dp = {}
+        dpu_sections = {}
+        for record in yard_config_records:
+            section_dpu[record.section_id] = record.dpu_id
+            section_dp[record.section_id] = tuple(record.dp_id) if record.dp_id is not None else ()
+            dpu_sections.setdefault(record.dpu_id, []).append(record.section_id)
+        return cls(MappingProxyType(section_dpu), MappingProxyType(section_dp), MappingProxyType(
+            {dpu_id: tuple(section_id_list) for dpu_id, section_id_list in dpu_sections.items()}))
+
+
+YARD_CONFIG_MAPS_EMPTY = YardConfigMaps.from_records([])
+
 
 class TrainEntryExitTrace(): #class initializing train entry and exit trace variables.
+    __slots__ = ("ts", "section_id", "in_torpedo_axle_count", "out_torpedo_axle_count",
+                 "engine_axle_count", "section_status", "direction", "speed", "torpedo_status",
+                 "torpedo_id", "engine_id") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.ts = 0.0
         self.section_id = "none"
@@ -53,6 +103,11 @@ class TrainEntryExitTrace(): #class initializing train entry and exit trace vari
         self.engine_id = 0
 
 class SectionConnections: #class for initialization of secion connection variables.
+    __slots__ = ("section_id", "left_normal", "right_normal", "left_reverse", "right_reverse",
+                 "torpedo_id", "engine_id", "in_torpedo_axle_count", "out_torpedo_axle_count",
+                 "entry_time", "exit_time", "torpedo_detected", "unloaded_entry_time",
+                 "unloaded_exit_time", "in_axles", "out_axles") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.section_id = "none"
         self.left_normal = "none"
@@ -73,6 +128,10 @@ class SectionConnections: #class for initialization of secion connection variabl
 
 
 class Torpedo: #class for initialization of torpedo info variables.
+    __slots__ = ("section_id", "torpedo_id", "engine_id", "unloaded_entry_time",
+                 "unloaded_exit_time", "entry_time", "exit_time", "in_torpedo_axle_count",
+                 "out_torpedo_axle_count", "in_axles", "out_axles", "torpedo_detected") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.section_id = "none"
         self.torpedo_id = 0
@@ -93,14 +152,22 @@ class SccAPI:
 
     def __init__(self): #initializing all variables to empty
         self.train_trace_obj_list = []
+        self.train_trace_prev_section = {} #section_id -> SectionState last evaluated by insert_train_trace_info
         self.section_conn_obj_list = []
         self.torpedo_obj_list = []
         self.entry_torpedo_id = 0
         self.entry_engine_id = 0
         self.torpedo_id = 0
         self.engine_id = 0
-        self.last_tt_record_inserted = {
-            's3': False, 's4': False, 's7': False, 's8': False, 's11': False}
+        self.last_tt_record_inserted = {} #section_id -> trail through alert inserted, filled by init_trail_through_sections
+        self.copy_enabled = True #use PostgreSQL COPY for bulk inserts, falls back to multi-row INSERT
+        self.yard_config_maps = YARD_CONFIG_MAPS_EMPTY #section/dpu/dp lookups, filled by load_yard_config_maps
+        self.yard_config_reload_event = threading.Event() #set to reload yard_config maps without waiting for interval
+        self.playback_encoder = None #PlaybackEncoder when PLAYBACK.FORMAT is packed, set by connect_database
+
+    def init_trail_through_sections(self, section_id_list): #trail through alert state of the point sections of the rule table
+        '''reset last_tt_record_inserted for passed section ids'''
+        self.last_tt_record_inserted = {section_id.lower(): False for section_id in section_id_list} #trail through messages carry lower case section ids
 
     #[Connect passed argument file to postgresql database]
     def connect_database(self, config):
@@ -109,27 +176,22 @@ class SccAPI:
             #taking connection parameters from passed config file.
             self.json_data = config.json_data
             self.db_name = self.json_data["DATABASE"]["DB_NAME"]
-            self.user = self.json_data["DATABASE"]["USER"]
-            self.password = self.json_data["DATABASE"]["PASSWORD"]
-            self.host = self.json_data["DATABASE"]["HOST"]
-            self.port = 5432
+            playback_cfg = self.json_data.get("PLAYBACK", {})
+            if playback_cfg.get("FORMAT", PLAYBACK_FORMAT_JSON) == PLAYBACK_FORMAT_PACKED: #section playback frames go to section_playback_packed
+                self.playback_encoder = PlaybackEncoder(playback_cfg.get("KEYFRAME_INTERVAL_S", DEFAULT_KEYFRAME_INTERVAL_S))
 
             if len(self.db_name) == 0: #checking if database is empty
                 Log.logger.critical(
                     "scc_dlm_api: connect_database:  database name missing")
                 
             else:
-                #[Passing connection parameters as a argument to PostgresqlDatabase function.]
-                psql_db = PostgresqlDatabase(
-                    self.db_name,
-                    user=self.user,
-                    password=self.password,
-                    host=self.host,
-                    port=self.port)
+                #[process wide pooled database shared with the model modules, no new connection is opened per caller]
+                psql_db = init_db(config) #binds scc_dlm_model and scc_layout_model models
                 
                 if psql_db: #if psql_db is True.
                     try:
-                        psql_db.connect() #connecting psql_db to database
+                        with psql_db.connection_context(): #check connectivity, connection goes back to pool
+                            psql_db.execute_sql("SELECT 1")
                         Log.logger.info(
                             f'scc_dlm_api: database connection successful')
                         return psql_db #returning psql_db
@@ -156,52 +218,86 @@ class SccAPI:
                 f'Requested username does not exist in the database')
             return None
 
-    def get_dpu_id(self, section_id_param): #provide dpu_id of passed section_id from YardConfigInfo table in scc_layout_model.py.
+    def get_dpu_id(self, section_id_param): #provide dpu_id of passed section_id from yard_config maps, no database access.
         '''search dpu id of selected section_id'''
-        try:
-            yard_config_table = YardConfigInfo.select().where(
-                YardConfigInfo.section_id == section_id_param).get() #fetches row in YardConfig Table for which section_id = passed section_id_param
+        dpu_id = self.yard_config_maps.section_dpu.get(section_id_param)
+        if dpu_id is not None:
             Log.logger.info(
-                f'SECTION ID:{section_id_param} =>  DPU_ID: {yard_config_table.dpu_id}') #log section_id and dpu_id with level info
-            return yard_config_table.dpu_id #return dpu_id from fetched row
-        except DoesNotExist:
+                f'SECTION ID:{section_id_param} =>  DPU_ID: {dpu_id}') #log section_id and dpu_id with level info
+        else:
             Log.logger.warning(
-                f'Requested DPU_ID does not exist in the database')
-            return None
+                f'Requested DPU_ID does not exist in the yard configuration')
+        return dpu_id
+
+    def get_dp_list_of_section(self, section_id_param): #provide dp_id list of passed section_id from yard_config maps.
+        return list(self.yard_config_maps.section_dp.get(section_id_param, ()))
+
+    def get_sections_of_dpu(self, dpu_id_param): #provide section_id list of passed dpu_id from yard_config maps.
+        return list(self.yard_config_maps.dpu_sections.get(dpu_id_param, ()))
+
+    def load_yard_config_maps(self, yard_config_records=None): #build yard_config maps and swap them in, returns True if they changed
+        '''load section, dpu and dp lookup maps from yard_config table'''
+        try:
+            if yard_config_records is None:
+                yard_config_records = self.read_yard_config_info()
+            yard_config_maps = YardConfigMaps.from_records(yard_config_records)
+            if yard_config_maps == self.yard_config_maps:
+                return False
+            self.yard_config_maps = yard_config_maps #single assignment, readers see old or new maps, never a mix
+            Log.logger.info(
+                f'scc_dlm_api: yard config maps loaded, sections: {len(yard_config_maps.section_dpu)}, '
+                f'dpus: {len(yard_config_maps.dpu_sections)}')
+            return True
+        except Exception as ex:
+            Log.logger.critical(f'scc_dlm_api: load_yard_config_maps: exception: {ex}')
+            return False
+
+    def start_yard_config_reload(self, reload_interval_s=DEFAULT_YARD_CONFIG_RELOAD_INTERVAL_S): #start thread re-reading yard_config table
+        reload_thread = threading.Thread(
+            target=self.yard_config_reload_fn, args=(reload_interval_s,), name="scc_yard_config_reload", daemon=True)
+        reload_thread.start()
+
+    def yard_config_reload_fn(self, reload_interval_s): #reload thread, every reload_interval_s or when woken by yard_config_updated_sub_fn
+        '''reload yard configuration maps'''
+        while True:
+            try:
+                self.yard_config_reload_event.wait(reload_interval_s)
+                self.yard_config_reload_event.clear()
+                with connection_context(): #pooled connection only while table is read
+                    self.load_yard_config_maps()
+            except Exception as ex: #eg:- no connection to database, maps are kept and reloaded next interval
+                Log.logger.critical(f'scc_dlm_api: yard_config_reload_fn: exception: {ex}')
+
+    def yard_config_updated_sub_fn(self, in_client, user_data, message): #yard_config table was changed, reload maps on reload thread
+        '''subscribe scc/yard_config_updated'''
+        Log.logger.info(f'scc_dlm_api: yard config update notified')
+        self.yard_config_reload_event.set()
+
+    def section_info_rows(self, frame): #method to convert section frame into section table row tuples.
+        ''' build section table rows '''
+        list_tuple = []
+        for i in range(len(frame.sections)): #one tuple per section, in SECTION_INFO_FIELD_LIST order
+            list_tuple.append((
+                frame.ts,
+                frame.sections[i].section_id,
+                frame.sections[i].section_status,
+                frame.sections[i].engine_axle_count,
+                frame.sections[i].torpedo_axle_count,
+                frame.sections[i].direction,
+                frame.sections[i].speed,
+                frame.sections[i].torpedo_status,
+                frame.sections[i].first_axle))
+        return list_tuple
 
     def insert_section_info(self, data): #method to insert passed data into section info table.
         ''' insert section information '''
         try:
-            json_data = json.loads(data) #convert data to python object.
-            '''list'''
-            list_tuple = []
-            d = []
-            for i in range(len(json_data["sections"])): #adding passed data to list d.
-                d.append(json_data["ts"])
-                d.append(json_data["sections"][i]["section_id"])
-                d.append(json_data["sections"][i]["section_status"])
-                d.append(json_data["sections"][i]["engine_axle_count"])
-                d.append(json_data["sections"][i]["torpedo_axle_count"])
-                d.append(json_data["sections"][i]["direction"])
-                d.append(json_data["sections"][i]["speed"])
-                d.append(json_data["sections"][i]["torpedo_status"])
-                d.append(json_data["sections"][i]["first_axle"])
-                t = tuple(d) #converting list d to tuple t
-                list_tuple.append(t) #appending tuple t to list_tuple
-                d.clear() #clearing list d
+            frame = section_frame(data) #accepts SectionFrame or JSON string
+            list_tuple = self.section_info_rows(frame)
 
             SectionInfo.insert_many(
                 list_tuple,
-                fields=[
-                    SectionInfo.ts,
-                    SectionInfo.section_id,
-                    SectionInfo.section_status,
-                    SectionInfo.engine_axle_count,
-                    SectionInfo.torpedo_axle_count,
-                    SectionInfo.direction,
-                    SectionInfo.speed,
-                    SectionInfo.torpedo_status,
-                    SectionInfo.first_axle]).execute() #using insert_many function to insert all data in list_tuple to SectionInfo table
+                fields=[getattr(SectionInfo, field) for field in SECTION_INFO_FIELD_LIST]).execute() #using insert_many function to insert all data in list_tuple to SectionInfo table
 
         except Exception as ex:
             Log.logger.critical(
@@ -210,28 +306,141 @@ class SccAPI:
     def insert_section_playback_info(self, data): #saving passed data to section_playback_table.
         ''' insert section information '''
         try:
-            json_data = json.loads(data) #convert data to python object.
+            frame = section_frame(data) #accepts SectionFrame or JSON string
+            if self.playback_encoder is not None:
+                SectionPlaybackPackedInfo.insert(ts=frame.ts, data=self.playback_encoder.encode(frame)).execute()
+                return
 
             section_playback_table = SectionPlaybackInfo() #initializing SectionPlaybackInfo class of scc_dlm_model.py containing timestamp and sections.
-            section_playback_table.ts = json_data["ts"] #storing timestamp from passed data to section_playback_table object.
-            section_playback_table.sections = json_data['sections'] #storing sections from passed data to section_playback_table object.
+            section_playback_table.ts = frame.ts #storing timestamp from passed data to section_playback_table object.
+            section_playback_table.sections = frame.section_dicts() #storing sections from passed data to section_playback_table object.
 
             section_playback_table.save() #saving passed data to section_playback_table.
 
         except Exception as ex:
+            if self.playback_encoder is not None: #record was not stored, next record of its stream must not be a delta
+                self.playback_encoder.reset()
             Log.logger.critical(
                 f'scc_dlm_api: insert_section_info: exception:  {ex}')
 
-    def read_section_playback_info(self): #method to print section_id and section_status from section_playback_table in scc_dlm_model.py
+    def copy_value(self, value): #method to format one value for PostgreSQL COPY text format.
+        if value is None:
+            return "\\N"
+        if isinstance(value, bool):
+            return "t" if value else "f"
+        if isinstance(value, (bytes, bytearray)): #bytea hex input, backslash doubled for COPY text format
+            return "\\\\x" + value.hex()
+        if isinstance(value, (list, dict)):
+            value = json.dumps(value)
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+    def copy_rows(self, model, field_list, rows): #method to stream rows into model table with COPY FROM STDIN.
+        ''' copy rows into table '''
+        copy_buffer = io.StringIO()
+        for row in rows:
+            copy_buffer.write("\t".join([self.copy_value(value) for value in row]))
+            copy_buffer.write("\n")
+        copy_buffer.seek(0)
+
+        column_list = ", ".join(
+            ['"' + getattr(model, field).column_name + '"' for field in field_list])
+        copy_sql = f'COPY "{model._meta.table_name}" ({column_list}) FROM STDIN'
+        with model._meta.database.cursor() as cursor: #psycopg2 cursor, closed after COPY
+            cursor.copy_expert(copy_sql, copy_buffer)
+
+    def bulk_insert_rows(self, model, field_list, rows): #method to insert rows with COPY, falling back to multi-row INSERT.
+        if len(rows) == 0:
+            return
+        if self.copy_enabled:
+            try:
+                with model._meta.database.atomic(): #savepoint, a failed COPY does not abort outer transaction
+                    self.copy_rows(model, field_list, rows)
+                return
+            except Exception as ex:
+                Log.logger.warning(
+                    f'scc_dlm_api: bulk_insert_rows: COPY into {model._meta.table_name} failed, using INSERT: {ex}')
+        for batch in chunked(rows, INSERT_BATCH_ROWS):
+            model.insert_many(
+                batch, fields=[getattr(model, field) for field in field_list]).execute()
+
+    def bulk_insert_frames(self, data_list): #method to insert several section messages in one transaction.
+        ''' insert section, section playback and train trace information of many frames '''
+        train_trace_state = self.train_trace_state() #restored if transaction is rolled back, batch is written again
+        try:
+            section_rows = []
+            section_playback_rows = []
+            train_trace_rows = []
+
+            for data in data_list: #frames are processed in arrival order, train trace state depends on it
+                frame = section_frame(data) #accepts SectionFrame or JSON string
+                section_rows.extend(self.section_info_rows(frame))
+                if self.playback_encoder is not None:
+                    section_playback_rows.append((frame.ts, self.playback_encoder.encode(frame)))
+                else:
+                    section_playback_rows.append((frame.ts, frame.section_dicts()))
+                self.insert_train_trace_info(frame, train_trace_rows)
+
+            with SectionInfo._meta.database.atomic(): #all tables are flushed in one transaction
+                self.bulk_insert_rows(SectionInfo, SECTION_INFO_FIELD_LIST, section_rows)
+                if self.playback_encoder is not None:
+                    self.bulk_insert_rows(SectionPlaybackPackedInfo, SECTION_PLAYBACK_PACKED_FIELD_LIST, section_playback_rows)
+                else:
+                    self.bulk_insert_rows(SectionPlaybackInfo, SECTION_PLAYBACK_FIELD_LIST, section_playback_rows)
+                self.bulk_insert_rows(TrainTraceInfo, TRAIN_TRACE_FIELD_LIST, train_trace_rows)
+
+            return len(section_rows) + len(section_playback_rows) + len(train_trace_rows)
+        except Exception as ex:
+            if self.playback_encoder is not None: #records were rolled back, next record of each stream must not be a delta
+                self.playback_encoder.reset()
+            self.restore_train_trace_state(train_trace_state) #entry and exit records of batch are produced again on retry
+            Log.logger.critical(
+                f'scc_dlm_api: bulk_insert_frames: exception:  {ex}')
+            return 0
+
+    def insert_frame(self, data): #method to insert one section message into all tables in one transaction, raises on failure.
+        ''' insert section, section playback and train trace information of one frame '''
+        frame = section_frame(data) #accepts SectionFrame or JSON string
+        train_trace_state = self.train_trace_state() #restored if transaction is rolled back, frame is written again
         try:
-            section_playback_model = SectionPlaybackInfo() #initialising SectionPlaybackInfo class of scc_dlm_model.py
-            section_playback_records = section_playback_model.select() #selecting all records from section_playback_table
-            
-            for i in section_playback_records: #printing all section_id and section_status from all sections in section_playback_records.
-                section_msg = i.sections 
-                for j in range(len(section_msg)):
+            train_trace_rows = []
+            self.insert_train_trace_info(frame, train_trace_rows)
+            with SectionInfo._meta.database.atomic(): #a frame is stored in every table or in none
+                section_rows = self.section_info_rows(frame)
+                if len(section_rows) != 0:
+                    SectionInfo.insert_many(
+                        section_rows, fields=[getattr(SectionInfo, field) for field in SECTION_INFO_FIELD_LIST]).execute()
+                if self.playback_encoder is not None:
+                    SectionPlaybackPackedInfo.insert(ts=frame.ts, data=self.playback_encoder.encode(frame)).execute()
+                else:
+                    SectionPlaybackInfo.insert(ts=frame.ts, sections=frame.section_dicts()).execute()
+                if len(train_trace_rows) != 0:
+                    TrainTraceInfo.insert_many(
+                        train_trace_rows, fields=[getattr(TrainTraceInfo, field) for field in TRAIN_TRACE_FIELD_LIST]).execute()
+        except Exception:
+            if self.playback_encoder is not None: #record was rolled back, next record of its stream must not be a delta
+                self.playback_encoder.reset()
+            self.restore_train_trace_state(train_trace_state) #entry and exit records of frame are produced again on retry
+            raise
+
+    def train_trace_state(self): #copy of state updated by insert_train_trace_info
+        return (self.entry_torpedo_id, self.entry_engine_id, dict(self.train_trace_prev_section),
+                [(trace.in_torpedo_axle_count, trace.out_torpedo_axle_count) for trace in self.train_trace_obj_list])
+
+    def restore_train_trace_state(self, train_trace_state): #undo insert_train_trace_info calls made after train_trace_state()
+        self.entry_torpedo_id, self.entry_engine_id, self.train_trace_prev_section, count_list = train_trace_state
+        for trace, (in_torpedo_axle_count, out_torpedo_axle_count) in zip(self.train_trace_obj_list, count_list):
+            trace.in_torpedo_axle_count = in_torpedo_axle_count
+            trace.out_torpedo_axle_count = out_torpedo_axle_count
+
+    def read_section_playback_info(self, start_ts=None, end_ts=None, section_id_list=None): #method to print section_id and section_status of section_playback frames in time range
+        try:
+            packed = self.playback_encoder is not None
+            keyframe_interval_s = self.playback_encoder.keyframe_interval if packed else DEFAULT_KEYFRAME_INTERVAL_S
+            for ts, sections in read_playback(start_ts, end_ts, section_id_list, packed=packed,
+                                              keyframe_interval_s=keyframe_interval_s): #frames are streamed in chunks, not loaded at once
+                for section in sections:
                     Log.logger.info(
-                        f'ts:{i.ts},{section_msg[j]["section_id"]},{section_msg[j]["section_status"]}')
+                        f'ts:{ts},{section["section_id"]},{section["section_status"]}')
         except Exception as ex:
             Log.logger.critical(
                 f'scc_dlm_api: read_section_playback_info: exception: {ex}')
@@ -326,13 +535,44 @@ class SccAPI:
                 self.train_trace_obj_list[i].torpedo_status = "none"
                 self.train_trace_obj_list[i].torpedo_id = 0
                 self.train_trace_obj_list[i].engine_id = 0
+            self.train_trace_prev_section = {} #next frame is evaluated in full
 
             Log.logger.info(f'reset train trace info...') #logging reset train trace info with level info
         except Exception as ex:
             Log.logger.critical(
                 f'scc_dlm_api: init_train_movement_info: excpetion: {ex}')
 
-    def insert_train_trace_info(self, data): 
+    def save_train_trace(self, ts, section, torpedo_id, engine_id, train_trace_rows=None): #save one train trace record, or append it to train_trace_rows for bulk insert.
+        '''save train trace record'''
+        if train_trace_rows is not None:
+            train_trace_rows.append((
+                ts,
+                section.section_id,
+                section.section_status,
+                section.engine_axle_count,
+                section.torpedo_axle_count,
+                section.direction,
+                section.speed,
+                section.torpedo_status,
+                section.first_axle,
+                torpedo_id,
+                engine_id))
+        else:
+            train_trace_table = TrainTraceInfo() #initialising TrainTraceInfo class of scc_dlm_model.py
+            train_trace_table.ts = ts
+            train_trace_table.section_id = section.section_id
+            train_trace_table.section_status = section.section_status
+            train_trace_table.torpedo_axle_count = section.torpedo_axle_count
+            train_trace_table.engine_axle_count = section.engine_axle_count
+            train_trace_table.direction = section.direction
+            train_trace_table.speed = section.speed
+            train_trace_table.torpedo_status = section.torpedo_status
+            train_trace_table.first_axle = section.first_axle
+            train_trace_table.torpedo_id = torpedo_id
+            train_trace_table.engine_id = engine_id
+            train_trace_table.save() #save passed data to train_trace_table
+
+    def insert_train_trace_info(self, data, train_trace_rows=None): 
         #add train trace info into train_trace_table iff in passed data (torpedo_axle_count is 16 and direction is in) OR (torpedo axle count is 0 and direction is out or none)
         #add data into table for each change in torpedo_axle_count
         '''for all sections in train_trace_obj_list, 
@@ -350,72 +590,47 @@ class SccAPI:
          
         '''insert section inform to trace train entry and exit'''
         try:
-            json_data = json.loads(data) #convert data to python object
+            frame = section_frame(data) #accepts SectionFrame or JSON string
 
             for i in range(TOTAL_SECTION_TRACE_FOR_TRAIN): #looping through all sections in train_trace_obj_list
-                for j in range(len(json_data['sections'])): #looping through all sections in json_data
-                    if json_data['sections'][j]['section_id'] == self.train_trace_obj_list[i].section_id: #if section_id of passed data matches with section_id of train_trace_obj_list
-                        '''compare section torpedo_axle_count is 16 or not'''
-                        if json_data['sections'][j]['torpedo_axle_count'] == 16 and json_data['sections'][j]['direction'] == "in": #if in passed data torpedo_axle_count is 16 and direction is in
-                            '''check previous section torpedo_axle_count is less than 16 or not'''
-                            if self.train_trace_obj_list[i].in_torpedo_axle_count < 16: #if in train_trace_obj_list torpedo_axle_count is less than 16
-                                '''insert record if previous section torpedo_axle_count less than 16 and current
-                                torpedo_axle_count is 16'''
-                                train_trace_table = TrainTraceInfo() #initialising TrainTraceInfo class of scc_dlm_model.py
-                                train_trace_table.ts = json_data["ts"]
-                                train_trace_table.section_id = json_data["sections"][j]["section_id"]
-                                train_trace_table.section_status = json_data["sections"][j]["section_status"]
-                                train_trace_table.torpedo_axle_count = json_data[
-                                    "sections"][j]["torpedo_axle_count"]
-                                train_trace_table.engine_axle_count = json_data[
-                                    "sections"][j]["engine_axle_count"]
-                                train_trace_table.direction = json_data["sections"][j]["direction"]
-                                train_trace_table.speed = json_data["sections"][j]["speed"]
-                                train_trace_table.torpedo_status = json_data["sections"][j]["torpedo_status"]
-                                train_trace_table.first_axle = json_data["sections"][j]["first_axle"]
-                                self.entry_torpedo_id = self.entry_torpedo_id + 1
-                                self.entry_engine_id = self.entry_engine_id + 1
-                                train_trace_table.torpedo_id = self.entry_torpedo_id
-                                train_trace_table.engine_id = self.entry_engine_id
-                                train_trace_table.save() #save passed data to train_trace_table
-                                '''save it in train_trace_obj_list'''
-                                self.train_trace_obj_list[i].in_torpedo_axle_count = json_data['sections'][j]['torpedo_axle_count'] #making torpedo_axle_count of train_trace_obj_list = torpedo_axle_count of passed data
-                            else: #if torpedo_axle_count of train_trace_obj_list is >= 16, then it will not add data to train_trace_table.
-                                self.train_trace_obj_list[i].in_torpedo_axle_count = json_data['sections'][j]['torpedo_axle_count'] 
-                        else: #if torpedo_axle_count of passed data is not 16 and direction is not in
-                            self.train_trace_obj_list[i].in_torpedo_axle_count = json_data['sections'][j]['torpedo_axle_count']
-
-                        if json_data['sections'][j]['direction'] == "out" or json_data['sections'][j]['direction'] == "none": #if direction of passed data is out or none
-                            if json_data['sections'][j]['torpedo_axle_count'] >= 1: #if torpedo_axle_count of passed data is >= 1
-                                self.train_trace_obj_list[i].out_torpedo_axle_count = json_data['sections'][j]['torpedo_axle_count'] #making out_torpedo_axle_count of train_trace_obj_list = torpedo_axle_count of passed data
-                            elif json_data['sections'][j]['torpedo_axle_count'] == 0: #if torpedo_axle_count of passed data is 0
-                                if self.train_trace_obj_list[i].out_torpedo_axle_count > 0: #if out_torpedo_axle_count of train_trace_obj_list is > 0
-                                    train_trace_table = TrainTraceInfo()
-                                    train_trace_table.ts = json_data["ts"]
-                                    train_trace_table.section_id = json_data["sections"][j]["section_id"]
-                                    train_trace_table.section_status = json_data[
-                                        "sections"][j]["section_status"]
-                                    train_trace_table.torpedo_axle_count = json_data[
-                                        "sections"][j]["torpedo_axle_count"]
-                                    train_trace_table.engine_axle_count = json_data[
-                                        "sections"][j]["engine_axle_count"]
-                                    train_trace_table.direction = json_data["sections"][j]["direction"]
-                                    train_trace_table.speed = json_data["sections"][j]["speed"]
-                                    train_trace_table.torpedo_status = json_data[
-                                        "sections"][j]["torpedo_status"]
-                                    train_trace_table.first_axle = json_data["sections"][j]["first_axle"]
-                                    train_trace_table.torpedo_id = self.entry_torpedo_id
-                                    train_trace_table.engine_id = self.entry_engine_id
-                                    train_trace_table.save() #save passed data to train_trace_table
-                                    self.train_trace_obj_list[i].out_torpedo_axle_count = 0
-                                else:
-                                    pass
+                section = frame.section_index.get(self.train_trace_obj_list[i].section_id) #section of passed data with section_id of train_trace_obj_list
+                if section is not None and self.train_trace_prev_section.get(section.section_id) != section: #unchanged section leaves trace state and table as they are
+                    '''compare section torpedo_axle_count is 16 or not'''
+                    if section.torpedo_axle_count == 16 and section.direction == "in": #if in passed data torpedo_axle_count is 16 and direction is in
+                        '''check previous section torpedo_axle_count is less than 16 or not'''
+                        if self.train_trace_obj_list[i].in_torpedo_axle_count < 16: #if in train_trace_obj_list torpedo_axle_count is less than 16
+                            '''insert record if previous section torpedo_axle_count less than 16 and current
+                            torpedo_axle_count is 16'''
+                            self.entry_torpedo_id = self.entry_torpedo_id + 1
+                            self.entry_engine_id = self.entry_engine_id + 1
+                            self.save_train_trace(
+                                frame.ts, section,
+                                self.entry_torpedo_id, self.entry_engine_id, train_trace_rows) #save passed data to train_trace_table
+                            '''save it in train_trace_obj_list'''
+                            self.train_trace_obj_list[i].in_torpedo_axle_count = section.torpedo_axle_count #making torpedo_axle_count of train_trace_obj_list = torpedo_axle_count of passed data
+                        else: #if torpedo_axle_count of train_trace_obj_list is >= 16, then it will not add data to train_trace_table.
+                            self.train_trace_obj_list[i].in_torpedo_axle_count = section.torpedo_axle_count 
+                    else: #if torpedo_axle_count of passed data is not 16 and direction is not in
+                        self.train_trace_obj_list[i].in_torpedo_axle_count = section.torpedo_axle_count
+
+                    if section.direction == "out" or section.direction == "none": #if direction of passed data is out or none
+                        if section.torpedo_axle_count >= 1: #if torpedo_axle_count of passed data is >= 1
+                            self.train_trace_obj_list[i].out_torpedo_axle_count = section.torpedo_axle_count #making out_torpedo_axle_count of train_trace_obj_list = torpedo_axle_count of passed data
+                        elif section.torpedo_axle_count == 0: #if torpedo_axle_count of passed data is 0
+                            if self.train_trace_obj_list[i].out_torpedo_axle_count > 0: #if out_torpedo_axle_count of train_trace_obj_list is > 0
+                                self.save_train_trace(
+                                    frame.ts, section,
+                                    self.entry_torpedo_id, self.entry_engine_id, train_trace_rows) #save passed data to train_trace_table
+                                self.train_trace_obj_list[i].out_torpedo_axle_count = 0
                             else:
                                 pass
                         else:
                             pass
                     else:
                         pass
+                    self.train_trace_prev_section[section.section_id] = section
+                else:
+                    pass
         except Exception as ex:
             Log.logger.critical(
                 f'scc_dlm_api: insert_train_trace_info: exception: {ex}')
@@ -504,29 +719,20 @@ class SccAPI:
         #updating data into torpedo_obj_list only iff (in passed data torpedo_axle_count is >= 12) OR (in passed data torpedo_axle_count is < 6 and direction is Out)
         
         try:
-            json_data = json.loads(data) #convert data to python object
-            section_list = {} #created empty dictionary.
-
-            for json_idx in range(len(json_data['sections'])): #json_data ki section key ki jo list hai usko [json_idx] se ek-ek karke call karega.
-                section_list[json_data['sections'][json_idx]
-                             ['section_id']] = json_data['sections'][json_idx] 
-                '''jo list ka index uper se call ho raha hai, usko 'section_list' dictionary mai key 'section_id' ki  value bana ke store kar rahe hai.'''
-                '''eg:- json_data = {'sections': [{'section_id': '1', 'section_name': 'section1'}, {'section_id': '2', 'section_name': 'section2'}]}, then
-                   section_list = {'1': {'section_id': '1', 'section_name': 'section1'}, '2': {'section_id': '2', 'section_name': 'section2'}}
-                '''
+            frame = section_frame(data) #accepts SectionFrame or JSON string
+            section_list = frame.section_index #section_id -> SectionState, built once while decoding the frame
 
-            for json_idx in range(len(json_data['sections'])): #iterating through (json_data dictionary's, sections key's Value(which is a list).
-                if json_data['sections'][json_idx]['section_id'] in UNLOADING_SECTION_LIST: #uper wali list ka jo index call hua hai yadi uska section_id UNLOADING_SECTION_LIST mai hai
+            for json_idx in range(len(frame.sections)): #iterating through (json_data dictionary's, sections key's Value(which is a list).
+                if frame.sections[json_idx].section_id in UNLOADING_SECTION_LIST: #uper wali list ka jo index call hua hai yadi uska section_id UNLOADING_SECTION_LIST mai hai
                     for sc_idx in range(len(self.torpedo_obj_list)): #iterating sc_idx through all records of torpedo_obj_list 
-                        if json_data['sections'][json_idx]['section_id'] == self.torpedo_obj_list[sc_idx].section_id: #uper wali list ka jo index call hua hai yadi uska section_id == torpedo_obj_list ka kisi record ka section_id
-                            if json_data['sections'][json_idx]['section_status'] != "none" or json_data[
-                                    'sections'][json_idx]['direction'] != "none": #agar jo index call hua hai uska section_status none nahi hai YA direction none nahi hai
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 12 and self.torpedo_obj_list[sc_idx].in_torpedo_axle_count < 12: #Agar called index ka (torpedo_axle_count 12 se barabar ya jyada hai) AUR torpedo_obj_list ka (in_torpedo_axle_count 12 se kam hai)
+                        if frame.sections[json_idx].section_id == self.torpedo_obj_list[sc_idx].section_id: #uper wali list ka jo index call hua hai yadi uska section_id == torpedo_obj_list ka kisi record ka section_id
+                            if frame.sections[json_idx].section_status != "none" or frame.sections[json_idx].direction != "none": #agar jo index call hua hai uska section_status none nahi hai YA direction none nahi hai
+                                if frame.sections[json_idx].torpedo_axle_count >= 12 and self.torpedo_obj_list[sc_idx].in_torpedo_axle_count < 12: #Agar called index ka (torpedo_axle_count 12 se barabar ya jyada hai) AUR torpedo_obj_list ka (in_torpedo_axle_count 12 se kam hai)
                                     
                                     #updating torpedo_obj_list sc_idx mai timestamp, torpedo_id, engine_id with json_data
-                                    self.torpedo_obj_list[sc_idx].unloaded_entry_time = json_data["ts"] #ts in unix timestamp fomrat (a signed number).
-                                    self.torpedo_obj_list[sc_idx].torpedo_id = "T" + time.strftime('%d%m%Y%H%M%S', time.localtime(json_data["ts"])) #converting json_data["ts"] to format (T + 2 digit day + 2 digit month + 4 digit year + 2 digit hour + 2 digit minute + 2 digit second)
-                                    self.torpedo_obj_list[sc_idx].engine_id = "E" + time.strftime('%d%m%Y%H%M%S', time.localtime(json_data["ts"]))
+                                    self.torpedo_obj_list[sc_idx].unloaded_entry_time = frame.ts #ts in unix timestamp fomrat (a signed number).
+                                    self.torpedo_obj_list[sc_idx].torpedo_id = "T" + time.strftime('%d%m%Y%H%M%S', time.localtime(frame.ts)) #converting frame.ts to format (T + 2 digit day + 2 digit month + 4 digit year + 2 digit hour + 2 digit minute + 2 digit second)
+                                    self.torpedo_obj_list[sc_idx].engine_id = "E" + time.strftime('%d%m%Y%H%M%S', time.localtime(frame.ts))
                                     
                                     #logging from section_conn_obj_list ka sc_idx se section_id, torpedo_id, engine_id, unloaded_entry_time
                                     Log.logger.info(
@@ -535,8 +741,7 @@ class SccAPI:
                                         f'engine_id: {self.section_conn_obj_list[sc_idx].engine_id},'
                                         f'unloaded entry ts: {self.section_conn_obj_list[sc_idx].unloaded_entry_time}')
 
-                                    self.torpedo_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count'] #updating (torpedo_obj_list sc_idx mai 'in_torpedo_axle_count') with (json_data ka sections key ki list ka json_idx se torpedo_axle_count)
+                                    self.torpedo_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count #updating (torpedo_obj_list sc_idx mai 'in_torpedo_axle_count') with (json_data ka sections key ki list ka json_idx se torpedo_axle_count)
 
                                     if self.torpedo_obj_list[sc_idx].torpedo_id != 0 and self.torpedo_obj_list[sc_idx].engine_id != 0: #agar (torpedo_obj_list ka sc_idx ka) 'torpedo_id' aur 'engine_id' 0 nahi hai
                                         '''insert torpedo entry time while entrying unloading section'''
@@ -548,21 +753,18 @@ class SccAPI:
                                     else:
                                         pass
                                 else: #Agar isme se ek bhi satisfy na ho to(#Agar called index ka (torpedo_axle_count >= 12) AUR torpedo_obj_list ka (in_torpedo_axle_count < 12))
-                                    self.torpedo_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count'] #torpedo_obj_list ka sc_idx mai 'in_torpedo_axle_count' ko update karega (json_data ka sections key ki list ka json_idx se torpedo_axle_count)
+                                    self.torpedo_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count #torpedo_obj_list ka sc_idx mai 'in_torpedo_axle_count' ko update karega (json_data ka sections key ki list ka json_idx se torpedo_axle_count)
                             else:
                                 pass
 
                             '''-----------------------------------GET UNLOADING EXIT TIME-----------------------------------'''
-                            if json_data['sections'][json_idx]['direction'] == "out" or json_data['sections'][json_idx]['direction'] == "none": # agar called index ka direction out ya none hai
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 6: #agar called index ka torpedo_axle_count >=6
-                                    self.torpedo_obj_list[sc_idx].out_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count'] #torpedo_obj_list ka sc_idx mai 'out_torpedo_axle_count' ko update karega (json_data ka sections key ki list ka json_idx se torpedo_axle_count
+                            if frame.sections[json_idx].direction == "out" or frame.sections[json_idx].direction == "none": # agar called index ka direction out ya none hai
+                                if frame.sections[json_idx].torpedo_axle_count >= 6: #agar called index ka torpedo_axle_count >=6
+                                    self.torpedo_obj_list[sc_idx].out_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count #torpedo_obj_list ka sc_idx mai 'out_torpedo_axle_count' ko update karega (json_data ka sections key ki list ka json_idx se torpedo_axle_count
                                 else:
                                     pass
-                                if self.torpedo_obj_list[sc_idx].out_torpedo_axle_count >= 6 and json_data[
-                                        'sections'][json_idx]['torpedo_axle_count'] < 6: #agar torpedo_obj_list ka sc_idx ka 'out_torpedo_axle_count' >=6 AUR json_data ka sections key ki list ka json_idx se torpedo_axle_count < 6
-                                    self.torpedo_obj_list[sc_idx].unloaded_exit_time = json_data["ts"] #to torpedo_obj_list ka sc_idx mai 'unloaded_exit_time' ko update karega (json_data ka ts)
+                                if self.torpedo_obj_list[sc_idx].out_torpedo_axle_count >= 6 and frame.sections[json_idx].torpedo_axle_count < 6: #agar torpedo_obj_list ka sc_idx ka 'out_torpedo_axle_count' >=6 AUR json_data ka sections key ki list ka json_idx se torpedo_axle_count < 6
+                                    self.torpedo_obj_list[sc_idx].unloaded_exit_time = frame.ts #to torpedo_obj_list ka sc_idx mai 'unloaded_exit_time' ko update karega (json_data ka ts)
                                     
                                     #log info from torpedo_obj_list ka sc_idx se section_id, torpedo_id, engine_id, unloaded_exit_time
                                     Log.logger.info(f'Section_id : {self.torpedo_obj_list[sc_idx].section_id},'
@@ -601,41 +803,36 @@ class SccAPI:
 
     def yard_performance(self, data):
         try:
-            json_data = json.loads(data) 
-            section_list = {}
+            frame = section_frame(data) #accepts SectionFrame or JSON string
+            section_list = frame.section_index #section_id -> SectionState
 
-            for json_idx in range(len(json_data['sections'])): #create section_list
-                section_list[json_data['sections'][json_idx]
-                             ['section_id']] = json_data['sections'][json_idx]
-
-            for json_idx in range(len(json_data['sections'])): #iterating json_idx in json_data['sections'] list.
+            for json_idx in range(len(frame.sections)): #iterating json_idx in frame.sections list.
 
                 '''--------------------------------------ENTRY EXIT SECTION LOGIC ------------------------------'''
-                if json_data['sections'][json_idx]['section_id'] in ENTRY_EXIT_SECTION_LIST: #if section_id of json_data['sections'][json_idx] is in ENTRY_EXIT_SECTION_LIST
+                if frame.sections[json_idx].section_id in ENTRY_EXIT_SECTION_LIST: #if section_id of frame.sections[json_idx] is in ENTRY_EXIT_SECTION_LIST
                     for sc_idx in range(len(self.section_conn_obj_list)): #iterating sc_idx through all records of section_conn_obj_list
-                        if json_data['sections'][json_idx]['section_id'] == self.section_conn_obj_list[sc_idx].section_id: #if section_id of json_data['sections'][json_idx] == section_id of section_conn_obj_list[sc_idx]
+                        if frame.sections[json_idx].section_id == self.section_conn_obj_list[sc_idx].section_id: #if section_id of frame.sections[json_idx] == section_id of section_conn_obj_list[sc_idx]
 
                             '''--------------------------GET TRAIN ENTRY TIME------------------------------'''
-                            if json_data['sections'][json_idx]['section_status'] == "occupied" and json_data[
-                                    'sections'][json_idx]['direction'] == "in": #if for json_data['sections'][json_idx] section_status is occupied and direction is in.
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 12 and self.section_conn_obj_list[sc_idx].in_torpedo_axle_count < 12: #if for (json_data['sections'][json_idx] torpedo_axle_count >=12) & (section_conn_obj_list[sc_idx] in_torpedo_axle_count < 12)
+                            if frame.sections[json_idx].section_status == "occupied" and frame.sections[json_idx].direction == "in": #if for frame.sections[json_idx] section_status is occupied and direction is in.
+                                if frame.sections[json_idx].torpedo_axle_count >= 12 and self.section_conn_obj_list[sc_idx].in_torpedo_axle_count < 12: #if for (frame.sections[json_idx] torpedo_axle_count >=12) & (section_conn_obj_list[sc_idx] in_torpedo_axle_count < 12)
 
                                     #update torpedo_id, engine_id and entry time in section_conn_obj_list
                                     self.torpedo_id = "T" + \
                                         time.strftime(
-                                            '%d%m%Y%H%M%S', time.localtime(json_data["ts"]))
+                                            '%d%m%Y%H%M%S', time.localtime(frame.ts))
                                     self.engine_id = "E" + \
                                         time.strftime(
-                                            '%d%m%Y%H%M%S', time.localtime(json_data["ts"]))
+                                            '%d%m%Y%H%M%S', time.localtime(frame.ts))
 
                                     self.section_conn_obj_list[sc_idx].torpedo_id = self.torpedo_id
                                     self.section_conn_obj_list[sc_idx].engine_id = self.engine_id
-                                    self.section_conn_obj_list[sc_idx].entry_time = json_data["ts"]
+                                    self.section_conn_obj_list[sc_idx].entry_time = frame.ts
 
                                     if self.section_conn_obj_list[sc_idx].torpedo_id != 0 and self.section_conn_obj_list[sc_idx].engine_id != 0: #if torpedo_id and engine_id of section_conn_obj_list[sc_idx] is not 0
                                         '''insert new train entry in db'''
                                         self.insert_train_entry_info(
-                                            self.torpedo_id, self.engine_id, json_data["ts"]) #inserting data into train_entry_info table
+                                            self.torpedo_id, self.engine_id, frame.ts) #inserting data into train_entry_info table
                                     else:
                                         pass
 
@@ -651,17 +848,15 @@ class SccAPI:
                                         f'engine_id: {self.section_conn_obj_list[sc_idx].engine_id},'
                                         f'entry ts: {self.section_conn_obj_list[sc_idx].entry_time}')
 
-                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                                 else:
-                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                             else:
                                 pass
 
                             '''-------------------------------------GET TRAIN EXIT TIME---------------------------------'''
 
-                            if json_data['sections'][json_idx]['direction'] == "out": #if json_data['sections'][json_idx]['direction'] == "out"
+                            if frame.sections[json_idx].direction == "out": #if frame.sections[json_idx].direction == "out"
 
                                 sec_id = self.section_conn_obj_list[sc_idx].left_normal #then sec_id will be left_normal of section_conn_obj_list[sc_idx]
 
@@ -677,18 +872,17 @@ class SccAPI:
                                     else:
                                         pass
 
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 6: #if torpedo_axle_count >= 6 then update out_torpedo_axle_count
-                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                                if frame.sections[json_idx].torpedo_axle_count >= 6: #if torpedo_axle_count >= 6 then update out_torpedo_axle_count
+                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                                 else:
                                     pass
 
                                 '''update train exit time in db'''
-                                if self.section_conn_obj_list[sc_idx].out_torpedo_axle_count >= 6 and json_data['sections'][json_idx]['torpedo_axle_count'] <= 6: #log torpedo exciting detected
+                                if self.section_conn_obj_list[sc_idx].out_torpedo_axle_count >= 6 and frame.sections[json_idx].torpedo_axle_count <= 6: #log torpedo exciting detected
 
                                     Log.logger.info(
                                         'torpedo exiting detected!!')
-                                    self.section_conn_obj_list[sc_idx].exit_time = json_data["ts"]
+                                    self.section_conn_obj_list[sc_idx].exit_time = frame.ts
 
                                     if self.section_conn_obj_list[sc_idx].torpedo_id != 0 and self.section_conn_obj_list[sc_idx].engine_id != 0: #if torpedo_id & engine_id is not zero.
                                         Log.logger.info(
@@ -726,30 +920,27 @@ class SccAPI:
                     pass
 
                 '''------------------------------------------MIDDLE SECTIONS LOGIC---------------------------------------'''
-                if json_data['sections'][json_idx]['section_id'] in MIDDLE_SECTION_LIST:
+                if frame.sections[json_idx].section_id in MIDDLE_SECTION_LIST:
                     for sc_idx in range(len(self.section_conn_obj_list)):
-                        if json_data['sections'][json_idx]['section_id'] == self.section_conn_obj_list[sc_idx].section_id:
-                            if json_data['sections'][json_idx]['section_status'] == "occupied" and json_data[
-                                    'sections'][json_idx]['direction'] != "none":
-
-                                if json_data['sections'][json_idx]['direction'] == 'in':
-                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
-                                elif json_data['sections'][json_idx]['direction'] == 'out':
-                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                        if frame.sections[json_idx].section_id == self.section_conn_obj_list[sc_idx].section_id:
+                            if frame.sections[json_idx].section_status == "occupied" and frame.sections[json_idx].direction != "none":
+
+                                if frame.sections[json_idx].direction == 'in':
+                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
+                                elif frame.sections[json_idx].direction == 'out':
+                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                                 else:
                                     pass
 
-                                if json_data['sections'][json_idx]['direction'] == "out":
+                                if frame.sections[json_idx].direction == "out":
                                     if self.section_conn_obj_list[sc_idx].left_normal != "NONE":
                                         sec_id = self.section_conn_obj_list[sc_idx].left_normal
 
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] == "occupied":
-                                                if section_list[sec_id]["direction"] == "out":
+                                                    sec_id].section_status == "occupied":
+                                                if section_list[sec_id].direction == "out":
                                                     self.section_conn_obj_list[
                                                         sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                     self.section_conn_obj_list[
@@ -768,8 +959,8 @@ class SccAPI:
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] == "occupied":
-                                                if section_list[sec_id]["direction"] == "out":
+                                                    sec_id].section_status == "occupied":
+                                                if section_list[sec_id].direction == "out":
                                                     self.section_conn_obj_list[
                                                         sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                     self.section_conn_obj_list[
@@ -783,15 +974,15 @@ class SccAPI:
                                 else:
                                     pass
 
-                                if json_data['sections'][json_idx]['direction'] == "in":
+                                if frame.sections[json_idx].direction == "in":
                                     if self.section_conn_obj_list[sc_idx].right_normal != "NONE":
                                         sec_id = self.section_conn_obj_list[sc_idx].right_normal
 
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] == "occupied":
-                                                if section_list[sec_id]["direction"] == "in":
+                                                    sec_id].section_status == "occupied":
+                                                if section_list[sec_id].direction == "in":
                                                     self.section_conn_obj_list[
                                                         sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                     self.section_conn_obj_list[
@@ -809,8 +1000,8 @@ class SccAPI:
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] == "occupied":
-                                                if section_list[sec_id]["direction"] == "in":
+                                                    sec_id].section_status == "occupied":
+                                                if section_list[sec_id].direction == "in":
                                                     self.section_conn_obj_list[
                                                         sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                     self.section_conn_obj_list[
@@ -837,14 +1028,13 @@ class SccAPI:
                             pass
                 else:
                     pass
-'''------------------------------------------------------------------------------------------------------------------------------------------------------------'''
-                if json_data['sections'][json_idx]['section_id'] in UNLOADING_SECTION_LIST:
+                '''------------------------------------------------------------------------------------------------------------------------------------------------------------'''
+                if frame.sections[json_idx].section_id in UNLOADING_SECTION_LIST:
                     for sc_idx in range(len(self.section_conn_obj_list)):
-                        if json_data['sections'][json_idx]['section_id'] == self.section_conn_obj_list[sc_idx].section_id:
-                            if json_data['sections'][json_idx]['section_status'] != "none" or json_data[
-                                    'sections'][json_idx]['direction'] != "none":
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 12 and self.section_conn_obj_list[sc_idx].in_torpedo_axle_count < 12:
-                                    self.section_conn_obj_list[sc_idx].unloaded_entry_time = json_data["ts"]
+                        if frame.sections[json_idx].section_id == self.section_conn_obj_list[sc_idx].section_id:
+                            if frame.sections[json_idx].section_status != "none" or frame.sections[json_idx].direction != "none":
+                                if frame.sections[json_idx].torpedo_axle_count >= 12 and self.section_conn_obj_list[sc_idx].in_torpedo_axle_count < 12:
+                                    self.section_conn_obj_list[sc_idx].unloaded_entry_time = frame.ts
 
                                     if self.section_conn_obj_list[sc_idx].left_normal != "NONE":
                                         sec_id = self.section_conn_obj_list[sc_idx].left_normal
@@ -852,7 +1042,7 @@ class SccAPI:
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] != "none":
+                                                    sec_id].section_status != "none":
                                                 self.section_conn_obj_list[
                                                     sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                 self.section_conn_obj_list[
@@ -866,7 +1056,7 @@ class SccAPI:
                                         for section_idx in range(
                                                 len(self.section_conn_obj_list)):
                                             if self.section_conn_obj_list[section_idx].section_id == sec_id and section_list[
-                                                    sec_id]["section_status"] != "none":
+                                                    sec_id].section_status != "none":
                                                 self.section_conn_obj_list[
                                                     sc_idx].torpedo_id = self.section_conn_obj_list[section_idx].torpedo_id
                                                 self.section_conn_obj_list[
@@ -879,8 +1069,7 @@ class SccAPI:
                                         f'engine_id: {self.section_conn_obj_list[sc_idx].engine_id},'
                                         f'unloaded entry ts: {self.section_conn_obj_list[sc_idx].unloaded_entry_time}')
 
-                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
 
                                     if self.section_conn_obj_list[sc_idx].torpedo_id != 0 and self.section_conn_obj_list[sc_idx].engine_id != 0:
                                         '''update train entry time while entrying unloading section'''
@@ -892,21 +1081,18 @@ class SccAPI:
                                     else:
                                         pass
                                 else:
-                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                                    self.section_conn_obj_list[sc_idx].in_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                             else:
                                 pass
 
                             '''-----------------------------------GET UNLOADING EXIT TIME-----------------------------------'''
-                            if json_data['sections'][json_idx]['direction'] == "out" or json_data['sections'][json_idx]['direction'] == "none":
-                                if json_data['sections'][json_idx]['torpedo_axle_count'] >= 6:
-                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = json_data[
-                                        'sections'][json_idx]['torpedo_axle_count']
+                            if frame.sections[json_idx].direction == "out" or frame.sections[json_idx].direction == "none":
+                                if frame.sections[json_idx].torpedo_axle_count >= 6:
+                                    self.section_conn_obj_list[sc_idx].out_torpedo_axle_count = frame.sections[json_idx].torpedo_axle_count
                                 else:
                                     pass
-                                if self.section_conn_obj_list[sc_idx].out_torpedo_axle_count >= 6 and json_data[
-                                        'sections'][json_idx]['torpedo_axle_count'] < 6:
-                                    self.section_conn_obj_list[sc_idx].unloaded_exit_time = json_data["ts"]
+                                if self.section_conn_obj_list[sc_idx].out_torpedo_axle_count >= 6 and frame.sections[json_idx].torpedo_axle_count < 6:
+                                    self.section_conn_obj_list[sc_idx].unloaded_exit_time = frame.ts
 
                                     Log.logger.info(f'Section_id : {self.section_conn_obj_list[sc_idx].section_id},'
                                                     f'torpedo_id : {self.section_conn_obj_list[sc_idx].torpedo_id},'
@@ -1035,7 +1221,7 @@ class SccAPI:
     def insert_trail_through_info(self, tt_msg): #method to update trail through info in trail_through_info and trail_through_playback table in scc_dlm_model.py module.
         '''insert data into trail through table'''
         try:
-            if self.last_tt_record_inserted[tt_msg['section_id']] == False: #if last_tt_record_inserted is false.
+            if self.last_tt_record_inserted.get(tt_msg['section_id'], False) == False: #if last_tt_record_inserted is false.
                 tt_table = TrailThroughInfo()
                 tt_table.tt_ts = tt_msg['ts']
                 tt_table.section_id = tt_msg['section_id']
@@ -1058,7 +1244,7 @@ class SccAPI:
     def clear_trail_through(self, tt_msg): #make last_tt_record_inserted[section_id in passed attribute message] == False  and add info in trail_through_playback table.
         '''clear trail through alert when user sent mqtt message'''
         try:
-            if self.last_tt_record_inserted[tt_msg['section_id']] == True:
+            if self.last_tt_record_inserted.get(tt_msg['section_id'], False) == True:
                 self.last_tt_record_inserted[tt_msg['section_id']] = False
                 Log.logger.info(f'clear trail through: {self.last_tt_record_inserted[tt_msg["section_id"]]}')
 
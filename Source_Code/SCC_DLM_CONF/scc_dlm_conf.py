@@ -9,7 +9,7 @@
 '''
 
 '''import python packages'''
-from json_checker import Checker
+from json_checker import Checker, OptionalKey
 import json_checker
 from typing import NamedTuple
 from os import path
@@ -32,6 +32,11 @@ class SccDlmConfRead:
             "HOST": str,
             "DB_NAME": str
         },
+        OptionalKey("DATABASE_POOL"): {
+            OptionalKey("MAX_CONNECTIONS"): int,
+            OptionalKey("STALE_TIMEOUT_S"): int,
+            OptionalKey("CHECKOUT_TIMEOUT_S"): int
+        },
         "LOCAL_MQTT_BROKER": {
             "BROKER_IP_ADDRESS": str,
             "USERNAME": str,
@@ -39,7 +44,74 @@ class SccDlmConfRead:
             "PORT": int
         },
         "TOTAL_YARD": int,
-        "TOTAL_SECTION": int
+        "TOTAL_SECTION": int,
+        OptionalKey("PERSISTENCE"): {
+            "QUEUE_SIZE": int,
+            "BATCH_SIZE": int,
+            "OVERFLOW_POLICY": str,
+            "SPILL_PATH": str,
+            OptionalKey("FLUSH_INTERVAL_MS"): int,
+            OptionalKey("BULK_INSERT"): bool
+        },
+        OptionalKey("DELTA_PUBLISH"): {
+            "ENABLED": bool,
+            OptionalKey("TOPIC"): str,
+            OptionalKey("KEYFRAME_INTERVAL_S"): int,
+            OptionalKey("COALESCE_MS"): int,
+            OptionalKey("PUBLISH_SECTION_INFO"): bool
+        },
+        OptionalKey("ROLE_CACHE"): {
+            OptionalKey("TTL_S"): int,
+            OptionalKey("MAX_USERS"): int
+        },
+        OptionalKey("YARD_CONFIG"): {
+            OptionalKey("RELOAD_INTERVAL_S"): int
+        },
+        OptionalKey("PARTITION"): {
+            "ENABLED": bool,
+            OptionalKey("PRECREATE_DAYS"): int,
+            OptionalKey("RETENTION_DAYS"): int,
+            OptionalKey("CHECK_INTERVAL_S"): int
+        },
+        OptionalKey("PLAYBACK"): {
+            OptionalKey("CHUNK_ROWS"): int,
+            OptionalKey("MAX_SESSIONS"): int,
+            OptionalKey("TOPIC_PREFIX"): str,
+            OptionalKey("FORMAT"): str,
+            OptionalKey("KEYFRAME_INTERVAL_S"): int
+        },
+        OptionalKey("SNAPSHOT"): {
+            OptionalKey("JSON_BACKEND"): str
+        },
+        OptionalKey("SHARD"): {
+            "ENABLED": bool,
+            OptionalKey("SHARD_BY"): str,
+            OptionalKey("MAX_SHARDS"): int,
+            OptionalKey("TOPIC_PREFIX"): str,
+            OptionalKey("RESTART_DELAY_S"): int
+        },
+        OptionalKey("DISPATCH"): {
+            "ENABLED": bool,
+            OptionalKey("QUEUE_SIZE"): int,
+            OptionalKey("EXECUTOR_WORKERS"): int,
+            OptionalKey("INLINE_TOPICS"): list,
+            OptionalKey("DROP_OLDEST_TOPICS"): list
+        },
+        OptionalKey("LANES"): {
+            "ENABLED": bool,
+            OptionalKey("QUEUE_SIZE"): int,
+            OptionalKey("ALERT_BUDGET_MS"): int
+        },
+        OptionalKey("METRICS"): {
+            "ENABLED": bool,
+            OptionalKey("HTTP_HOST"): str,
+            OptionalKey("HTTP_PORT"): int,
+            OptionalKey("PUBLISH_INTERVAL_S"): int,
+            OptionalKey("TOPIC"): str
+        },
+        OptionalKey("TRAIL_THROUGH"): {
+            OptionalKey("VECTORISED"): bool
+        }
     } #this is a dictionary describing the schema of scc.config file
 
     def __init__(self):
@@ -49,6 +121,18 @@ class SccDlmConfRead:
         self.json_data = None
         self.lmb = None
         self.scc_id = None
+        self.persistence = None
+        self.delta_publish = None
+        self.role_cache = None
+        self.yard_config = None
+        self.partition = None
+        self.playback = None
+        self.snapshot = None
+        self.shard = None
+        self.dispatch = None
+        self.lanes = None
+        self.metrics = None
+        self.trail_through = None
 
     def read_cfg(self, file_name):
         if path.exists(file_name): #if file exists then it will load in "self.json_data", if not then it will show error
@@ -76,6 +160,18 @@ class SccDlmConfRead:
             self.version = self.json_data['VERSION']
             self.lmb = self.json_data['LOCAL_MQTT_BROKER']
             self.scc_id = self.json_data['SCC_ID']
+            self.persistence = self.json_data.get('PERSISTENCE', {}) #optional write-behind persistence settings
+            self.delta_publish = self.json_data.get('DELTA_PUBLISH', {}) #optional change-only occ/section_delta settings
+            self.role_cache = self.json_data.get('ROLE_CACHE', {}) #optional user role cache settings
+            self.yard_config = self.json_data.get('YARD_CONFIG', {}) #optional yard_config reload settings
+            self.partition = self.json_data.get('PARTITION', {}) #optional daily partition and retention settings
+            self.playback = self.json_data.get('PLAYBACK', {}) #optional streaming playback settings
+            self.snapshot = self.json_data.get('SNAPSHOT', {}) #optional occ/section_info snapshot settings
+            self.shard = self.json_data.get('SHARD', {}) #optional per yard worker process settings
+            self.dispatch = self.json_data.get('DISPATCH', {}) #optional asyncio dispatch settings
+            self.lanes = self.json_data.get('LANES', {}) #optional priority lane settings
+            self.metrics = self.json_data.get('METRICS', {}) #optional metrics endpoint and scc/metrics settings
+            self.trail_through = self.json_data.get('TRAIL_THROUGH', {}) #optional trail through detector settings
 
             self.database = DatabaseStruct(**self.json_data['DATABASE'])
             self.validate_cfg()
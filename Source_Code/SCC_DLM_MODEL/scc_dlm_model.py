@@ -17,36 +17,17 @@ from peewee import * #module to write sql query in python
 from datetime import datetime
 import sys
 from playhouse.postgres_ext import * #module for some postgresql specific data types
+from scc_db_pool import *
 sys.path.insert(1, "./common") #adding common makes them import as they are installed modules
 
-if Log.logger is None:
-    my_log = Log()
-
-'''read configuration file'''
-cfg = SccDlmConfRead()
-cfg.read_cfg('../config/scc.conf')
-
-json_data = cfg.json_data
-db_name = json_data["DATABASE"]["DB_NAME"]
-user = json_data["DATABASE"]["USER"]
-password = json_data["DATABASE"]["PASSWORD"]
-host = json_data["DATABASE"]["HOST"]
-port = 5432
-psql_db = None
-
-try: #block to connect to postgresql database
-    psql_db = PostgresqlDatabase(
-        db_name, user=user, password=password, host=host, port=port)
-    if psql_db != None:
-        psql_db.connect() #connect postgresql to database
-except Exception as e: #if any exception occurs then it will show error
-    Log.logger.critical(f'scc_dlm_model: Exception: {e}')
+'''models are bound to database_proxy, init_db(cfg) connects it to the pooled database, import has no side effects'''
+psql_db = database_proxy
 
 
 class SccModel(Model): #it is a base model which inherit from Model Class of peewee module. This Base Model connect to postgresql database, so that all other models can inherit from this model.
     """A base model that will use our Postgresql database"""
     class Meta:
-        database = psql_db
+        database = database_proxy
 
 
 class SectionConfigInfo(SccModel):
@@ -101,6 +82,15 @@ class SectionPlaybackInfo(SccModel):
         table_name = "section_playback"
 
 
+class SectionPlaybackPackedInfo(SccModel):
+    ''' Section playback table, frames encoded by scc_playback_codec '''
+    ts = DoubleField()
+    data = BlobField() #keyframe, delta or JSON record
+
+    class Meta:
+        table_name = "section_playback_packed"
+
+
 class TrainTraceInfo(SccModel):
     ''' Section information table '''
     ts = DoubleField()
@@ -122,7 +112,7 @@ class TrainTraceInfo(SccModel):
 class YardPerformanceInfo(SccModel):
     ''' Yard performance information table'''
     engine_id = CharField(null=True)
-    torpedo_id = CharField(null=True)
+    torpedo_id = CharField(null=True, index=True) #performance records are updated by torpedo_id
     entry_ts = DoubleField(null=True)
     exit_ts = DoubleField(null=True)
     unload_entry_ts = DoubleField(null=True)
@@ -136,7 +126,7 @@ class YardPerformanceInfo(SccModel):
 class TorpedoPerformanceInfo(SccModel):
     '''Torpedo performance information table'''
     engine_id = CharField(null=True)
-    torpedo_id = CharField(null=True)
+    torpedo_id = CharField(null=True, index=True) #performance records are updated by torpedo_id
     entry_ts = DoubleField(null=True)
     exit_ts = DoubleField(null=True)
     unload_entry_ts = DoubleField(null=True)
@@ -153,7 +143,7 @@ class YardConfigInfo(SccModel):
     yard_name = CharField()
     dpu_id = CharField()
     dpu_name = CharField()
-    section_id = CharField()
+    section_id = CharField(index=True) #get_dpu_id looks up dpu of section
     section_name = CharField()
     dp_id = ArrayField(CharField, null = True)
     class Meta:
@@ -162,7 +152,7 @@ class YardConfigInfo(SccModel):
 
 class OccUserInfo(SccModel):
     '''User authentication'''
-    username = CharField()
+    username = CharField(unique=True)
     password = CharField()
     email = CharField()
     firstname = CharField()
@@ -209,11 +199,23 @@ class TrailThroughPlayback(SccModel):
         table_name = "trail_through_playback"
 
 
+'''time series tables are appended in ts order and read by ts range, a BRIN index stays a few pages at any size'''
+SectionInfo.add_index(SectionInfo.ts, using='BRIN')
+SectionPlaybackInfo.add_index(SectionPlaybackInfo.ts, using='BRIN')
+SectionPlaybackPackedInfo.add_index(SectionPlaybackPackedInfo.ts, using='BRIN')
+TrainTraceInfo.add_index(TrainTraceInfo.ts, using='BRIN')
+EventInfo.add_index(EventInfo.ts, using='BRIN')
+
+
 if __name__ == '__main__': #check if code is run directly by python interpreter
     if Log.logger is None:
         my_log = Log()
     Log.logger.info("scc_model: main program")
 
+    cfg = SccDlmConfRead()
+    cfg.read_cfg('../config/scc.conf')
+    psql_db = init_db(cfg)
+
     #psql_db.create_tables([TorpedoPerformanceInfo])
     psql_db.create_tables([YardConfigInfo]) 
     #psql_db.create_tables([SectionConfigInfo, DpInfo, SectionInfo, TrainTraceInfo,
@@ -0,0 +1,117 @@
+'''
+*****************************************************************************
+*File : scc_lanes.py
+*Module : SCC
+*Purpose : Section frame pipeline in priority lanes, detection and alerts never wait for OCC publish or database writes
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import time
+import queue
+import threading
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+LANE_DETECT = 0 #trail through detection and scc/trail_through alert
+LANE_PUBLISH = 1 #occ/section_info and occ/section_delta
+LANE_PERSIST = 2 #database persistence and analytics
+LANE_NAME_LIST = ["detect", "publish", "persist"]
+DEFAULT_QUEUE_SIZE = 1000 #frames waiting per lane
+DEFAULT_ALERT_BUDGET_MS = 100 #receive to alert publish latency budget of detect lane
+
+
+class Lane: #queue, worker thread and latency histogram of one lane
+    def __init__(self, lane_idx, stage_fn, queue_size):
+        self.lane_idx = lane_idx
+        self.name = LANE_NAME_LIST[lane_idx]
+        self.stage_fn = stage_fn #stage_fn(frame) runs on lane thread
+        self.frame_queue = queue.Queue(queue_size) #(receive ts, frame)
+        self.latency = LatencyHistogram() #receive to stage done, written by lane thread only
+        self.stats = StatsCounters("lane", ["dropped", "failed"])
+        self.thread = None
+
+
+class LanePipeline:
+    '''runs detect, publish and persist stages of every frame on three lanes with their own queue and thread'''
+
+    def __init__(self, stage_fn_list, queue_size=DEFAULT_QUEUE_SIZE, alert_budget_ms=DEFAULT_ALERT_BUDGET_MS,
+                 persist_put_fn=None):
+        self.lane_list = [Lane(lane_idx, stage_fn, queue_size) for lane_idx, stage_fn in enumerate(stage_fn_list)]
+        self.persist_put_fn = persist_put_fn #non-blocking hand-off to write-behind persistence queue, replaces persist lane queue and thread
+        self.alert_budget = alert_budget_ms / 1000.0
+        self.stats = StatsCounters("lanes", ["over_budget"]) #detect lane frames which exceeded alert budget
+
+    @classmethod
+    def from_config(cls, stage_fn_list, lanes_cfg, persist_put_fn=None): #create pipeline from LANES section of scc.conf, None if disabled
+        '''create lane pipeline from configuration'''
+        if lanes_cfg is None or not lanes_cfg.get("ENABLED", False):
+            return None
+        return cls(
+            stage_fn_list,
+            queue_size=lanes_cfg.get("QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            alert_budget_ms=lanes_cfg.get("ALERT_BUDGET_MS", DEFAULT_ALERT_BUDGET_MS),
+            persist_put_fn=persist_put_fn)
+
+    def start(self): #start one thread per lane
+        for lane in self.lane_list:
+            if lane.lane_idx == LANE_PERSIST and self.persist_put_fn is not None:
+                continue
+            lane.thread = threading.Thread(target=self.lane_fn, args=(lane,), name="scc_lane_" + lane.name, daemon=True)
+            lane.thread.start()
+        Log.logger.info(f'scc_lanes: started, alert budget: {self.alert_budget * 1000:.0f} ms')
+
+    def put(self, frame, receive_ts): #called from MQTT callback thread, frame goes to every lane, detect lane first
+        item = (receive_ts, frame)
+        for lane in self.lane_list:
+            if lane.lane_idx == LANE_DETECT:
+                lane.frame_queue.put(item) #detection needs every transition, a full detect queue holds back the caller
+                continue
+            if lane.lane_idx == LANE_PERSIST and self.persist_put_fn is not None:
+                self.persist_put_fn(frame) #persistence queue overflow policy applies, spill instead of waiting
+                continue
+            try:
+                lane.frame_queue.put_nowait(item)
+            except queue.Full: #callback never waits for publish or persist lane, oldest frame of a lagging lane is dropped
+                try:
+                    lane.frame_queue.get_nowait()
+                    lane.stats.dropped.inc()
+                except queue.Empty:
+                    pass
+                lane.frame_queue.put_nowait(item)
+
+    def lane_fn(self, lane): #lane thread, stages of a lane run in frame order
+        while True:
+            receive_ts, frame = lane.frame_queue.get()
+            try:
+                lane.stage_fn(frame)
+            except Exception as ex:
+                lane.stats.failed.inc()
+                Log.logger.critical(f'scc_lanes: {lane.name}: exception: {ex}')
+            latency = time.time() - receive_ts
+            lane.latency.record(latency)
+            if lane.lane_idx == LANE_DETECT:
+                if latency > self.alert_budget:
+                    self.stats.over_budget.inc()
+                    Log.logger.warning(f'scc_lanes: alert latency {latency * 1000:.1f} ms over budget')
+                self.stats.log(self.get_stats)
+
+    def get_stats(self): #return latency summary, queue depth, dropped and failed frames of every lane
+        stats = {}
+        for lane in self.lane_list:
+            stats[lane.name] = dict(lane.latency.summary(), depth=lane.frame_queue.qsize(), **lane.stats.get())
+        stats.update(self.stats.get())
+        return stats
+
+    def register_metrics(self, registry): #export latency histogram, queue depth and counters of every lane
+        for lane in self.lane_list:
+            registry.histogram(LANE_METRIC, LANE_METRIC_HELP, {"lane": lane.name}, lane.latency)
+            registry.gauge(QUEUE_DEPTH_METRIC, QUEUE_DEPTH_METRIC_HELP, {"queue": "lane_" + lane.name}, lane.frame_queue.qsize)
+            lane.stats.register(registry, {"lane": lane.name})
+        self.stats.register(registry)
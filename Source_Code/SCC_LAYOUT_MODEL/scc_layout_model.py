@@ -16,36 +16,17 @@ from scc_log import *
 from peewee import *
 from datetime import datetime
 import sys
+from scc_db_pool import *
 sys.path.insert(1, "./common") #import common module
 
-if Log.logger is None:
-    my_log = Log()
-
-'''read configuration file'''
-cfg = SccDlmConfRead()
-cfg.read_cfg('../config/scc.conf')
-
-json_data = cfg.json_data
-db_name = json_data["DATABASE"]["DB_NAME"]
-user = json_data["DATABASE"]["USER"]
-password = json_data["DATABASE"]["PASSWORD"]
-host = json_data["DATABASE"]["HOST"]
-port = 5432
-psql_db = None
-
-try:
-    psql_db = PostgresqlDatabase(
-        db_name, user=user, password=password, host=host, port=port)
-    if psql_db != None:
-        psql_db.connect()
-except Exception as e:
-    Log.logger.critical(f'occ_dlm_model: Exception: {e}')
+'''models are bound to database_proxy, same pooled database as scc_dlm_model once init_db(cfg) is called'''
+psql_db = database_proxy
 
 
 class OccModel(Model):
     """A base model that will use our Postgresql database"""
     class Meta:
-        database = psql_db
+        database = database_proxy
 
 
 class LayoutSectionInfo(OccModel):
@@ -67,9 +48,9 @@ class LayoutSectionInfo(OccModel):
         
         
 #example of table created "section_connections_db_records = [
-    ConnectionRecord(section_id=101, left_normal=True, right_normal=False, left_reverse=True, right_reverse=False),
-    ConnectionRecord(section_id=102, left_normal=False, right_normal=True, left_reverse=False, right_reverse=True),
-    # ... more records ...]"
+#    ConnectionRecord(section_id=101, left_normal=True, right_normal=False, left_reverse=True, right_reverse=False),
+#    ConnectionRecord(section_id=102, left_normal=False, right_normal=True, left_reverse=False, right_reverse=True),
+#    # ... more records ...]"
 
 
 class LayoutSectionConnectionsInfo(OccModel):
@@ -89,4 +70,8 @@ if __name__ == '__main__':
         my_log = Log()
     Log.logger.info("layout_model: main program")
 
+    cfg = SccDlmConfRead()
+    cfg.read_cfg('../config/scc.conf')
+    psql_db = init_db(cfg)
+
     psql_db.create_tables([LayoutSectionInfo, LayoutSectionConnectionsInfo])
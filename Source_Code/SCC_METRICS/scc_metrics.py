@@ -0,0 +1,345 @@
+'''
+*****************************************************************************
+*File : scc_metrics.py
+*Module : SCC
+*Purpose : HDR style latency histograms, counters and gauges of SCC, Prometheus text endpoint and scc/metrics publish
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+'''Import SCC packages '''
+from scc_log import *
+sys.path.insert(1, "./common")
+
+SUB_BUCKET_BITS = 5 #values below 2**SUB_BUCKET_BITS us have their own bucket, above relative error is at most 1/16
+SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+SUB_BUCKET_HALF = SUB_BUCKET_COUNT >> 1
+MAX_SHIFT = 32 #largest recorded value is about 2**(MAX_SHIFT + SUB_BUCKET_BITS) us, 38 hours
+BUCKET_COUNT = SUB_BUCKET_COUNT + MAX_SHIFT * SUB_BUCKET_HALF
+QUANTILE_LIST = [0.5, 0.9, 0.99] #quantiles of histograms in Prometheus summaries
+DEFAULT_HTTP_HOST = "0.0.0.0"
+DEFAULT_HTTP_PORT = 9108 #Prometheus endpoint http://<host>:<port>/metrics, 0 disables it
+DEFAULT_PUBLISH_INTERVAL_S = 10 #seconds between two scc/metrics messages, 0 disables them
+DEFAULT_TOPIC = "scc/metrics"
+DEFAULT_MAX_TOPICS = 256 #topics counted one by one, messages of further topics are counted under OTHER_TOPIC
+OTHER_TOPIC = "other"
+METRIC_SUMMARY = "summary"
+METRIC_COUNTER = "counter"
+METRIC_GAUGE = "gauge"
+STAGE_METRIC = "scc_stage_seconds" #labels: stage = frame, parse, detect, publish, persist
+STAGE_METRIC_HELP = "time of a section frame evaluation stage"
+DB_INSERT_METRIC = "scc_db_insert_seconds" #labels: table = batch, frame
+DB_INSERT_METRIC_HELP = "time of a database insert of the persistence writer"
+LANE_METRIC = "scc_lane_latency_seconds" #labels: lane = detect, publish, persist
+LANE_METRIC_HELP = "section frame receive to lane stage done"
+QUEUE_DEPTH_METRIC = "scc_queue_depth" #labels: queue
+QUEUE_DEPTH_METRIC_HELP = "items waiting in queue"
+STATS_LOG_INTERVAL = 60 #seconds between two statistics log lines of a component
+
+
+def bucket_index(value_us): #bucket of a non negative integer value in microseconds
+    if value_us < SUB_BUCKET_COUNT:
+        return value_us
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    if shift > MAX_SHIFT:
+        return BUCKET_COUNT - 1
+    return SUB_BUCKET_COUNT + (shift - 1) * SUB_BUCKET_HALF + (value_us >> shift) - SUB_BUCKET_HALF
+
+
+def bucket_upper_us(index): #largest value in microseconds held by bucket index
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = (index - SUB_BUCKET_COUNT) // SUB_BUCKET_HALF + 1
+    top = (index - SUB_BUCKET_COUNT) % SUB_BUCKET_HALF + SUB_BUCKET_HALF
+    return ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    '''latency distribution in log-linear microsecond buckets, percentiles within 6.25%'''
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+    def record(self, secs): #add one latency in seconds, single writer thread
+        value_us = int(secs * 1000000) if secs > 0 else 0
+        self.counts[bucket_index(value_us)] += 1
+        self.count += 1
+        self.total_us += value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def percentile(self, q): #latency in seconds below which fraction q of recorded values lie
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if bucket_count != 0 and seen >= rank:
+                return min(bucket_upper_us(index), self.max_us) / 1000000
+        return self.max_us / 1000000
+
+    def summary(self): #count, mean, p50, p99, max in milliseconds
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_us / self.count / 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.percentile(0.5) * 1000, 3),
+            "p99_ms": round(self.percentile(0.99) * 1000, 3),
+            "max_ms": round(self.max_us / 1000, 3)}
+
+    def reset(self):
+        for index in range(BUCKET_COUNT):
+            self.counts[index] = 0
+        self.count = 0
+        self.total_us = 0
+        self.max_us = 0
+
+
+class Counter: #monotonic counter, incremented from any thread
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class StatsCounters:
+    '''named counters of one SCC component, logged every STATS_LOG_INTERVAL and exported as scc_<component>_<name>_total'''
+
+    def __init__(self, component, name_list):
+        self.component = component #eg:- persistence, log lines start with scc_<component>
+        self.name_list = list(name_list)
+        for name in self.name_list: #counter per name as attribute, eg:- stats.written.inc()
+            setattr(self, name, Counter())
+        self.last_log_ts = time.time()
+
+    def get(self): #return name -> value of every counter
+        return {name: getattr(self, name).value for name in self.name_list}
+
+    def log(self, stats_fn=None): #log stats_fn() of component, counters if None, at most once every STATS_LOG_INTERVAL seconds
+        now_ts = time.time()
+        if now_ts - self.last_log_ts >= STATS_LOG_INTERVAL:
+            self.last_log_ts = now_ts
+            Log.logger.info(f'scc_{self.component}: stats: {stats_fn() if stats_fn is not None else self.get()}')
+
+    def register(self, registry, labels=None): #register every counter in registry under labels
+        for name in self.name_list:
+            registry.counter(f'scc_{self.component}_{name}_total', f'{self.component} {name}'.replace("_", " "),
+                             labels, getattr(self, name))
+
+
+def label_text(label_dict): #Prometheus label pairs of label_dict without braces, eg:- stage="parse"
+    pair_list = []
+    for key, value in label_dict.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pair_list.append(f'{key}="{value}"')
+    return ",".join(pair_list)
+
+
+class MetricFamily: #metrics of one name, type and help text
+    def __init__(self, name, metric_type, help_text):
+        self.name = name
+        self.metric_type = metric_type
+        self.help_text = help_text
+        self.member_list = [] #(label_dict, label text, LatencyHistogram, Counter or value function)
+
+
+class MetricsRegistry:
+    '''histograms, counters and gauges of one SCC process, rendered as Prometheus text or scc/metrics message'''
+
+    def __init__(self, const_labels=None):
+        self.const_labels = dict(const_labels) if const_labels is not None else {} #labels of every metric, eg:- scc_id
+        self.family_dict = {} #name -> MetricFamily, in registration order
+        self.lock = threading.Lock() #guards family_dict, recording never takes it
+
+    def add(self, name, metric_type, help_text, labels, metric): #register metric object under name and labels
+        label_dict = dict(self.const_labels, **(labels or {}))
+        with self.lock:
+            family = self.family_dict.get(name)
+            if family is None:
+                family = self.family_dict[name] = MetricFamily(name, metric_type, help_text)
+            elif family.metric_type != metric_type:
+                raise ValueError(f'metric {name} is a {family.metric_type}, not a {metric_type}')
+            family.member_list.append((label_dict, label_text(label_dict), metric))
+        return metric
+
+    def histogram(self, name, help_text, labels=None, histogram=None): #register histogram (new one if None), return it
+        return self.add(name, METRIC_SUMMARY, help_text, labels, histogram if histogram is not None else LatencyHistogram())
+
+    def counter(self, name, help_text, labels=None, counter=None): #register counter (new one if None), return it
+        return self.add(name, METRIC_COUNTER, help_text, labels, counter if counter is not None else Counter())
+
+    def gauge(self, name, help_text, labels, value_fn): #register gauge read by value_fn() when rendered
+        return self.add(name, METRIC_GAUGE, help_text, labels, value_fn)
+
+    def family_list(self):
+        with self.lock:
+            return [(family, list(family.member_list)) for family in self.family_dict.values()]
+
+    def render_prometheus(self): #Prometheus text exposition format 0.0.4
+        line_list = []
+        for family, member_list in self.family_list():
+            line_list.append(f'# HELP {family.name} {family.help_text}')
+            line_list.append(f'# TYPE {family.name} {family.metric_type}')
+            for label_dict, labels, metric in member_list:
+                sep = "," if labels else ""
+                if family.metric_type == METRIC_SUMMARY:
+                    for quantile in QUANTILE_LIST:
+                        line_list.append(f'{family.name}{{{labels}{sep}quantile="{quantile}"}} {metric.percentile(quantile)!r}')
+                    line_list.append(f'{family.name}_sum{{{labels}}} {metric.total_us / 1000000!r}')
+                    line_list.append(f'{family.name}_count{{{labels}}} {metric.count}')
+                elif family.metric_type == METRIC_COUNTER:
+                    line_list.append(f'{family.name}{{{labels}}} {metric.value}')
+                else:
+                    value = gauge_value(metric)
+                    line_list.append(f'{family.name}{{{labels}}} {value!r}' if value is not None else f'{family.name}{{{labels}}} NaN')
+        return "\n".join(line_list) + "\n"
+
+    def snapshot(self): #metrics as a list of dicts, histograms as summary in milliseconds
+        metric_list = []
+        for family, member_list in self.family_list():
+            for label_dict, labels, metric in member_list:
+                record = {"name": family.name, "labels": label_dict}
+                if family.metric_type == METRIC_SUMMARY:
+                    record.update(metric.summary())
+                elif family.metric_type == METRIC_COUNTER:
+                    record["value"] = metric.value
+                else:
+                    record["value"] = gauge_value(metric)
+                metric_list.append(record)
+        return metric_list
+
+
+def gauge_value(value_fn): #value of gauge, None if value_fn fails
+    try:
+        return float(value_fn())
+    except Exception:
+        return None
+
+
+class MetricsMqttClient:
+    '''MqttClient with per topic counters of published and received messages, other attributes pass through'''
+
+    def __init__(self, mqtt_client, registry, max_topics=DEFAULT_MAX_TOPICS):
+        self.mqtt_client = mqtt_client
+        self.registry = registry
+        self.max_topics = max_topics
+        self.published_dict = {} #topic -> Counter
+        self.received_dict = {} #topic -> Counter
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name): #connect and every other MqttClient attribute
+        return getattr(self.mqtt_client, name)
+
+    def topic_counter(self, counter_dict, name, help_text, topic): #counter of topic, created on first message of topic
+        with self.lock:
+            counter = counter_dict.get(topic)
+            if counter is None:
+                if len(counter_dict) >= self.max_topics: #eg:- occ/playback/<session>, one counter for all further topics
+                    topic = OTHER_TOPIC
+                    counter = counter_dict.get(topic)
+                if counter is None:
+                    counter = self.registry.counter(name, help_text, {"topic": topic})
+                    counter_dict[topic] = counter
+            return counter
+
+    def pub(self, topic, *args, **kwargs):
+        counter = self.published_dict.get(topic)
+        if counter is None:
+            counter = self.topic_counter(self.published_dict, "scc_mqtt_published_total", "MQTT messages published", topic)
+        counter.inc() #lanes, delta publisher and metrics publisher publish from their own threads
+        return self.mqtt_client.pub(topic, *args, **kwargs)
+
+    def sub(self, topic, handler_fn): #handler_fn is wrapped once, a message only increments its counter
+        counter = self.topic_counter(self.received_dict, "scc_mqtt_received_total", "MQTT messages received", topic)
+
+        def counted_handler_fn(in_client, user_data, message):
+            counter.inc()
+            return handler_fn(in_client, user_data, message)
+        return self.mqtt_client.sub(topic, counted_handler_fn)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler): #GET /metrics of MetricsExporter
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args): #scrapes are not logged
+        pass
+
+
+class MetricsExporter:
+    '''serves registry on a Prometheus text HTTP endpoint and publishes it on scc/metrics periodically'''
+
+    def __init__(self, registry, mqtt_client=None, http_host=DEFAULT_HTTP_HOST, http_port=DEFAULT_HTTP_PORT,
+                 publish_interval_s=DEFAULT_PUBLISH_INTERVAL_S, topic=DEFAULT_TOPIC):
+        self.registry = registry
+        self.mqtt_client = mqtt_client
+        self.http_host = http_host
+        self.http_port = http_port
+        self.publish_interval = publish_interval_s
+        self.topic = topic
+        self.http_server = None
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, registry, mqtt_client, metrics_cfg, port_offset=0): #create exporter from METRICS section of scc.conf, None if disabled
+        '''create metrics exporter from configuration'''
+        if metrics_cfg is None or not metrics_cfg.get("ENABLED", False):
+            return None
+        http_port = metrics_cfg.get("HTTP_PORT", DEFAULT_HTTP_PORT)
+        return cls(
+            registry, mqtt_client,
+            http_host=metrics_cfg.get("HTTP_HOST", DEFAULT_HTTP_HOST),
+            http_port=http_port + port_offset if http_port != 0 else 0, #shard workers serve on the ports after it
+            publish_interval_s=metrics_cfg.get("PUBLISH_INTERVAL_S", DEFAULT_PUBLISH_INTERVAL_S),
+            topic=metrics_cfg.get("TOPIC", DEFAULT_TOPIC))
+
+    def start(self): #start HTTP server thread and publisher thread
+        try:
+            if self.http_port != 0:
+                self.http_server = ThreadingHTTPServer((self.http_host, self.http_port), MetricsRequestHandler)
+                self.http_server.daemon_threads = True
+                self.http_server.registry = self.registry
+                threading.Thread(target=self.http_server.serve_forever, name="scc_metrics_http", daemon=True).start()
+            if self.publish_interval > 0 and self.mqtt_client is not None:
+                threading.Thread(target=self.publisher_fn, name="scc_metrics", daemon=True).start()
+            Log.logger.info(f'scc_metrics: started, http port: {self.http_port}, '
+                            f'{self.topic} every {self.publish_interval}s')
+        except Exception as ex:
+            Log.logger.critical(f'scc_metrics: start: exception: {ex}')
+
+    def stop(self):
+        self.stop_event.set()
+        if self.http_server is not None:
+            self.http_server.shutdown()
+
+    def publish(self): #publish one scc/metrics message
+        self.mqtt_client.pub(self.topic, json.dumps({"ts": time.time(), "metrics": self.registry.snapshot()}))
+
+    def publisher_fn(self): #publisher thread, one message per publish interval
+        while not self.stop_event.wait(self.publish_interval):
+            try:
+                self.publish()
+            except Exception as ex:
+                Log.logger.critical(f'scc_metrics: publisher_fn: exception: {ex}')
@@ -0,0 +1,243 @@
+'''
+*****************************************************************************
+*File : scc_partition.py
+*Module : SCC
+*Purpose : Daily range partitions on ts of section, section_playback(_packed), train_trace and trail_through_playback with retention
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import re
+import time
+import argparse
+import threading
+from datetime import datetime, timezone
+
+'''Import SCC packages '''
+from scc_dlm_conf import *
+from scc_log import *
+from peewee import *
+from scc_dlm_model import *
+from scc_db_pool import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+PARTITIONED_MODEL_LIST = [SectionInfo, SectionPlaybackInfo, SectionPlaybackPackedInfo, TrainTraceInfo, TrailThroughPlayback] #tables partitioned by day on ts
+SECONDS_PER_DAY = 86400 #partitions cover UTC days, ts is seconds since epoch
+DEFAULT_PRECREATE_DAYS = 7 #partitions are created this many days ahead, writes never wait for one
+DEFAULT_RETENTION_DAYS = 90 #partitions entirely older than this are dropped, 0 keeps all
+DEFAULT_CHECK_INTERVAL_S = 3600 #seconds between two partition maintenance runs
+RETRY_INTERVAL_S = 60 #seconds before a run which could not connect to database is tried again
+LEGACY_SUFFIX = "_legacy" #rows present before conversion, kept as one partition until retention drops it
+DEFAULT_SUFFIX = "_pdefault" #rows with no ts, or beyond created partitions
+PARTITION_UPPER_BOUND = re.compile(r"TO \('?([^')]+)'?\)") #upper bound of pg_get_expr(relpartbound)
+
+
+def day_start(ts): #ts of 00:00 UTC of day holding ts
+    return int(ts // SECONDS_PER_DAY) * SECONDS_PER_DAY
+
+
+def partition_name(table_name, start_ts): #name of daily partition, e.g. section_p20210315
+    return table_name + "_p" + datetime.fromtimestamp(start_ts, tz=timezone.utc).strftime("%Y%m%d")
+
+
+def is_partitioned(database, table_name): #True if table is a partitioned table
+    cursor = database.execute_sql("SELECT relkind FROM pg_class WHERE relname = %s AND relkind IN ('r', 'p')", (table_name,))
+    row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def partition_list(database, table_name): #[(partition name, upper bound ts or None for default partition)]
+    cursor = database.execute_sql(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = %s",
+        (table_name,))
+    bound_list = []
+    for name, bound in cursor.fetchall():
+        match = PARTITION_UPPER_BOUND.search(bound)
+        bound_list.append((name, float(match.group(1)) if match is not None and match.group(1) != "MAXVALUE" else None))
+    return bound_list
+
+
+def create_partition(database, table_name, start_ts): #create daily partition, rows of that day waiting in default partition move into it
+    name = partition_name(table_name, start_ts)
+    end_ts = start_ts + SECONDS_PER_DAY
+    with database.atomic():
+        database.execute_sql(f'CREATE TABLE "{name}" (LIKE "{table_name}" INCLUDING DEFAULTS)')
+        cursor = database.execute_sql(
+            f'WITH moved AS (DELETE FROM "{table_name}{DEFAULT_SUFFIX}" WHERE ts >= %s AND ts < %s RETURNING *) '
+            f'INSERT INTO "{name}" SELECT * FROM moved', (start_ts, end_ts))
+        database.execute_sql(
+            f'ALTER TABLE "{table_name}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', (start_ts, end_ts))
+    return cursor.rowcount
+
+
+def drop_partition(database, table_name, name):
+    with database.atomic():
+        database.execute_sql(f'ALTER TABLE "{table_name}" DETACH PARTITION "{name}"')
+        database.execute_sql(f'DROP TABLE "{name}"')
+
+
+def convert_table(database, model, precreate_days=DEFAULT_PRECREATE_DAYS):
+    '''turn table of model into a partitioned table, existing rows stay in place as its legacy partition'''
+    table_name = model._meta.table_name
+    if not database.table_exists(table_name):
+        model._schema.create_table(safe=True) #new database, empty legacy partition is dropped by retention
+    if is_partitioned(database, table_name):
+        Log.logger.info(f'scc_partition: {table_name} is already partitioned')
+        return False
+
+    legacy_name = table_name + LEGACY_SUFFIX
+    with database.atomic(): #all or nothing, SCC must not be writing meanwhile
+        database.execute_sql(f'LOCK TABLE "{table_name}" IN ACCESS EXCLUSIVE MODE')
+        max_ts = database.execute_sql(f'SELECT max(ts) FROM "{table_name}"').fetchone()[0]
+        cutover_ts = day_start(max(time.time(), max_ts if max_ts is not None else 0)) + SECONDS_PER_DAY
+        sequence_name = database.execute_sql("SELECT pg_get_serial_sequence(%s, 'id')", (table_name,)).fetchone()[0]
+
+        database.execute_sql(f'ALTER TABLE "{table_name}" RENAME TO "{legacy_name}"')
+        index_list = database.execute_sql("SELECT indexname FROM pg_indexes WHERE tablename = %s", (legacy_name,)).fetchall()
+        for index_row in index_list: #parent indexes take the model index names
+            database.execute_sql(f'ALTER INDEX "{index_row[0]}" RENAME TO "{index_row[0]}{LEGACY_SUFFIX}"')
+
+        database.execute_sql(
+            f'CREATE TABLE "{table_name}" (LIKE "{legacy_name}" INCLUDING DEFAULTS) PARTITION BY RANGE (ts)')
+        if sequence_name is not None: #id sequence must outlive legacy partition
+            database.execute_sql(f'ALTER SEQUENCE {sequence_name} OWNED BY "{table_name}".id')
+        database.execute_sql(f'CREATE TABLE "{table_name}{DEFAULT_SUFFIX}" PARTITION OF "{table_name}" DEFAULT')
+        database.execute_sql(
+            f'WITH moved AS (DELETE FROM "{legacy_name}" WHERE ts IS NULL RETURNING *) '
+            f'INSERT INTO "{table_name}{DEFAULT_SUFFIX}" SELECT * FROM moved')
+        database.execute_sql(
+            f'ALTER TABLE "{table_name}" ATTACH PARTITION "{legacy_name}" FOR VALUES FROM (MINVALUE) TO (%s)',
+            (cutover_ts,))
+        model._schema.create_indexes(safe=True) #partitioned indexes, created on every partition
+
+        for day_idx in range(precreate_days + 1):
+            create_partition(database, table_name, cutover_ts + day_idx * SECONDS_PER_DAY)
+    Log.logger.info(f'scc_partition: {table_name} partitioned, rows before '
+                    f'{datetime.fromtimestamp(cutover_ts, tz=timezone.utc).isoformat()} kept in {legacy_name}')
+    return True
+
+
+class PartitionManager:
+    '''creates daily partitions ahead of time and drops partitions older than retention'''
+
+    def __init__(self, model_list=PARTITIONED_MODEL_LIST, precreate_days=DEFAULT_PRECREATE_DAYS,
+                 retention_days=DEFAULT_RETENTION_DAYS, check_interval_s=DEFAULT_CHECK_INTERVAL_S):
+        self.model_list = model_list
+        self.precreate_days = precreate_days
+        self.retention_days = retention_days
+        self.check_interval = check_interval_s
+        self.stats = StatsCounters("partition", [
+            "runs", "created", "dropped",
+            "moved", #rows moved from default partition into a new daily partition
+            "failed"])
+        self.last_run_ts = 0.0
+        self.stop_event = threading.Event()
+        self.maintenance_thread = threading.Thread(target=self.maintenance_fn, name="scc_partition", daemon=True)
+
+    @classmethod
+    def from_config(cls, partition_cfg): #create partition manager from PARTITION section of scc.conf, None if disabled
+        '''create partition manager from configuration'''
+        if partition_cfg is None or not partition_cfg.get("ENABLED", False):
+            return None
+        return cls(
+            precreate_days=partition_cfg.get("PRECREATE_DAYS", DEFAULT_PRECREATE_DAYS),
+            retention_days=partition_cfg.get("RETENTION_DAYS", DEFAULT_RETENTION_DAYS),
+            check_interval_s=partition_cfg.get("CHECK_INTERVAL_S", DEFAULT_CHECK_INTERVAL_S))
+
+    def start(self): #start partition maintenance thread
+        self.maintenance_thread.start()
+        Log.logger.info(
+            f'scc_partition: maintenance started, precreate days: {self.precreate_days}, '
+            f'retention days: {self.retention_days}, check interval: {self.check_interval}s')
+
+    def stop(self):
+        self.stop_event.set()
+
+    def maintenance_fn(self): #partition maintenance thread
+        while not self.stop_event.is_set():
+            wait_s = self.check_interval
+            try:
+                with connection_context():
+                    self.maintain()
+            except Exception as ex: #eg:- no connection to database, partitions are created ahead so a later run catches up
+                self.stats.failed.inc()
+                Log.logger.critical(f'scc_partition: maintenance_fn: exception: {ex}')
+                wait_s = min(RETRY_INTERVAL_S, self.check_interval)
+            self.stop_event.wait(wait_s)
+
+    def maintain(self, now_ts=None): #create missing partitions and drop expired ones of every table
+        '''one partition maintenance run'''
+        database = get_database()
+        if now_ts is None:
+            now_ts = time.time()
+        for model in self.model_list:
+            table_name = model._meta.table_name
+            try:
+                if not is_partitioned(database, table_name):
+                    Log.logger.warning(f'scc_partition: {table_name} is not partitioned, run scc_partition.py --convert')
+                    continue
+                self.maintain_table(database, table_name, now_ts)
+            except Exception as ex:
+                self.stats.failed.inc()
+                Log.logger.critical(f'scc_partition: {table_name}: exception: {ex}')
+        self.stats.runs.inc()
+        self.last_run_ts = now_ts
+        Log.logger.info(f'scc_partition: stats: {self.get_stats()}')
+
+    def maintain_table(self, database, table_name, now_ts):
+        bound_list = partition_list(database, table_name)
+        upper_ts = max([bound for name, bound in bound_list if bound is not None], default=day_start(now_ts))
+        start_ts = day_start(now_ts)
+        while start_ts < upper_ts: #days already covered
+            start_ts += SECONDS_PER_DAY
+        while start_ts <= day_start(now_ts) + self.precreate_days * SECONDS_PER_DAY:
+            moved = create_partition(database, table_name, start_ts)
+            self.stats.created.inc()
+            self.stats.moved.inc(moved)
+            start_ts += SECONDS_PER_DAY
+
+        if self.retention_days <= 0:
+            return
+        expiry_ts = day_start(now_ts) - self.retention_days * SECONDS_PER_DAY
+        for name, bound in bound_list:
+            if bound is not None and bound <= expiry_ts: #every row of partition is older than retention
+                drop_partition(database, table_name, name)
+                Log.logger.info(f'scc_partition: dropped {name}')
+                self.stats.dropped.inc()
+
+    def get_stats(self): #return copy of partition maintenance counters
+        return dict(self.stats.get(), last_run_ts=self.last_run_ts)
+
+    def register_metrics(self, registry): #export partition maintenance counters
+        self.stats.register(registry)
+
+
+if __name__ == '__main__':
+    '''Initialise logger'''
+    if Log.logger is None:
+        my_log = Log()
+
+    parser = argparse.ArgumentParser(description="daily partitions of section, section_playback, train_trace and trail_through_playback")
+    parser.add_argument("--convert", action="store_true", help="partition existing tables, run with SCC stopped")
+    args = parser.parse_args()
+
+    cfg = SccDlmConfRead()
+    cfg.read_cfg('../config/scc.conf')
+    database = init_db(cfg)
+    partition_cfg = dict(cfg.partition, ENABLED=True)
+    partition_manager = PartitionManager.from_config(partition_cfg)
+
+    with database.connection_context():
+        if args.convert:
+            for model in PARTITIONED_MODEL_LIST:
+                try:
+                    convert_table(database, model, partition_manager.precreate_days)
+                except Exception as ex:
+                    Log.logger.critical(f'scc_partition: {model._meta.table_name} not converted: {ex}')
+                    sys.exit(1)
+        partition_manager.maintain()
@@ -0,0 +1,323 @@
+'''
+*****************************************************************************
+*File : scc_persistence.py
+*Module : SCC
+*Purpose : SCC write-behind persistence queue for section information
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import os
+import json
+import time
+import queue
+import threading
+from peewee import IntegrityError, DataError, ProgrammingError
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_db_pool import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+OVERFLOW_BLOCK = "block" #callback waits until writer thread frees a slot
+OVERFLOW_DROP_OLDEST = "drop_oldest" #oldest queued frame is discarded to make room
+OVERFLOW_SPILL = "spill" #frames are appended to a spill file and written back later
+OVERFLOW_POLICY_LIST = [OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_SPILL]
+
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_FLUSH_INTERVAL_MS = 500 #maximum time writer waits to fill a batch
+DEFAULT_SPILL_PATH = "../spill"
+RETRY_INTERVAL_S = 1 #wait before a failed batch is written again, doubled on every further failure
+MAX_RETRY_INTERVAL_S = 30
+MAX_BULK_RETRIES = 3 #failed bulk writes in a row before frames are written one by one to find the failing frame
+PERMANENT_ERROR_LIST = (IntegrityError, DataError, ProgrammingError, ValueError, TypeError, KeyError) #frame can never be written, retrying does not help
+
+
+class PersistenceQueue:
+    '''write-behind queue between MQTT callback thread and the database writer thread'''
+
+    def __init__(self, scc_api, queue_size=DEFAULT_QUEUE_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                 overflow_policy=OVERFLOW_BLOCK, spill_path=DEFAULT_SPILL_PATH,
+                 flush_interval_ms=DEFAULT_FLUSH_INTERVAL_MS, bulk_insert=True):
+        self.scc_api = scc_api #SccAPI object used by writer thread for database inserts
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.bulk_insert = bulk_insert #write whole batch in one COPY transaction instead of per frame inserts
+        self.overflow_policy = overflow_policy
+        self.frame_queue = queue.Queue(maxsize=queue_size) #bounded queue of (enqueue_ts, SectionFrame or json_msg) tuples
+        self.stats = StatsCounters("persistence", [
+            "enqueued", "written", "dropped", "spilled", "replayed",
+            "failed", #frames of failed write attempts, frames are kept and written again
+            "retries", "batches", "rows",
+            "dead_lettered"]) #frames failed with a permanent error, moved to dead letter file
+        self.last_lag = 0.0 #enqueue to written time of last written frame, written by writer thread only
+        self.max_lag = 0.0
+        self.batch_insert_latency = LatencyHistogram() #bulk insert of one batch, written by writer thread only
+        self.frame_insert_latency = LatencyHistogram() #per frame transaction when bulk insert is off
+
+        self.spill_path = spill_path
+        self.spill_file = os.path.join(spill_path, "section_info.spill")
+        self.replay_file = os.path.join(spill_path, "section_info.replay")
+        self.replay_offset_file = os.path.join(spill_path, "section_info.replay.offset") #byte offset of first unwritten line of replay file
+        self.dead_letter_file = os.path.join(spill_path, "section_info.dead") #frames which can never be written
+        self.spill_lock = threading.Lock()
+        self.spilling = False #once a frame is spilled, later frames follow it to the spill file to keep order
+        self.pending_batch = [] #frames taken off the queue but not written yet, written before any newer frame
+        self.write_retries = 0 #failed write rounds in a row, written by writer thread only
+
+        self.writer_thread = threading.Thread(
+            target=self.writer_fn, name="scc_persistence_writer", daemon=True)
+
+        if self.overflow_policy not in OVERFLOW_POLICY_LIST:
+            Log.logger.warning(
+                f'scc_persistence: unknown overflow policy {self.overflow_policy}, using {OVERFLOW_BLOCK}')
+            self.overflow_policy = OVERFLOW_BLOCK
+
+    @classmethod
+    def from_config(cls, scc_api, persistence_cfg): #create persistence queue from PERSISTENCE section of scc.conf
+        '''create persistence queue from configuration'''
+        if persistence_cfg is None:
+            persistence_cfg = {}
+        return cls(
+            scc_api,
+            queue_size=persistence_cfg.get("QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+            batch_size=persistence_cfg.get("BATCH_SIZE", DEFAULT_BATCH_SIZE),
+            overflow_policy=persistence_cfg.get("OVERFLOW_POLICY", OVERFLOW_BLOCK),
+            spill_path=persistence_cfg.get("SPILL_PATH", DEFAULT_SPILL_PATH),
+            flush_interval_ms=persistence_cfg.get("FLUSH_INTERVAL_MS", DEFAULT_FLUSH_INTERVAL_MS),
+            bulk_insert=persistence_cfg.get("BULK_INSERT", True))
+
+    def start(self): #start database writer thread
+        try:
+            if self.overflow_policy == OVERFLOW_SPILL:
+                os.makedirs(self.spill_path, exist_ok=True)
+            if os.path.exists(self.spill_file) or os.path.exists(self.replay_file):
+                self.spilling = True #frames left over from previous run are written first
+            self.writer_thread.start()
+            Log.logger.info(
+                f'scc_persistence: writer started, queue size: {self.frame_queue.maxsize}, '
+                f'batch size: {self.batch_size}, flush interval: {self.flush_interval}s, '
+                f'bulk insert: {self.bulk_insert}, overflow policy: {self.overflow_policy}')
+        except Exception as ex:
+            Log.logger.critical(f'scc_persistence: start: exception: {ex}')
+
+    def put(self, json_msg, block=True): #called from MQTT callback or lane thread, returns without touching the database
+        '''enqueue section message for write-behind persistence, block False never waits for a free slot'''
+        try:
+            item = (time.time(), json_msg)
+
+            if self.overflow_policy == OVERFLOW_BLOCK and block and not self.spilling:
+                self.frame_queue.put(item)
+            elif self.overflow_policy == OVERFLOW_DROP_OLDEST:
+                while True:
+                    try:
+                        self.frame_queue.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self.frame_queue.get_nowait() #discard oldest frame
+                            self.stats.dropped.inc()
+                        except queue.Empty:
+                            pass
+            else: #spill policy, or block policy for a caller which must not wait
+                with self.spill_lock:
+                    if not self.spilling:
+                        try:
+                            self.frame_queue.put_nowait(item)
+                        except queue.Full:
+                            os.makedirs(self.spill_path, exist_ok=True)
+                            self.spilling = True
+                    if self.spilling:
+                        self.spill_item(item)
+
+            self.stats.enqueued.inc()
+        except Exception as ex:
+            Log.logger.critical(f'scc_persistence: put: exception: {ex}')
+
+    def spill_item(self, item): #append queued item to spill file, caller holds spill_lock
+        msg = item[1].to_json() if isinstance(item[1], SectionFrame) else item[1] #frames are spilled as their original payload
+        with open(self.spill_file, "a") as f:
+            f.write(json.dumps({"enqueue_ts": item[0], "msg": msg}) + "\n")
+        self.stats.spilled.inc()
+
+    def depth(self): #number of frames waiting in memory queue, including frames of a batch waiting to be written again
+        return self.frame_queue.qsize() + len(self.pending_batch)
+
+    def get_stats(self): #return copy of persistence counters
+        return dict(self.stats.get(), depth=self.depth(), last_lag=self.last_lag, max_lag=self.max_lag)
+
+    def register_metrics(self, registry): #export counters, insert histograms, queue depth and lag
+        self.stats.register(registry)
+        if self.bulk_insert:
+            insert_list = [("batch", self.batch_insert_latency)]
+        else:
+            insert_list = [("frame", self.frame_insert_latency)]
+        for table, histogram in insert_list:
+            registry.histogram(DB_INSERT_METRIC, DB_INSERT_METRIC_HELP, {"table": table}, histogram)
+        registry.gauge(QUEUE_DEPTH_METRIC, QUEUE_DEPTH_METRIC_HELP, {"queue": "persistence"}, self.depth)
+        registry.gauge("scc_persistence_lag_seconds", "enqueue to written time of last written frame", None,
+                       lambda: self.last_lag)
+
+    def writer_fn(self): #database writer thread, drains queue in batches
+        '''write queued section messages into database'''
+        retry_interval = RETRY_INTERVAL_S
+        while True:
+            try:
+                if len(self.pending_batch) == 0:
+                    self.pending_batch = self.collect_batch()
+
+                with connection_context(): #pooled connection of writer thread, returned to pool after each batch
+                    if len(self.pending_batch) != 0:
+                        written = self.write_batch(self.pending_batch)
+                        self.pending_batch = self.pending_batch[written:]
+
+                    replayed = True
+                    if len(self.pending_batch) == 0 and self.spilling and self.frame_queue.empty():
+                        replayed = self.replay_spill()
+
+                if len(self.pending_batch) == 0 and replayed:
+                    retry_interval = RETRY_INTERVAL_S
+                    self.write_retries = 0 #back to bulk insert
+                else:
+                    self.write_retries += 1
+                    retry_interval = self.wait_retry(retry_interval)
+                self.stats.log(self.get_stats)
+            except Exception as ex: #eg:- no connection to database, frames of pending batch are kept
+                Log.logger.critical(f'scc_persistence: writer_fn: exception: {ex}')
+                self.write_retries += 1
+                retry_interval = self.wait_retry(retry_interval)
+
+    def collect_batch(self): #collect batch_size frames or flush_interval worth of frames, empty list if queue stays empty
+        try:
+            batch = [self.frame_queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+
+        flush_deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = flush_deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.frame_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def wait_retry(self, retry_interval): #wait before writing failed frames again, return next retry interval
+        self.stats.retries.inc()
+        time.sleep(retry_interval)
+        return min(retry_interval * 2, MAX_RETRY_INTERVAL_S)
+
+    def write_batch(self, batch): #insert queued frames of batch in arrival order, return number of leading frames written or dead lettered
+        if self.bulk_insert and self.write_retries < MAX_BULK_RETRIES: #after repeated failures frames are written one by one
+            insert_start = time.perf_counter()
+            rows = self.scc_api.bulk_insert_frames([json_msg for enqueue_ts, json_msg in batch])
+            self.batch_insert_latency.record(time.perf_counter() - insert_start)
+            self.stats.batches.inc()
+            if rows == 0: #transaction rolled back, whole batch is written again
+                self.stats.failed.inc(len(batch))
+                return 0
+            self.stats.written.inc(len(batch))
+            self.stats.rows.inc(rows)
+            self.record_lag(batch[0][0]) #oldest frame of batch
+            return len(batch)
+
+        written = 0
+        for enqueue_ts, json_msg in batch:
+            try:
+                insert_start = time.perf_counter()
+                self.scc_api.insert_frame(json_msg) #section, section_playback and train_trace rows in one transaction, raises on failure
+                self.frame_insert_latency.record(time.perf_counter() - insert_start)
+                #self.scc_api.yard_performance(json_msg)
+                #self.scc_api.torpedo_performance(json_msg)
+                self.stats.written.inc()
+                self.record_lag(enqueue_ts)
+                written += 1
+            except PERMANENT_ERROR_LIST as ex: #frame is moved aside so newer frames are not held behind it
+                self.dead_letter(enqueue_ts, json_msg, ex)
+                written += 1
+            except Exception as ex: #frame and the frames after it are written again
+                self.stats.failed.inc(len(batch) - written)
+                Log.logger.critical(f'scc_persistence: write_batch: exception: {ex}')
+                break
+
+        self.stats.batches.inc()
+        return written
+
+    def dead_letter(self, enqueue_ts, json_msg, ex): #append frame which can never be written to dead letter file
+        Log.logger.critical(f'scc_persistence: dead_letter: frame moved to {self.dead_letter_file}: {ex}')
+        msg = json_msg.to_json() if isinstance(json_msg, SectionFrame) else json_msg
+        os.makedirs(self.spill_path, exist_ok=True)
+        with open(self.dead_letter_file, "a") as f:
+            f.write(json.dumps({"enqueue_ts": enqueue_ts, "msg": msg, "error": str(ex)}) + "\n")
+        self.stats.dead_lettered.inc()
+
+    def record_lag(self, enqueue_ts): #enqueue to written time of a frame
+        lag = time.time() - enqueue_ts
+        self.last_lag = lag
+        if lag > self.max_lag:
+            self.max_lag = lag
+
+    def read_replay_offset(self): #byte offset of first unwritten line of replay file, 0 if not stored
+        try:
+            with open(self.replay_offset_file) as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def write_replay_offset(self, offset): #store offset of first unwritten line, survives a restart
+        offset_tmp_file = self.replay_offset_file + ".tmp"
+        with open(offset_tmp_file, "w") as f:
+            f.write(str(offset))
+        os.replace(offset_tmp_file, self.replay_offset_file)
+
+    def replay_spill(self): #write spilled frames back once memory queue is empty, False if a batch failed
+        '''replay spill file into database'''
+        try:
+            while True:
+                with self.spill_lock:
+                    if not os.path.exists(self.replay_file):
+                        if not os.path.exists(self.spill_file):
+                            self.spilling = False #spill fully drained, new frames go to memory queue again
+                            return True
+                        os.replace(self.spill_file, self.replay_file)
+                        self.write_replay_offset(0)
+
+                with open(self.replay_file, "rb") as f:
+                    f.seek(self.read_replay_offset())
+                    while True:
+                        batch = []
+                        offset_list = [] #offset of every line of batch
+                        while len(batch) < self.batch_size:
+                            offset = f.tell()
+                            line = f.readline()
+                            if len(line) == 0:
+                                break
+                            if len(line.strip()) == 0:
+                                continue
+                            spilled = json.loads(line)
+                            batch.append((spilled["enqueue_ts"], spilled["msg"]))
+                            offset_list.append(offset)
+                        if len(batch) == 0:
+                            break
+
+                        written = self.write_batch(batch)
+                        self.stats.replayed.inc(written)
+                        if written < len(batch): #replay file is kept, next replay starts at first unwritten frame
+                            self.write_replay_offset(offset_list[written])
+                            return False
+                        self.write_replay_offset(f.tell())
+
+                os.remove(self.replay_file)
+                os.remove(self.replay_offset_file)
+                Log.logger.info(f'scc_persistence: spill file replayed')
+        except Exception as ex:
+            Log.logger.critical(f'scc_persistence: replay_spill: exception: {ex}')
+            return False
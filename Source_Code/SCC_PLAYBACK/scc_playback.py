@@ -0,0 +1,214 @@
+'''
+*****************************************************************************
+*File : scc_playback.py
+*Module : SCC
+*Purpose : Stream section_playback frames of a time range in chunks, as a generator or over MQTT
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import threading
+
+'''Import SCC packages '''
+from scc_log import *
+from peewee import *
+from playhouse.postgres_ext import ServerSide
+from scc_dlm_model import *
+from scc_db_pool import *
+from scc_playback_codec import *
+sys.path.insert(1, "./common")
+
+DEFAULT_CHUNK_ROWS = 500 #frames fetched from server side cursor at a time, bounds memory of a playback
+DEFAULT_MAX_SESSIONS = 4 #concurrent MQTT playback sessions, each holds one pooled connection
+DEFAULT_TOPIC_PREFIX = "occ/playback/" #frames of a session are published on occ/playback/<session>
+PLAYBACK_REQUEST_TOPIC = "occ/playback_request" #{"session", "start_ts", "end_ts", "section_ids", "speed"}
+PLAYBACK_STOP_TOPIC = "occ/playback_stop" #{"session"}
+MAX_FRAME_WAIT_S = 5.0 #longest sleep between two paced frames, gaps in recording are shortened to this
+PLAYBACK_FORMAT_JSON = "json" #frames stored as JSON in section_playback
+PLAYBACK_FORMAT_PACKED = "packed" #frames stored by scc_playback_codec in section_playback_packed
+
+
+def read_playback(start_ts=None, end_ts=None, section_id_list=None, chunk_rows=DEFAULT_CHUNK_ROWS, packed=False,
+                  keyframe_interval_s=DEFAULT_KEYFRAME_INTERVAL_S):
+    '''yield (ts, sections) of section_playback frames with start_ts <= ts < end_ts in ts order'''
+    if packed:
+        yield from read_packed_playback(start_ts, end_ts, section_id_list, chunk_rows, keyframe_interval_s)
+        return
+    query = SectionPlaybackInfo.select(SectionPlaybackInfo.ts, SectionPlaybackInfo.sections)
+    if start_ts is not None:
+        query = query.where(SectionPlaybackInfo.ts >= start_ts) #partitions and BRIN blocks outside range are skipped
+    if end_ts is not None:
+        query = query.where(SectionPlaybackInfo.ts < end_ts)
+    query = query.order_by(SectionPlaybackInfo.ts).tuples()
+    section_id_set = set(section_id_list) if section_id_list else None
+
+    with get_database().atomic(): #named cursor lives inside a transaction
+        for ts, sections in ServerSide(query, array_size=chunk_rows):
+            if section_id_set is not None:
+                sections = [section for section in sections if section["section_id"] in section_id_set]
+            yield ts, sections
+
+
+def read_packed_playback(start_ts, end_ts, section_id_list, chunk_rows, keyframe_interval_s):
+    '''read_playback of section_playback_packed, decoding starts at the keyframes preceding start_ts'''
+    query = SectionPlaybackPackedInfo.select(SectionPlaybackPackedInfo.ts, SectionPlaybackPackedInfo.data)
+    if start_ts is not None:
+        query = query.where(SectionPlaybackPackedInfo.ts >= start_ts - keyframe_interval_s)
+    if end_ts is not None:
+        query = query.where(SectionPlaybackPackedInfo.ts < end_ts)
+    query = query.order_by(SectionPlaybackPackedInfo.ts, SectionPlaybackPackedInfo.id).tuples() #id keeps write order of equal ts
+    section_id_set = set(section_id_list) if section_id_list else None
+    decoder = PlaybackDecoder()
+
+    with get_database().atomic(): #named cursor lives inside a transaction
+        for ts, data in ServerSide(query, array_size=chunk_rows):
+            sections = decoder.decode(data)
+            if sections is None or (start_ts is not None and ts < start_ts): #record before its keyframe, or lead in
+                continue
+            if section_id_set is not None:
+                sections = [section for section in sections if section["section_id"] in section_id_set]
+            yield ts, sections
+
+
+def pace(frame_iter, speed, stop_event=None):
+    '''yield frames at recorded rate multiplied by speed, speed 0 yields them as fast as they are read'''
+    first_ts = None
+    try:
+        for ts, sections in frame_iter:
+            if speed > 0:
+                if first_ts is None:
+                    first_ts = ts
+                    start_wall = time.monotonic()
+                wait = (ts - first_ts) / speed - (time.monotonic() - start_wall)
+                if wait > MAX_FRAME_WAIT_S: #recording gap, shift the clock instead of sleeping through it
+                    start_wall -= wait - MAX_FRAME_WAIT_S
+                    wait = MAX_FRAME_WAIT_S
+                if wait > 0:
+                    if stop_event is not None:
+                        if stop_event.wait(wait):
+                            return
+                    else:
+                        time.sleep(wait)
+            if stop_event is not None and stop_event.is_set():
+                return
+            yield ts, sections
+    finally: #reader transaction ends with playback, also when consumer stops early
+        frame_iter.close()
+
+
+def stream_playback(start_ts=None, end_ts=None, section_id_list=None, speed=0, chunk_rows=DEFAULT_CHUNK_ROWS,
+                    packed=False, keyframe_interval_s=DEFAULT_KEYFRAME_INTERVAL_S):
+    '''paced frame generator for in-process consumers'''
+    return pace(read_playback(start_ts, end_ts, section_id_list, chunk_rows, packed, keyframe_interval_s), speed)
+
+
+class PlaybackSession: #one MQTT playback in progress
+    def __init__(self, session_id, start_ts, end_ts, section_id_list, speed):
+        self.session_id = session_id
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+        self.section_id_list = section_id_list
+        self.speed = speed
+        self.frames = 0
+        self.stop_event = threading.Event()
+
+
+class PlaybackServer:
+    '''serves occ/playback_request, frames of each session are published on occ/playback/<session>'''
+
+    def __init__(self, mqtt_client, chunk_rows=DEFAULT_CHUNK_ROWS, max_sessions=DEFAULT_MAX_SESSIONS,
+                 topic_prefix=DEFAULT_TOPIC_PREFIX, packed=False, keyframe_interval_s=DEFAULT_KEYFRAME_INTERVAL_S):
+        self.mqtt_client = mqtt_client
+        self.packed = packed #frames are read from section_playback_packed
+        self.keyframe_interval = keyframe_interval_s
+        self.chunk_rows = chunk_rows
+        self.max_sessions = max_sessions
+        self.topic_prefix = topic_prefix
+        self.session_dict = {} #session id -> PlaybackSession
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, mqtt_client, playback_cfg): #create playback server from PLAYBACK section of scc.conf
+        '''create playback server from configuration'''
+        if playback_cfg is None:
+            playback_cfg = {}
+        return cls(
+            mqtt_client,
+            chunk_rows=playback_cfg.get("CHUNK_ROWS", DEFAULT_CHUNK_ROWS),
+            max_sessions=playback_cfg.get("MAX_SESSIONS", DEFAULT_MAX_SESSIONS),
+            topic_prefix=playback_cfg.get("TOPIC_PREFIX", DEFAULT_TOPIC_PREFIX),
+            packed=playback_cfg.get("FORMAT", PLAYBACK_FORMAT_JSON) == PLAYBACK_FORMAT_PACKED,
+            keyframe_interval_s=playback_cfg.get("KEYFRAME_INTERVAL_S", DEFAULT_KEYFRAME_INTERVAL_S))
+
+    def playback_request_sub_fn(self, in_client, user_data, message):
+        '''subscribe occ/playback_request, start a playback thread for the session'''
+        try:
+            request = json.loads(message.payload)
+            session = PlaybackSession(
+                str(request["session"]), request.get("start_ts"), request.get("end_ts"),
+                request.get("section_ids"), float(request.get("speed", 1.0)))
+            with self.lock:
+                if session.session_id in self.session_dict:
+                    Log.logger.warning(f'scc_playback: session {session.session_id} already running')
+                    return
+                if len(self.session_dict) >= self.max_sessions:
+                    Log.logger.warning(f'scc_playback: session {session.session_id} refused, {self.max_sessions} sessions running')
+                    self.publish_end(session, "busy")
+                    return
+                self.session_dict[session.session_id] = session
+            threading.Thread(target=self.session_fn, args=(session,), name="scc_playback_" + session.session_id,
+                             daemon=True).start()
+        except Exception as ex:
+            Log.logger.critical(f'scc_playback: playback_request_sub_fn: exception: {ex}')
+
+    def playback_stop_sub_fn(self, in_client, user_data, message):
+        '''subscribe occ/playback_stop, stop session'''
+        try:
+            session_id = str(json.loads(message.payload)["session"])
+            with self.lock:
+                session = self.session_dict.get(session_id)
+            if session is not None:
+                session.stop_event.set()
+        except Exception as ex:
+            Log.logger.critical(f'scc_playback: playback_stop_sub_fn: exception: {ex}')
+
+    def session_fn(self, session): #playback thread of one session
+        status = "done"
+        topic = self.topic_prefix + session.session_id
+        ts_start = time.time()
+        try:
+            with connection_context():
+                frame_iter = pace(read_playback(session.start_ts, session.end_ts, session.section_id_list, self.chunk_rows,
+                                                self.packed, self.keyframe_interval),
+                                  session.speed, session.stop_event)
+                try:
+                    for ts, sections in frame_iter:
+                        self.mqtt_client.pub(topic, json.dumps({"ts": ts, "sections": sections}, separators=(",", ":")))
+                        session.frames += 1
+                finally: #reader transaction ends before connection goes back to pool
+                    frame_iter.close()
+            if session.stop_event.is_set():
+                status = "stopped"
+        except Exception as ex:
+            status = "failed"
+            Log.logger.critical(f'scc_playback: session {session.session_id}: exception: {ex}')
+        finally:
+            with self.lock:
+                self.session_dict.pop(session.session_id, None)
+        self.publish_end(session, status)
+        Log.logger.info(
+            f'scc_playback: session {session.session_id} {status}, frames: {session.frames}, '
+            f'secs: {time.time() - ts_start:.1f}')
+
+    def publish_end(self, session, status): #last message of a session, frames published and why it ended
+        self.mqtt_client.pub(self.topic_prefix + session.session_id,
+                             json.dumps({"end": True, "status": status, "frames": session.frames}, separators=(",", ":")))
+
+    def get_stats(self): #return running sessions and frames published so far
+        with self.lock:
+            return {session_id: session.frames for session_id, session in self.session_dict.items()}
@@ -0,0 +1,284 @@
+'''
+*****************************************************************************
+*File : scc_playback_codec.py
+*Module : SCC
+*Purpose : Compact binary encoding of section_playback frames, dictionary encoded keyframes and per field deltas
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import os
+import json
+import math
+import struct
+import threading
+
+'''Import SCC packages '''
+from scc_section_frame import *
+sys.path.insert(1, "./common")
+
+RECORD_KEYFRAME = 1 #string table and every section of the frame
+RECORD_DELTA = 2 #changed fields of changed sections since previous record of the same stream
+RECORD_JSON = 3 #frame the binary layout can not hold, stored as JSON
+DEFAULT_KEYFRAME_INTERVAL_S = 60 #every stream gets a keyframe at least this often, a range read starts this much earlier
+
+FIELD_LIST = SectionState._fields #section dict keys, in section message order
+STRING_FIELD_IDX_LIST = [FIELD_LIST.index(field) for field in
+                         ["section_id", "section_status", "direction", "torpedo_status", "first_axle"]]
+INT_FIELD_IDX_LIST = [FIELD_LIST.index(field) for field in ["engine_axle_count", "torpedo_axle_count", "error_code"]]
+SPEED_FIELD_IDX = FIELD_LIST.index("speed")
+FLAGS_IDX = len(FIELD_LIST) #extra row column, bit 0 set when speed is an integer in the message
+FLAG_SPEED_INT = 1
+
+ROW_FORMAT = "".join("H" if field_idx in STRING_FIELD_IDX_LIST else "d" if field_idx == SPEED_FIELD_IDX else "i"
+                     for field_idx in range(len(FIELD_LIST))) + "B"
+ROW = struct.Struct("<" + ROW_FORMAT) #one section, string fields are codes into the keyframe string table
+FIELD_STRUCT_LIST = [struct.Struct("<" + field_format) for field_format in ROW_FORMAT] #one row column, for deltas
+HEADER = struct.Struct("<BIHI") #record type, writer id, stream number, sequence number in stream
+COUNT = struct.Struct("<I")
+DELTA_SECTION = struct.Struct("<HH") #position of section in frame, mask of changed row columns
+STRING_LEN = struct.Struct("<H")
+STRING_NONE = 0xFFFF #string table entry of a null value
+MAX_STRINGS = 0xFFFF #string codes are two bytes
+INT_NONE = -2 ** 31 #int column value of a null field
+
+
+class CodecError(Exception): #frame can not be held by the binary layout
+    pass
+
+
+class EncodeStream: #writer side state of frames with the same list of sections
+    def __init__(self, stream_no):
+        self.stream_no = stream_no
+        self.seq = 0
+        self.states = None #SectionState tuple of last record
+        self.rows = None #encoded rows of last record
+        self.code_dict = None #string -> code of last keyframe
+        self.keyframe_ts = 0.0
+        self.last_ts = 0.0
+
+
+def int_column(value): #int field to row column
+    if value is None:
+        return INT_NONE
+    if type(value) is not int or value == INT_NONE:
+        raise CodecError(f'int value {value!r}')
+    return value
+
+
+def speed_column(value): #speed field to row column and flag
+    if value is None:
+        return math.nan, 0
+    if type(value) is int:
+        if float(value) != value:
+            raise CodecError(f'speed value {value!r}')
+        return float(value), FLAG_SPEED_INT
+    if type(value) is not float or math.isnan(value):
+        raise CodecError(f'speed value {value!r}')
+    return value, 0
+
+
+def encode_row(state, code_dict): #SectionState to row columns, KeyError for a string missing from code_dict
+    row = list(state)
+    for field_idx in STRING_FIELD_IDX_LIST:
+        row[field_idx] = code_dict[state[field_idx]]
+    for field_idx in INT_FIELD_IDX_LIST:
+        row[field_idx] = int_column(state[field_idx])
+    row[SPEED_FIELD_IDX], flags = speed_column(state[SPEED_FIELD_IDX])
+    row.append(flags)
+    return tuple(row)
+
+
+def decode_row(row, string_list): #row columns to section values
+    values = list(row[:FLAGS_IDX])
+    for field_idx in STRING_FIELD_IDX_LIST:
+        values[field_idx] = string_list[row[field_idx]]
+    for field_idx in INT_FIELD_IDX_LIST:
+        if values[field_idx] == INT_NONE:
+            values[field_idx] = None
+    speed = values[SPEED_FIELD_IDX]
+    if math.isnan(speed):
+        values[SPEED_FIELD_IDX] = None
+    elif row[FLAGS_IDX] & FLAG_SPEED_INT:
+        values[SPEED_FIELD_IDX] = int(speed)
+    return tuple(values)
+
+
+class PlaybackEncoder:
+    '''encodes section frames into keyframe and delta records, one stream per distinct list of sections'''
+
+    def __init__(self, keyframe_interval_s=DEFAULT_KEYFRAME_INTERVAL_S):
+        self.keyframe_interval = keyframe_interval_s
+        self.writer_id = struct.unpack("<I", os.urandom(4))[0] #streams of two writers never mix in a decoder
+        self.stream_dict = {} #tuple of section ids -> EncodeStream
+        self.lock = threading.Lock()
+
+    def reset(self): #next record of every stream is a keyframe, used after a failed write
+        with self.lock:
+            self.stream_dict.clear()
+
+    def encode(self, frame): #SectionFrame (or section message) to record bytes
+        '''encode one frame'''
+        frame = section_frame(frame)
+        with self.lock:
+            try:
+                return self.encode_frame(frame)
+            except (CodecError, struct.error, OverflowError, TypeError):
+                return bytes([RECORD_JSON]) + json.dumps(frame.section_dicts(), separators=(",", ":")).encode()
+
+    def encode_frame(self, frame):
+        states = frame.sections
+        key = tuple(map(SECTION_ID_FIELD, states))
+        stream = self.stream_dict.get(key)
+        if stream is None:
+            if len(states) > 0xFFFF:
+                raise CodecError(f'{len(states)} sections')
+            stream = EncodeStream(len(self.stream_dict) & 0xFFFF)
+        elif frame.ts - stream.keyframe_ts < self.keyframe_interval and frame.ts >= stream.last_ts:
+            try:
+                record = self.encode_delta(stream, states)
+                stream.last_ts = frame.ts
+                return record
+            except KeyError: #new string value, keyframe carries it
+                pass
+
+        record = self.encode_keyframe(stream, states)
+        self.stream_dict[key] = stream
+        stream.keyframe_ts = stream.last_ts = frame.ts
+        return record
+
+    def encode_keyframe(self, stream, states):
+        code_dict = {}
+        for state in states:
+            for field_idx in STRING_FIELD_IDX_LIST:
+                value = state[field_idx]
+                if value not in code_dict:
+                    if value is not None and type(value) is not str:
+                        raise CodecError(f'string value {value!r}')
+                    code_dict[value] = len(code_dict)
+        if len(code_dict) > MAX_STRINGS:
+            raise CodecError(f'{len(code_dict)} strings')
+        rows = [encode_row(state, code_dict) for state in states]
+
+        buffer = bytearray()
+        buffer += COUNT.pack(len(code_dict))
+        for value in code_dict:
+            if value is None:
+                buffer += STRING_LEN.pack(STRING_NONE)
+            else:
+                value_bytes = value.encode()
+                if len(value_bytes) >= STRING_NONE:
+                    raise CodecError(f'string of {len(value_bytes)} bytes')
+                buffer += STRING_LEN.pack(len(value_bytes))
+                buffer += value_bytes
+        buffer += COUNT.pack(len(rows))
+        for row in rows:
+            buffer += ROW.pack(*row)
+
+        stream.seq = (stream.seq + 1) & 0xFFFFFFFF
+        stream.states = states
+        stream.rows = rows
+        stream.code_dict = code_dict
+        return HEADER.pack(RECORD_KEYFRAME, self.writer_id, stream.stream_no, stream.seq) + buffer
+
+    def encode_delta(self, stream, states):
+        prev_rows = stream.rows
+        rows = list(prev_rows)
+        buffer = bytearray()
+        changed = 0
+        for section_idx, (prev_state, state) in enumerate(zip(stream.states, states)):
+            if prev_state == state:
+                continue
+            row = encode_row(state, stream.code_dict)
+            prev_row = prev_rows[section_idx]
+            mask = 0
+            field_buffer = bytearray()
+            for column_idx, value in enumerate(row):
+                prev_value = prev_row[column_idx]
+                if value != prev_value and (value == value or prev_value == prev_value): #nan speed stays null
+                    mask |= 1 << column_idx
+                    field_buffer += FIELD_STRUCT_LIST[column_idx].pack(value)
+            buffer += DELTA_SECTION.pack(section_idx, mask)
+            buffer += field_buffer
+            rows[section_idx] = row
+            changed += 1
+
+        stream.seq = (stream.seq + 1) & 0xFFFFFFFF
+        stream.states = states
+        stream.rows = rows
+        return HEADER.pack(RECORD_DELTA, self.writer_id, stream.stream_no, stream.seq) + COUNT.pack(changed) + buffer
+
+
+class DecodeStream: #reader side state of one writer stream
+    def __init__(self):
+        self.seq = None
+        self.string_list = None
+        self.rows = None #row columns
+        self.values = None #decoded section values, per row
+
+
+class PlaybackDecoder:
+    '''decodes records back into section lists, records must be fed in ts order'''
+
+    def __init__(self):
+        self.stream_dict = {} #(writer id, stream number) -> DecodeStream
+
+    def decode_values(self, data): #list of section value tuples in FIELD_LIST order, None if record can not be decoded yet
+        data = memoryview(data)
+        record_type = data[0]
+        if record_type == RECORD_JSON:
+            return [tuple(section.get(field) for field in FIELD_LIST) for section in json.loads(bytes(data[1:]))]
+
+        record_type, writer_id, stream_no, seq = HEADER.unpack_from(data, 0)
+        stream_key = (writer_id, stream_no)
+        offset = HEADER.size
+        if record_type == RECORD_KEYFRAME:
+            stream = DecodeStream()
+            string_count, = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            string_list = []
+            for string_idx in range(string_count):
+                string_len, = STRING_LEN.unpack_from(data, offset)
+                offset += STRING_LEN.size
+                if string_len == STRING_NONE:
+                    string_list.append(None)
+                else:
+                    string_list.append(str(data[offset:offset + string_len], "utf-8"))
+                    offset += string_len
+            row_count, = COUNT.unpack_from(data, offset)
+            offset += COUNT.size
+            stream.rows = list(ROW.iter_unpack(data[offset:offset + row_count * ROW.size]))
+            stream.string_list = string_list
+            stream.values = [decode_row(row, string_list) for row in stream.rows]
+            stream.seq = seq
+            self.stream_dict[stream_key] = stream
+            return list(stream.values)
+
+        stream = self.stream_dict.get(stream_key)
+        if stream is None or seq != (stream.seq + 1) & 0xFFFFFFFF: #record of this stream missed, wait for next keyframe
+            self.stream_dict.pop(stream_key, None)
+            return None
+        changed, = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        for change_idx in range(changed):
+            section_idx, mask = DELTA_SECTION.unpack_from(data, offset)
+            offset += DELTA_SECTION.size
+            row = list(stream.rows[section_idx])
+            for column_idx, field_struct in enumerate(FIELD_STRUCT_LIST):
+                if mask & (1 << column_idx):
+                    row[column_idx], = field_struct.unpack_from(data, offset)
+                    offset += field_struct.size
+            stream.rows[section_idx] = tuple(row)
+            stream.values[section_idx] = decode_row(row, stream.string_list)
+        stream.seq = seq
+        return list(stream.values)
+
+    def decode(self, data): #list of section dicts as stored in section_playback, None if record can not be decoded yet
+        '''decode one record'''
+        values_list = self.decode_values(data)
+        if values_list is None:
+            return None
+        return [dict(zip(FIELD_LIST, values)) for values in values_list]
@@ -0,0 +1,109 @@
+'''
+*****************************************************************************
+*File : scc_role_cache.py
+*Module : SCC
+*Purpose : TTL and LRU cache of user roles in front of SccAPI.get_user_roles
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+import time
+import threading
+from collections import OrderedDict
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+DEFAULT_TTL_S = 60 #seconds a user role lookup is served from cache
+DEFAULT_MAX_USERS = 256 #least recently used user is evicted beyond this
+USER_UPDATED_TOPIC = "cwsm/user_updated" #published by cwsm when a user or its roles change
+
+
+class UserRoleCache:
+    '''user roles of reset command senders, database is queried once per user and ttl'''
+
+    def __init__(self, scc_api, ttl_s=DEFAULT_TTL_S, max_users=DEFAULT_MAX_USERS):
+        self.scc_api = scc_api #SccAPI object used on cache miss
+        self.ttl = ttl_s
+        self.max_users = max_users
+        self.user_dict = OrderedDict() #username -> (expiry ts, roles), least recently used first
+        self.lock = threading.Lock()
+        self.generation = 0 #incremented by invalidate, roles read before an invalidation are not cached
+        self.stats = StatsCounters("role_cache", [
+            "hits", "misses",
+            "expired", #misses caused by an entry older than ttl
+            "evictions", "invalidations"])
+
+    @classmethod
+    def from_config(cls, scc_api, role_cache_cfg): #create role cache from ROLE_CACHE section of scc.conf
+        '''create role cache from configuration'''
+        if role_cache_cfg is None:
+            role_cache_cfg = {}
+        return cls(
+            scc_api,
+            ttl_s=role_cache_cfg.get("TTL_S", DEFAULT_TTL_S),
+            max_users=role_cache_cfg.get("MAX_USERS", DEFAULT_MAX_USERS))
+
+    def get_user_roles(self, username): #roles of username as SccAPI.get_user_roles returns them, None for unknown user
+        '''get user roles from cache or database'''
+        ts = time.monotonic()
+        self.stats.log(self.get_stats) #before lock is taken, get_stats takes it
+        with self.lock:
+            entry = self.user_dict.get(username)
+            if entry is not None:
+                if entry[0] > ts:
+                    self.user_dict.move_to_end(username)
+                    self.stats.hits.inc()
+                    return entry[1]
+                del self.user_dict[username]
+                self.stats.expired.inc()
+            self.stats.misses.inc()
+            generation = self.generation
+
+        user_roles = self.scc_api.get_user_roles(username) #database errors are raised to caller and not cached
+        if self.ttl > 0:
+            with self.lock:
+                if generation != self.generation: #user updated while database was queried
+                    return user_roles
+                self.user_dict[username] = (ts + self.ttl, user_roles) #unknown users are cached too, cwsm/user_updated clears them
+                self.user_dict.move_to_end(username)
+                while len(self.user_dict) > self.max_users:
+                    self.user_dict.popitem(last=False)
+                    self.stats.evictions.inc()
+        return user_roles
+
+    def invalidate(self, username=None): #drop cached roles of username, of all users if username is None
+        with self.lock:
+            if username is None:
+                self.user_dict.clear()
+            else:
+                self.user_dict.pop(username, None)
+            self.generation += 1
+            self.stats.invalidations.inc()
+
+    def user_updated_sub_fn(self, in_client, user_data, message):
+        '''subscribe cwsm/user_updated, roles of updated user are read from database on next reset command'''
+        try:
+            username = None
+            try:
+                username = json.loads(message.payload).get("username")
+            except (ValueError, AttributeError): #payload is not a JSON object, whole cache is cleared
+                pass
+            self.invalidate(username)
+            Log.logger.info(f'scc_role_cache: invalidated user: {username if username is not None else "all"}')
+        except Exception as ex:
+            Log.logger.critical(f'scc_role_cache: user_updated_sub_fn: exception: {ex}')
+
+    def get_stats(self): #return copy of role cache counters
+        with self.lock:
+            return dict(self.stats.get(), users=len(self.user_dict))
+
+    def register_metrics(self, registry): #export role cache counters and cached users
+        self.stats.register(registry)
+        registry.gauge("scc_role_cache_users", "users with cached roles", None, lambda: len(self.user_dict))
@@ -0,0 +1,110 @@
+'''
+*****************************************************************************
+*File : scc_section_frame.py
+*Module : SCC
+*Purpose : Parsed, immutable sem/section_info frame shared by all consumers
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+from itertools import compress
+from operator import attrgetter, ne
+from types import MappingProxyType
+from typing import NamedTuple
+sys.path.insert(1, "./common")
+
+
+class SectionState(NamedTuple): #class to store state of one section of a section message
+    section_id: str
+    section_status: str
+    engine_axle_count: int
+    torpedo_axle_count: int
+    direction: str
+    speed: float
+    torpedo_status: str
+    first_axle: str
+    error_code: int
+
+
+SECTION_STATE_DEFAULT = SectionState("none", "none", 0, 0, "none", 0, "none", "none", 0) #used for keys missing in payload
+SECTION_ID_FIELD = attrgetter("section_id")
+NO_DPU_ID = "none" #dpu_id of a frame whose payload does not carry one
+
+
+class SectionFrame(NamedTuple): #class to store one decoded sem/section_info message
+    ts: float
+    sections: tuple #tuple of SectionState, in payload order
+    section_index: MappingProxyType #section_id -> SectionState
+    payload: bytes #original payload, forwarded as it is to occ/section_info
+    dpu_id: str
+
+    @classmethod
+    def from_payload(cls, payload): #decode JSON payload (bytes or str) once
+        '''create section frame from mqtt payload'''
+        if isinstance(payload, str):
+            payload = payload.encode()
+        return cls.from_dict(json.loads(payload), payload)
+
+    @classmethod
+    def from_dict(cls, json_data, payload=None): #create section frame from already parsed message
+        sections = tuple(
+            SectionState(
+                section["section_id"],
+                section.get("section_status", SECTION_STATE_DEFAULT.section_status),
+                section.get("engine_axle_count", SECTION_STATE_DEFAULT.engine_axle_count),
+                section.get("torpedo_axle_count", SECTION_STATE_DEFAULT.torpedo_axle_count),
+                section.get("direction", SECTION_STATE_DEFAULT.direction),
+                section.get("speed", SECTION_STATE_DEFAULT.speed),
+                section.get("torpedo_status", SECTION_STATE_DEFAULT.torpedo_status),
+                section.get("first_axle", SECTION_STATE_DEFAULT.first_axle),
+                section.get("error_code", SECTION_STATE_DEFAULT.error_code))
+            for section in json_data["sections"])
+        section_index = MappingProxyType(
+            {section.section_id: section for section in sections})
+
+        if payload is None:
+            payload = json.dumps(json_data).encode()
+
+        return cls(json_data["ts"], sections, section_index, payload, json_data.get("dpu_id", NO_DPU_ID))
+
+    def section_dicts(self): #return sections in section message JSON shape
+        return [section._asdict() for section in self.sections]
+
+    def to_json(self): #return original payload as string
+        return self.payload.decode()
+
+
+class FrameDelta(NamedTuple): #sections of a frame which differ from the previous frame
+    changed: tuple #SectionState new or changed since previous frame, in payload order
+    removed: tuple #section ids of previous frame missing from this frame
+
+
+def frame_delta(prev_frame, frame): #diff frame against prev_frame, None if there is no previous frame
+    '''changed and removed sections of frame since prev_frame'''
+    if prev_frame is None:
+        return None
+
+    prev_index = prev_frame.section_index
+    if len(prev_frame.sections) == len(frame.sections): #usual case, same sections in same order, equal positions are unchanged
+        candidates = compress(frame.sections, map(ne, frame.sections, prev_frame.sections))
+    else:
+        candidates = frame.sections
+    changed = tuple(section for section in candidates if prev_index.get(section.section_id) != section)
+
+    removed = ()
+    if prev_index.keys() != frame.section_index.keys(): #section id sets differ
+        removed = tuple(section_id for section_id in prev_index if section_id not in frame.section_index)
+    return FrameDelta(changed, removed)
+
+
+def section_frame(data): #accept SectionFrame, JSON string, bytes or parsed dict and return SectionFrame
+    '''convert section message to section frame'''
+    if isinstance(data, SectionFrame):
+        return data
+    if isinstance(data, (str, bytes, bytearray)):
+        return SectionFrame.from_payload(bytes(data) if isinstance(data, bytearray) else data)
+    return SectionFrame.from_dict(data)
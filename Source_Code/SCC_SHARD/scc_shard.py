@@ -0,0 +1,240 @@
+'''
+*****************************************************************************
+*File : scc_shard.py
+*Module : SCC
+*Purpose : Supervisor of per yard (or per DPU) evaluator worker processes, routes sem/section_info by dpu_id or section_id
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import os
+import re
+import json
+import time
+import threading
+import multiprocessing
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+from scc_metrics import *
+sys.path.insert(1, "./common")
+
+SHARD_BY_YARD = "yard" #all dpus of a yard in one worker, trail through rules never span two workers
+SHARD_BY_DPU = "dpu" #dpus spread over workers one by one, only if no trail through rule spans two dpus
+DEFAULT_SHARD_BY = SHARD_BY_YARD
+DEFAULT_MAX_SHARDS = 0 #worker processes, 0 is one per yard (or dpu) up to the number of cores
+DEFAULT_TOPIC_PREFIX = "sem/section_info/" #frames of dpu D are routed to sem/section_info/D, workers subscribe their dpus
+DEFAULT_RESTART_DELAY_S = 5 #seconds before a worker which exited is started again
+SECTION_INFO_TOPIC = "sem/section_info"
+SHARD_CLIENT_SUFFIX = "_shard" #MQTT client id of worker n is <SCC_ID>_shard<n>
+DPU_ID_PATTERN = re.compile(rb'"dpu_id"\s*:\s*"([^"\\]*)"') #dpu_id of a section message without decoding all of it
+
+
+def frame_dpu_id(payload): #dpu_id of sem/section_info payload, None if it has none
+    match = DPU_ID_PATTERN.search(payload)
+    if match is not None:
+        return match.group(1).decode()
+    return json.loads(payload).get("dpu_id") #escaped or unusual payload
+
+
+def shard_spill_path(spill_path, shard_idx): #persistence spill directory of a worker, workers never share spill files
+    return os.path.join(spill_path, SHARD_CLIENT_SUFFIX.lstrip("_") + str(shard_idx))
+
+
+def shard_dpu_lists(yard_config_list, shard_by=DEFAULT_SHARD_BY, max_shards=DEFAULT_MAX_SHARDS):
+    '''split dpus of yard_config rows into shards of about the same number of sections'''
+    group_dict = {} #yard_id or dpu_id -> {dpu_id: sections}
+    for record in yard_config_list:
+        group_key = record.yard_id if shard_by == SHARD_BY_YARD else record.dpu_id
+        dpu_dict = group_dict.setdefault(group_key, {})
+        dpu_dict[record.dpu_id] = dpu_dict.get(record.dpu_id, 0) + 1
+
+    total_shards = len(group_dict)
+    if max_shards > 0:
+        total_shards = min(total_shards, max_shards)
+    else:
+        total_shards = min(total_shards, os.cpu_count() or 1)
+
+    shard_list = [[0, []] for shard_idx in range(total_shards)] #[sections, dpu ids]
+    for dpu_dict in sorted(group_dict.values(), key=lambda dpu_dict: -sum(dpu_dict.values())): #largest group first to least loaded shard
+        shard = min(shard_list, key=lambda shard: shard[0])
+        shard[0] += sum(dpu_dict.values())
+        shard[1].extend(dpu_dict)
+    return [sorted(dpu_id_list) for sections, dpu_id_list in shard_list if len(dpu_id_list) != 0]
+
+
+class ShardWorker: #one worker process and its dpus
+    def __init__(self, shard_idx, dpu_id_list):
+        self.shard_idx = shard_idx
+        self.dpu_id_list = dpu_id_list
+        self.process = None
+        self.exit_ts = None #time worker was found exited, restarted after restart delay
+        self.stats = StatsCounters("shard", [
+            "restarts",
+            "frames"]) #frames routed to this worker
+
+
+class ShardSupervisor:
+    '''starts one evaluator process per shard, routes sem/section_info to them and restarts workers which exit'''
+
+    def __init__(self, mqtt_client, worker_fn, conf_file, delta_publisher=None, shard_by=DEFAULT_SHARD_BY,
+                 max_shards=DEFAULT_MAX_SHARDS, topic_prefix=DEFAULT_TOPIC_PREFIX, restart_delay_s=DEFAULT_RESTART_DELAY_S):
+        self.mqtt_client = mqtt_client
+        self.worker_fn = worker_fn #worker_fn(shard_idx, dpu_id_list, conf_file, topic_prefix) runs in worker process
+        self.conf_file = conf_file
+        self.delta_publisher = delta_publisher #occ/section_delta is published by supervisor, it sees frames of all shards
+        self.shard_by = shard_by
+        self.max_shards = max_shards
+        self.topic_prefix = topic_prefix
+        self.restart_delay = restart_delay_s
+        self.worker_list = []
+        self.dpu_worker = {} #dpu_id -> ShardWorker
+        self.section_dpu = {} #section_id -> dpu_id of yard_config, routes frames which carry no dpu_id
+        self.stats = StatsCounters("shard", [
+            "unrouted", #frames of dpus not in yard_config
+            "unrouted_sections", #sections of frames without dpu_id which are not in yard_config
+            "split"]) #frames without dpu_id whose sections belong to several workers
+        self.unrouted_dpu_set = set() #unknown dpus already logged
+        self.lock = threading.Lock()
+        self.context = multiprocessing.get_context("spawn") #workers start clean, no inherited DB or MQTT sockets
+        self.stop_event = threading.Event()
+        self.monitor_thread = threading.Thread(target=self.monitor_fn, name="scc_shard", daemon=True)
+
+    @classmethod
+    def from_config(cls, mqtt_client, worker_fn, conf_file, shard_cfg, delta_publisher=None): #create supervisor from SHARD section of scc.conf, None if disabled
+        '''create shard supervisor from configuration'''
+        if shard_cfg is None or not shard_cfg.get("ENABLED", False):
+            return None
+        shard_by = shard_cfg.get("SHARD_BY", DEFAULT_SHARD_BY)
+        if shard_by not in (SHARD_BY_YARD, SHARD_BY_DPU):
+            Log.logger.warning(f'scc_shard: unknown SHARD_BY {shard_by}, {DEFAULT_SHARD_BY} used')
+            shard_by = DEFAULT_SHARD_BY
+        return cls(
+            mqtt_client, worker_fn, conf_file, delta_publisher,
+            shard_by=shard_by,
+            max_shards=shard_cfg.get("MAX_SHARDS", DEFAULT_MAX_SHARDS),
+            topic_prefix=shard_cfg.get("TOPIC_PREFIX", DEFAULT_TOPIC_PREFIX),
+            restart_delay_s=shard_cfg.get("RESTART_DELAY_S", DEFAULT_RESTART_DELAY_S))
+
+    def start(self, yard_config_list): #start one worker per shard of yard_config rows and the monitor thread
+        yard_config_list = list(yard_config_list)
+        self.section_dpu = {record.section_id: record.dpu_id for record in yard_config_list}
+        for shard_idx, dpu_id_list in enumerate(shard_dpu_lists(yard_config_list, self.shard_by, self.max_shards)):
+            worker = ShardWorker(shard_idx, dpu_id_list)
+            self.worker_list.append(worker)
+            for dpu_id in dpu_id_list:
+                self.dpu_worker[dpu_id] = worker
+            self.start_worker(worker)
+        self.monitor_thread.start()
+        Log.logger.info(f'scc_shard: {len(self.worker_list)} workers started, shard by: {self.shard_by}')
+
+    def start_worker(self, worker):
+        worker.process = self.context.Process(
+            target=self.worker_fn, args=(worker.shard_idx, worker.dpu_id_list, self.conf_file, self.topic_prefix),
+            name="scc_shard_" + str(worker.shard_idx), daemon=True)
+        worker.process.start()
+        worker.exit_ts = None
+        Log.logger.info(f'scc_shard: worker {worker.shard_idx} pid {worker.process.pid}, dpus: {worker.dpu_id_list}')
+
+    def stop(self):
+        self.stop_event.set()
+        for worker in self.worker_list:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+
+    def section_info_sub_fn(self, in_client, user_data, message):
+        '''subscribe sem/section_info, forward frame to worker of its dpu'''
+        try:
+            payload = message.payload
+            dpu_id = frame_dpu_id(payload)
+            worker = self.dpu_worker.get(dpu_id)
+            if dpu_id is None: #frame does not name its dpu, dpu of each section is taken from yard_config
+                self.route_by_sections(payload)
+            elif worker is not None:
+                self.mqtt_client.pub(self.topic_prefix + dpu_id, payload) #worker subscribes topics of its dpus only
+                worker.stats.frames.inc()
+            else:
+                self.stats.unrouted.inc()
+                with self.lock:
+                    if dpu_id not in self.unrouted_dpu_set:
+                        self.unrouted_dpu_set.add(dpu_id)
+                        Log.logger.warning(f'scc_shard: dpu {dpu_id} is not in yard_config, its frames are not evaluated')
+
+            ''' publish section_info '''
+            if self.delta_publisher is not None:
+                self.delta_publisher.put(SectionFrame.from_payload(payload))
+            if self.delta_publisher is None or self.delta_publisher.publish_section_info:
+                self.mqtt_client.pub("occ/section_info", payload) #received payload is forwarded as it is
+            else:
+                pass
+        except Exception as ex:
+            Log.logger.critical(f'scc_shard: section_info_sub_fn: exception: {ex}')
+
+    def route_by_sections(self, payload): #forward frame without dpu_id to the workers of its sections
+        json_data = json.loads(payload)
+        worker_sections = {} #ShardWorker -> (dpu_id of first section, section dicts), in payload order
+        unknown = 0
+        for section in json_data["sections"]:
+            dpu_id = self.section_dpu.get(section["section_id"])
+            worker = self.dpu_worker.get(dpu_id)
+            if worker is None:
+                unknown += 1
+                continue
+            worker_sections.setdefault(worker, (dpu_id, []))[1].append(section)
+
+        for worker, (dpu_id, section_list) in worker_sections.items():
+            if len(worker_sections) == 1 and unknown == 0: #usual case, frame of one dpu, payload is forwarded as it is
+                worker_payload = payload
+            else: #each worker gets only its sections, other keys of frame are kept
+                worker_payload = json.dumps(dict(json_data, sections=section_list))
+            self.mqtt_client.pub(self.topic_prefix + dpu_id, worker_payload) #any dpu topic of worker reaches its evaluator
+
+        for worker in worker_sections:
+            worker.stats.frames.inc()
+        if len(worker_sections) > 1:
+            self.stats.split.inc()
+        if unknown != 0:
+            if self.stats.unrouted_sections.value == 0:
+                Log.logger.warning(f'scc_shard: frame without dpu_id has sections not in yard_config, they are not evaluated')
+            self.stats.unrouted_sections.inc(unknown)
+
+    def monitor_fn(self): #restart workers which exited, log statistics
+        while not self.stop_event.wait(1.0):
+            now_ts = time.time()
+            for worker in self.worker_list:
+                if worker.process.is_alive():
+                    continue
+                if worker.exit_ts is None:
+                    worker.exit_ts = now_ts
+                    Log.logger.critical(
+                        f'scc_shard: worker {worker.shard_idx} exited with code {worker.process.exitcode}, '
+                        f'restart in {self.restart_delay}s')
+                elif now_ts - worker.exit_ts >= self.restart_delay:
+                    try:
+                        worker.stats.restarts.inc()
+                        self.start_worker(worker)
+                    except Exception as ex:
+                        worker.exit_ts = now_ts
+                        Log.logger.critical(f'scc_shard: worker {worker.shard_idx} restart: exception: {ex}')
+            self.stats.log(self.get_stats)
+
+    def get_stats(self): #return per worker pid, state, restarts and frames routed
+        with self.lock:
+            return {
+                "workers": {
+                    worker.shard_idx: dict(
+                        worker.stats.get(),
+                        pid=worker.process.pid if worker.process is not None else None,
+                        alive=worker.process is not None and worker.process.is_alive(),
+                        dpus=len(worker.dpu_id_list))
+                    for worker in self.worker_list},
+                **self.stats.get()}
+
+    def register_metrics(self, registry): #export restarts and routed frames of every worker, unrouted and split frames
+        for worker in self.worker_list:
+            worker.stats.register(registry, {"shard": worker.shard_idx})
+        self.stats.register(registry)
@@ -0,0 +1,91 @@
+'''
+*****************************************************************************
+*File : scc_snapshot.py
+*Module : SCC
+*Purpose : occ/section_info snapshot of section objects, only sections changed since last snapshot are encoded again
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import json
+from operator import attrgetter
+from types import MappingProxyType
+sys.path.insert(1, "./common")
+
+try:
+    import orjson
+except ImportError: #standard json encoder is used
+    orjson = None
+
+'''Import SCC packages '''
+from scc_log import *
+from scc_section_frame import *
+
+JSON_BACKEND_STD = "json"
+JSON_BACKEND_ORJSON = "orjson" #used only if orjson is installed
+DEFAULT_JSON_BACKEND = JSON_BACKEND_STD
+SECTION_STATE_FIELDS = attrgetter(*SectionState._fields) #published fields of a Section object, in section message order
+
+
+def orjson_available(): #True if orjson could be imported
+    return orjson is not None
+
+
+def std_dumps(value): #compact JSON bytes, same separators as orjson
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def json_dumps_fn(backend): #JSON encoder of backend, standard json if orjson is asked for but missing
+    if backend == JSON_BACKEND_ORJSON and orjson is not None:
+        return orjson.dumps
+    return std_dumps
+
+
+class SnapshotSerializer:
+    '''encodes section objects into occ/section_info payload and SectionFrame, unchanged sections reuse their bytes'''
+
+    def __init__(self, json_backend=DEFAULT_JSON_BACKEND):
+        if json_backend == JSON_BACKEND_ORJSON and orjson is None:
+            Log.logger.warning('scc_snapshot: orjson is not installed, standard json encoder used')
+        self.dumps = json_dumps_fn(json_backend)
+        self.json_backend = JSON_BACKEND_ORJSON if self.dumps is not std_dumps else JSON_BACKEND_STD
+        self.section_cache = {} #section_id -> (SectionState, encoded section bytes)
+        self.states = () #SectionState tuple of last snapshot
+        self.section_index = MappingProxyType({})
+        self.body = b"" #encoded sections of last snapshot joined by commas
+        self.encoded = 0 #sections encoded since start, unchanged sections are not counted
+
+    @classmethod
+    def from_config(cls, snapshot_cfg): #create serializer from SNAPSHOT section of scc.conf
+        '''create snapshot serializer from configuration'''
+        if snapshot_cfg is None:
+            snapshot_cfg = {}
+        return cls(snapshot_cfg.get("JSON_BACKEND", DEFAULT_JSON_BACKEND))
+
+    def frame(self, section_obj_iter, ts): #SectionFrame of section objects, payload is the occ/section_info message
+        '''snapshot of section objects'''
+        states = tuple(map(SectionState._make, map(SECTION_STATE_FIELDS, section_obj_iter)))
+        if states != self.states:
+            self.encode_sections(states)
+        payload = b'{"ts":' + self.dumps(ts) + b',"sections":[' + self.body + b']}'
+        return SectionFrame(ts, states, self.section_index, payload, "none")
+
+    def encode_sections(self, states): #encode changed sections, join all sections into body
+        section_cache = self.section_cache
+        piece_list = []
+        for state in states:
+            cached = section_cache.get(state.section_id)
+            if cached is None or cached[0] != state:
+                cached = (state, self.dumps(state._asdict()))
+                section_cache[state.section_id] = cached
+                self.encoded += 1
+            piece_list.append(cached[1])
+        if len(section_cache) > 2 * len(states): #sections removed from registry, forget them
+            section_ids = {state.section_id for state in states}
+            self.section_cache = {section_id: cached for section_id, cached in section_cache.items() if section_id in section_ids}
+        self.body = b",".join(piece_list)
+        self.states = states
+        self.section_index = MappingProxyType({state.section_id: state for state in states})
@@ -0,0 +1,80 @@
+'''
+*****************************************************************************
+*File : scc_state.py
+*Module : SCC
+*Purpose : Small integer state codes of section, point and torpedo states
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+import threading
+sys.path.insert(1, "./common")
+
+'''section status codes'''
+SECTION_STATUS_NONE = 0
+SECTION_STATUS_CLEARED = 1
+SECTION_STATUS_OCCUPIED = 2
+
+'''direction codes'''
+DIRECTION_NONE = 0
+DIRECTION_IN = 1
+DIRECTION_OUT = 2
+
+'''point status codes'''
+POINT_STATUS_NONE = 0
+POINT_STATUS_NORMAL = 1
+POINT_STATUS_REVERSE = 2
+POINT_STATUS_FAULT = 3
+
+'''point mode codes'''
+POINT_MODE_NONE = 0
+POINT_MODE_AUTO = 1
+POINT_MODE_MANUAL = 2
+
+'''torpedo status codes'''
+TORPEDO_STATUS_NONE = 0
+TORPEDO_STATUS_LOADED = 1
+TORPEDO_STATUS_UNLOADED = 2
+
+MAX_STATE_CODE = 255 #codes are stored in unsigned char arrays, encode raises StateCodeOverflow beyond it
+
+
+class StateCodeOverflow(ValueError): #state has more distinct values than unsigned char codes
+    pass
+
+
+class StateEnum:
+    '''state string <-> small integer code, known values get fixed codes, new values are appended'''
+
+    def __init__(self, name, known_value_list):
+        self.name = name
+        self.value_list = list(known_value_list) #code -> state string
+        self.code_dict = {value: code for code, value in enumerate(self.value_list)} #state string -> code
+        self.lock = threading.Lock()
+
+    def encode(self, value): #code of state string, unseen strings get next free code
+        code = self.code_dict.get(value)
+        if code is None:
+            with self.lock:
+                code = self.code_dict.get(value)
+                if code is None:
+                    if len(self.value_list) > MAX_STATE_CODE:
+                        raise StateCodeOverflow(f'{self.name}: more than {MAX_STATE_CODE + 1} distinct values, {value!r} has no code')
+                    code = len(self.value_list)
+                    self.value_list.append(value)
+                    self.code_dict[value] = code
+        return code
+
+    def decode(self, code): #state string of code
+        return self.value_list[code]
+
+
+SECTION_STATUS = StateEnum("section_status", ["none", "cleared", "occupied"])
+DIRECTION = StateEnum("direction", ["none", "in", "out"])
+POINT_STATUS = StateEnum("point_status", ["none", "normal", "reverse", "fault"])
+POINT_MODE = StateEnum("point_mode", ["none", "auto", "manual"])
+TORPEDO_STATUS = StateEnum("torpedo_status", ["none", "loaded", "unloaded"])
+
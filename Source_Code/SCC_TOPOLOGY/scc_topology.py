@@ -0,0 +1,69 @@
+'''
+*****************************************************************************
+*File : scc_topology.py
+*Module : SCC
+*Purpose : Compiled section connection graph with O(1) neighbour and point lookups
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+from types import MappingProxyType
+sys.path.insert(1, "./common")
+
+NO_SECTION = -1 #adjacency value when a connection is "NONE" or points to an unknown section
+CONNECTION_KIND_LIST = ["left_normal", "right_normal", "left_reverse", "right_reverse"]
+
+
+class SectionTopology:
+    '''read only section graph compiled once from layout_section_connections and pms_config records'''
+
+    def __init__(self, section_connections_records, point_config_records):
+        section_connections_records = list(section_connections_records)
+
+        '''dense integer index of every section, in layout_section_connections order'''
+        self.section_ids = tuple(sc.section_id for sc in section_connections_records)
+        self.section_index = MappingProxyType(
+            {section_id: sec_idx for sec_idx, section_id in enumerate(self.section_ids)})
+
+        '''adjacency arrays, one entry per section index'''
+        self.left_normal = tuple(self.link(sc.left_normal) for sc in section_connections_records)
+        self.right_normal = tuple(self.link(sc.right_normal) for sc in section_connections_records)
+        self.left_reverse = tuple(self.link(sc.left_reverse) for sc in section_connections_records)
+        self.right_reverse = tuple(self.link(sc.right_reverse) for sc in section_connections_records)
+
+        '''point id of every section and point_id -> section indices map'''
+        point_id_list = ["none"] * len(self.section_ids)
+        point_section = {}
+        for point in point_config_records:
+            sec_idx = self.section_index.get(point.section_id, NO_SECTION)
+            if sec_idx != NO_SECTION:
+                point_id_list[sec_idx] = point.point_id
+        for sec_idx, point_id in enumerate(point_id_list):
+            if point_id != "none":
+                point_section[point_id] = point_section.get(point_id, ()) + (sec_idx,)
+        self.point_ids = tuple(point_id_list)
+        self.point_section = MappingProxyType(point_section)
+
+        '''undirected neighbour sets, used to widen a set of changed sections'''
+        neighbour_list = [set() for sec_idx in range(len(self.section_ids))]
+        for adjacency in [self.left_normal, self.right_normal, self.left_reverse, self.right_reverse]:
+            for sec_idx, link_idx in enumerate(adjacency):
+                if link_idx != NO_SECTION:
+                    neighbour_list[sec_idx].add(link_idx)
+                    neighbour_list[link_idx].add(sec_idx)
+        self.neighbours = tuple(frozenset(neighbours) for neighbours in neighbour_list)
+
+    def link(self, section_id): #section index of a connection, NO_SECTION for "NONE"
+        return self.section_index.get(section_id, NO_SECTION)
+
+    def __len__(self):
+        return len(self.section_ids)
+
+    def adjacency(self, connection_kind): #adjacency array of one of CONNECTION_KIND_LIST
+        return getattr(self, connection_kind)
+
+    def sections_of_point(self, point_id): #section indices controlled by point_id
+        return self.point_section.get(point_id, ())
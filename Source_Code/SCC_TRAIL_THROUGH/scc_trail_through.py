@@ -13,6 +13,7 @@ from scc_dlm_conf import *
 from scc_log import *
 import sys
 import json
+import time
 import os
 
 from peewee import *
@@ -20,12 +21,25 @@ from datetime import datetime, timedelta
 from scc_dlm_model import *
 from scc_layout_model import *
 from scc_dlm_api import *
+from scc_db_pool import *
+from scc_section_frame import *
+from scc_topology import *
+from scc_tt_rules import *
+from scc_tt_vector import *
 sys.path.insert(1, "./common")
 
-TRAIL_THROUGH_SECTION_LIST = ["S3", "S4", "S7", "S8", "S11"]
+TORPEDO_STATUS_SOURCE_SECTION_SET = frozenset(['S1', 'S2', 'S3', 'S4', 'S20', 'S21', 'S22']) #torpedo status is taken from payload for these sections
+TORPEDO_STATUS_OUT_SKIP_SECTION_SET = frozenset(['S1', 'S2', 'S3', 'S4'])
+DELTA_FULL_EVALUATION_RATIO = 0.25 #frames changing more than this share of sections are evaluated in full, vectorised if enabled
+DEFAULT_VECTORISED = False #NumPy detector is off, array build per frame costs more than the rule loop it replaces (scc_bench_tt_vector.py)
 
 
 class Sec:
+    __slots__ = ("section_id", "left_normal", "right_normal", "left_reverse", "right_reverse",
+                 "engine_axle_count", "torpedo_axle_count", "section_status", "point_id",
+                 "point_status", "point_mode", "point_error", "torpedo_status", "direction",
+                 "speed", "first_axle", "error_code") #fixed attribute set, no per-instance __dict__
+
     def __init__(self):
         self.section_id = "none"
         self.left_normal = "none"
@@ -47,14 +61,24 @@ class Sec:
         
 
 class Trailthrough:
-    def __init__(self, mqtt_client): #constructor connecting to database and initialising variables.
+    def __init__(self, mqtt_client, vectorised=DEFAULT_VECTORISED): #constructor connecting to database and initialising variables.
         self.scc_api = SccAPI() #a class of scc_dlm_api.py 
-        self.db_conn = self.scc_api.connect_database(cfg) #passing cfg file to connect_database function of SCCAPI class, to connect to postgresql database.
+        self.db_conn = get_database() #process wide pooled database bound by SccAPI.connect_database, no connection of its own
         self.tt_sec_obj_list = [] #list to store section objects like section_id, left_normal, right_normal, left_reverse, right_reverse.
         self.total_sec = 0
         self.mqtt_client = mqtt_client
         self.prev_section_list = {}
+        self.prev_frame = None #previous SectionFrame, new frames are diffed against it
+        self.prev_torpedo_frame = None #frame of last find_torpedo_status call
         self.TOTAL_SECTION = 14
+        self.topology = SectionTopology([], []) #compiled section graph, rebuilt by init_trail_through_info
+        self.tt_rules = TrailThroughRuleTable([]) #trail through rules compiled from pms_config and layout_section_connections
+        self.vectorised = vectorised #full frames are evaluated by TrailThroughVector, TRAIL_THROUGH.VECTORISED of scc.conf
+        self.tt_vector = None #NumPy trail through detector, None if not vectorised or NumPy is not installed
+        self.prev_frame_arrays = None #arrays of prev_section_list frame, None if it was evaluated incrementally
+        self.tt_vector_stale = False #a frame could not be loaded into tt_vector, arrays are rebuilt from tt_sec_obj_list before next use
+        self.torpedo_status_source_idx = [] #section indices of TORPEDO_STATUS_SOURCE_SECTION_SET
+        self.point_state = {} #point_id -> (point_status, point_mode) already copied into tt_sec_obj_list
 
     def get_point_config(self): #function to get all records (section id & point id) from pms_Config table.
         '''get pms configuration from database table'''
@@ -70,36 +94,18 @@ class Trailthrough:
 
             Log.logger.info(f'init trail through info called')
             if self.db_conn:
-                section_connections_db_records = self.scc_api.read_section_connections_info() #it is a method of scc_api class in scc_dlm_api.py which reads section connection info from occ_config table in scc_dlm_model.py
+                section_connections_db_records = list(self.scc_api.read_section_connections_info()) #it is a method of scc_api class in scc_dlm_api.py which reads section connection info from occ_config table in scc_dlm_model.py
 
                 for sc in section_connections_db_records: #logging message section_id, left_normal, right_normal
                     Log.logger.info(
                         f'SECTION_ID: {sc.section_id}, LEFT_SECTION: {sc.left_normal}, RIGHT_SECTION: {sc.right_normal}')
 
-                for sc in section_connections_db_records:
-                    self.tt_sec_obj_list.append(Sec()) #appending sec class variables in tt_sec_obj_list.
-
-                sc_idx = 0
-                for sc in section_connections_db_records: #updating sec class variables in sec_obj_list.
-                    self.tt_sec_obj_list[sc_idx].section_id = sc.section_id
-                    self.tt_sec_obj_list[sc_idx].left_normal = sc.left_normal
-                    self.tt_sec_obj_list[sc_idx].right_normal = sc.right_normal
-                    self.tt_sec_obj_list[sc_idx].left_reverse = sc.left_reverse
-                    self.tt_sec_obj_list[sc_idx].right_reverse = sc.right_reverse
-                    sc_idx += 1
-
-                point_config = self.get_point_config() #initialising get_point_config class variables.
+                point_config = list(self.get_point_config()) #initialising get_point_config class variables.
+                self.load_topology(section_connections_db_records, point_config)
 
-                for point in point_config: #updating point id and section id in tt_sec_obj_list.
-                    for sec_idx in range(len(self.tt_sec_obj_list)):
-                        if self.tt_sec_obj_list[sec_idx].section_id == point.section_id: 
-                            self.tt_sec_obj_list[sec_idx].point_id = point.point_id
-
-                            Log.logger.info(
-                                f'SECTION_ID: {self.tt_sec_obj_list[sec_idx].section_id}, POINT_ID: {self.tt_sec_obj_list[sec_idx].point_id}')
-                        else:
-                            pass
-                self.total_sec = len(self.tt_sec_obj_list)
+                for sec_obj in self.tt_sec_obj_list: #logging point id of point sections
+                    if sec_obj.point_id != "none":
+                        Log.logger.info(f'SECTION_ID: {sec_obj.section_id}, POINT_ID: {sec_obj.point_id}')
             else:
                 pass
                 Log.logger.warning(f'database not connected!!')
@@ -108,207 +114,281 @@ class Trailthrough:
             Log.logger.critical(
                 f'init_section_connections_info: exception {ex}')
 
+    def load_topology(self, section_connections_records, point_config_records):
+        '''build tt_sec_obj_list, compiled section graph, trail through rules and vectorised detector from configuration records'''
+        self.tt_sec_obj_list = []
+        for sc in section_connections_records: #updating sec class variables in tt_sec_obj_list.
+            sec_obj = Sec()
+            sec_obj.section_id = sc.section_id
+            sec_obj.left_normal = sc.left_normal
+            sec_obj.right_normal = sc.right_normal
+            sec_obj.left_reverse = sc.left_reverse
+            sec_obj.right_reverse = sc.right_reverse
+            self.tt_sec_obj_list.append(sec_obj)
+
+        '''compile section graph once, tt_sec_obj_list[idx] is the section with topology index idx'''
+        self.topology = SectionTopology(section_connections_records, point_config_records)
+        for sec_idx in range(len(self.tt_sec_obj_list)): #updating point id in tt_sec_obj_list.
+            self.tt_sec_obj_list[sec_idx].point_id = self.topology.point_ids[sec_idx]
+        self.total_sec = len(self.tt_sec_obj_list)
+
+        '''trail through rules of every point section, detection cost follows rule count'''
+        self.tt_rules = compile_trail_through_rules(self.topology)
+        Log.logger.info(f'trail through rules: {len(self.tt_rules)}, point sections: {list(self.tt_rules.section_ids)}')
+
+        self.torpedo_status_source_idx = sorted(
+            self.topology.section_index[section_id] for section_id in TORPEDO_STATUS_SOURCE_SECTION_SET
+            if section_id in self.topology.section_index)
+
+        self.tt_vector = None
+        self.prev_section_list = {}
+        self.prev_frame = None
+        self.prev_torpedo_frame = None
+        self.prev_frame_arrays = None
+        self.tt_vector_stale = False
+        self.point_state = {}
+        if not self.vectorised:
+            pass
+        elif numpy_available() and len(self.topology.section_index) == len(self.tt_sec_obj_list): #duplicate section ids are left to the rule by rule loop
+            self.tt_vector = TrailThroughVector(self.topology, self.tt_rules)
+        else:
+            Log.logger.warning(f'vectorised trail through not available, evaluating rules one by one')
+
     def detect_trail_through(self, section_json_data, point_obj_list):
         '''update records of tt_sec_obj_list [point status and point mode from passed point_obj_list & section objects from passed section_json_data]
             by using objects of tt_sec_obj_list it is detecting trail through'''
          
         '''trail through detection using section status and point status'''
         try:
-            section_list = {}
-            json_data = json.loads(section_json_data) #convert passed section_json_data to python format.
-
-            for json_idx in range(len(json_data['sections'])): #making dictionary section_list with section_id as key and json_data[sections] as value.
-                section_list[json_data['sections'][json_idx]
-                             ['section_id']] = json_data['sections'][json_idx]
+            frame = section_frame(section_json_data) #accepts SectionFrame or JSON string
+            section_list = frame.section_index #section_id -> SectionState
+            delta = frame_delta(self.prev_frame, frame) #None for first frame after start or reload
+            if delta is not None and len(delta.changed) > len(frame.sections) * DELTA_FULL_EVALUATION_RATIO:
+                delta = None #most of the frame changed, bookkeeping of changed sections costs more than it saves
 
             '''update point status and point mode'''
-            for point_idx in range(len(point_obj_list)): #iterating point_idx in point_obj_list
-                #Log.logger.info(
-                #    f'{point_obj_list[point_idx].point_id}, {point_obj_list[point_idx].point_status}, {point_obj_list[point_idx].point_mode}')
-
-                for sec_idx in range(self.total_sec): #total sec = len(tt_sec_obj_list) defined in above function.
-                    if point_obj_list[point_idx].point_id == self.tt_sec_obj_list[sec_idx].point_id: #if point id in point object list matches with sec_obj) list then [update point_status and point_mode in tt_sec_obj_list from point_obj_list]
-                        self.tt_sec_obj_list[sec_idx].point_status = point_obj_list[point_idx].point_status
-                        self.tt_sec_obj_list[sec_idx].point_mode = point_obj_list[point_idx].point_mode
-                    else:
-                        pass
-
-            for sec_idx in range(len(self.tt_sec_obj_list)): #updating tt_sec_obj_list objects from passed section_json_data
-                for json_sec_idx in range(len(json_data['sections'])):
-                    if self.tt_sec_obj_list[sec_idx].section_id == json_data['sections'][json_sec_idx]['section_id']:
-                        self.tt_sec_obj_list[sec_idx].section_status = json_data['sections'][json_sec_idx]['section_status']
-                        self.tt_sec_obj_list[sec_idx].direction = json_data['sections'][json_sec_idx]['direction']
-                        self.tt_sec_obj_list[sec_idx].torpedo_axle_count = json_data['sections'][json_sec_idx]['torpedo_axle_count']
-                        self.tt_sec_obj_list[sec_idx].error_code = json_data['sections'][json_sec_idx]['error_code']
-                    else:
-                        pass
-
-            tt_sec_list = []
-
-            for sec_idx in range(len(self.tt_sec_obj_list)):
-                if self.tt_sec_obj_list[sec_idx].section_id in ['S20', 'S18', 'S12', 'S10', 'S9']: #if in tt_sec_obj_list any section Id mathes with ['S20', 'S18', 'S12', 'S10', 'S9']
-                    if self.tt_sec_obj_list[sec_idx].section_status == "occupied" and self.tt_sec_obj_list[sec_idx].direction == "out": #if section_status is occupied and direction is out then this sec_idx left normal is left normal and right normal is right normal
-                        left_normal_sec_id = self.tt_sec_obj_list[sec_idx].left_normal
-                        left_reverse_sec_id = self.tt_sec_obj_list[sec_idx].left_reverse
-
-                        if section_list[left_normal_sec_id]["section_status"] == "occupied" and section_list[left_normal_sec_id]["direction"] == "out": #if section status of this left normal sec-id is occupied and direction is out.
-                            if len(self.prev_section_list)!= 0 and (section_list[left_normal_sec_id]["torpedo_axle_count"] != self.prev_section_list[left_normal_sec_id]["torpedo_axle_count"]): #if 
-                                if self.tt_sec_obj_list[sec_idx].point_status == "reverse" and self.tt_sec_obj_list[sec_idx].point_mode != "manual":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id}')
-                                    tt_sec_list.append(
-                                        self.tt_sec_obj_list[sec_idx].section_id)
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id} due to point fault')
-                                    tt_sec_list.append(self.tt_sec_obj_list[sec_idx].section_id)
-                                else:
-                                    pass
-                            else:
-                                pass
-                        else:
-                            pass
-
-                        if section_list[left_reverse_sec_id]["section_status"] == "occupied" and section_list[left_reverse_sec_id]["direction"] == "out":
-                            if len(self.prev_section_list)!= 0 and (section_list[left_reverse_sec_id]["torpedo_axle_count"] != self.prev_section_list[left_reverse_sec_id]["torpedo_axle_count"]):
-                                if self.tt_sec_obj_list[sec_idx].point_status == "normal" and self.tt_sec_obj_list[sec_idx].point_mode != "manual":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id}')
-                                    tt_sec_list.append(
-                                        self.tt_sec_obj_list[sec_idx].section_id)
-                                elif self.tt_sec_obj_list[sec_idx].point_status == "fault":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id} due to point fault')
-                                    tt_sec_list.append(self.tt_sec_obj_list[sec_idx].section_id)
-                                else:
-                                    pass
-                            else:
-                                pass
-                        else:
-                            pass
-                    else:
-                        pass
+            point_sec_idx_list = [] #point sections, handed to vectorised detector in one call
+            point_status_list = []
+            point_mode_list = []
+            for point in point_obj_list: #point_id -> section indices lookup from compiled topology
+                point_state = (point.point_status, point.point_mode)
+                if self.point_state.get(point.point_id) != point_state: #only points changed since previous frame
+                    self.point_state[point.point_id] = point_state
+                    for sec_idx in self.topology.sections_of_point(point.point_id):
+                        self.tt_sec_obj_list[sec_idx].point_status = point.point_status
+                        self.tt_sec_obj_list[sec_idx].point_mode = point.point_mode
+                        point_sec_idx_list.append(sec_idx)
+                        point_status_list.append(point.point_status)
+                        point_mode_list.append(point.point_mode)
                 else:
                     pass
+            self.load_vector_points(point_sec_idx_list, point_status_list, point_mode_list)
 
-                if self.tt_sec_obj_list[sec_idx].section_id in ['S19', 'S15', 'S13', 'S11']:
-                    if self.tt_sec_obj_list[sec_idx].section_status == "occupied" and self.tt_sec_obj_list[sec_idx].direction == "in":
-                        right_normal_sec_id = self.tt_sec_obj_list[sec_idx].right_normal
-                        right_reverse_sec_id = self.tt_sec_obj_list[sec_idx].right_reverse
-
-                        if section_list[right_normal_sec_id]["section_status"] == "occupied" and section_list[right_normal_sec_id]["direction"] == "in":
-                            if len(self.prev_section_list)!= 0 and (section_list[right_normal_sec_id]["torpedo_axle_count"] != self.prev_section_list[right_normal_sec_id]["torpedo_axle_count"]):
-                                if self.tt_sec_obj_list[sec_idx].point_status == "reverse" and self.tt_sec_obj_list[sec_idx].point_mode != "manual":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id}')
-                                    tt_sec_list.append(
-                                        self.tt_sec_obj_list[sec_idx].section_id)
-                                elif self.tt_sec_obj_list[sec_idx].point_status == "fault":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id} due to point fault')
-                                    tt_sec_list.append(self.tt_sec_obj_list[sec_idx].section_id)
-                                else:
-                                    pass
-                            else:
-                                pass
-                        else:
-                            pass
+            self.update_sections(frame.sections if delta is None else delta.changed) #unchanged sections already hold their values
 
-                        if section_list[right_reverse_sec_id]["section_status"] == "occupied" and section_list[right_reverse_sec_id]["direction"] == "in":
-                            if len(self.prev_section_list)!= 0 and (section_list[right_reverse_sec_id]["torpedo_axle_count"] != self.prev_section_list[right_reverse_sec_id]["torpedo_axle_count"]):
-                                if self.tt_sec_obj_list[sec_idx].point_status == "normal" and self.tt_sec_obj_list[sec_idx].point_mode != "manual":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id}')
-                                    tt_sec_list.append(
-                                        self.tt_sec_obj_list[sec_idx].section_id)
-                                elif self.tt_sec_obj_list[sec_idx].point_status == "fault":
-                                    Log.logger.info(
-                                        f'trail-through detected in Section id:{self.tt_sec_obj_list[sec_idx].section_id} due to point fault')
-                                    tt_sec_list.append(self.tt_sec_obj_list[sec_idx].section_id)
-                                else:
-                                    pass
-                            else:
-                                pass
+            '''evaluate rules watching changed sections, all rules at once when most of the frame changed'''
+            frame_arrays = None
+            if delta is None:
+                frame_arrays = self.load_vector_frame(frame)
+                tt_sec_list = self.detect_vector(frame_arrays)
+                if tt_sec_list is None: #no vectorised detector or frame could not be encoded
+                    tt_sec_list = self.find_trail_through_sections(section_list)
+            else:
+                self.load_vector_sections(delta.changed)
+                tt_sec_list = self.find_trail_through_sections(section_list, delta)
+            for section_id in tt_sec_list:
+                Log.logger.info(f'trail-through detected in Section id:{section_id}')
+
+            Log.logger.info(f'return value: {tt_sec_list}')
+            self.prev_section_list = section_list
+            self.prev_frame = frame
+            self.prev_frame_arrays = frame_arrays
+            return tt_sec_list
+        except Exception as ex:
+            Log.logger.critical(f'find trail through: exception: {ex}')
+
+    def find_trail_through_sections(self, section_list, delta=None): #walk trail through rule table, section_list is section_id -> SectionState of the frame
+        '''trail through detection of one frame rule by rule, only rules of moved neighbours when delta is passed'''
+        tt_sec_list = []
+
+        if delta is None:
+            rule_list = self.tt_rules
+        else: #a rule fires only when torpedo axle count of its neighbour changed
+            rule_list = self.tt_rules.rules_of_neighbours(
+                [section.section_id for section in delta.changed
+                 if self.axle_count_changed(section_list, section.section_id)])
+
+        for rule in rule_list:
+            sec_obj = self.tt_sec_obj_list[rule.sec_idx]
+            if sec_obj.section_status == "occupied" and sec_obj.direction == rule.direction: #train on point section moving towards the point
+                neighbour = section_list.get(rule.neighbour_id)
+                if neighbour is not None and neighbour.section_status == "occupied" and neighbour.direction == rule.direction: #train also on neighbour, moving the same way
+                    prev_neighbour = self.prev_section_list.get(rule.neighbour_id)
+                    if prev_neighbour is not None and neighbour.torpedo_axle_count != prev_neighbour.torpedo_axle_count: #axles moved since previous frame
+                        if sec_obj.point_status == rule.conflict_point_status and sec_obj.point_mode != "manual":
+                            tt_sec_list.append(rule.section_id)
+                        elif sec_obj.point_status == "fault":
+                            tt_sec_list.append(rule.section_id)
                         else:
                             pass
                     else:
                         pass
                 else:
                     pass
+            else:
+                pass
 
-            Log.logger.info(f'return value: {tt_sec_list}')
-            self.prev_section_list = section_list
-            return tt_sec_list
-        except Exception as ex:
-            Log.logger.critical(f'find trail through: exception: {ex}')
+        return tt_sec_list
+
+    def axle_count_changed(self, section_list, section_id): #torpedo axle count of section differs from previous frame
+        section = section_list.get(section_id)
+        prev_section = self.prev_section_list.get(section_id)
+        return section is not None and prev_section is not None and \
+            section.torpedo_axle_count != prev_section.torpedo_axle_count
+
+    def update_sections(self, sections): #copy frame sections into tt_sec_obj_list
+        section_index = self.topology.section_index
+        for frame_section in sections:
+            sec_idx = section_index.get(frame_section.section_id, NO_SECTION)
+            if sec_idx != NO_SECTION:
+                sec_obj = self.tt_sec_obj_list[sec_idx]
+                sec_obj.section_status = frame_section.section_status
+                sec_obj.direction = frame_section.direction
+                sec_obj.torpedo_axle_count = frame_section.torpedo_axle_count
+                sec_obj.error_code = frame_section.error_code
+                sec_obj.engine_axle_count = frame_section.engine_axle_count
+                sec_obj.speed = frame_section.speed
+                sec_obj.first_axle = frame_section.first_axle
+                if sec_obj.section_id in TORPEDO_STATUS_SOURCE_SECTION_SET: #torpedo status of these sections comes from payload
+                    sec_obj.torpedo_status = frame_section.torpedo_status
+
+    def affected_sections(self, torpedo_delta, delta): #sorted section indices whose torpedo status can change, all sections without deltas
+        '''torpedo_delta is diffed against last find_torpedo_status frame, delta against previous frame'''
+        if torpedo_delta is None or delta is None:
+            return range(len(self.tt_sec_obj_list))
+
+        affected_idx_set = set(self.torpedo_status_source_idx) #payload torpedo status is re-applied every frame
+        for section_id in [section.section_id for section in torpedo_delta.changed] + list(torpedo_delta.removed):
+            sec_idx = self.topology.section_index.get(section_id, NO_SECTION)
+            if sec_idx != NO_SECTION: #section state changed since its torpedo status was last evaluated
+                affected_idx_set.add(sec_idx)
+        for section_id in [section.section_id for section in delta.changed] + list(delta.removed):
+            sec_idx = self.topology.section_index.get(section_id, NO_SECTION)
+            if sec_idx != NO_SECTION: #sections reading axle count of changed section
+                affected_idx_set.add(sec_idx)
+                affected_idx_set.update(self.topology.neighbours[sec_idx])
+        return sorted(affected_idx_set)
+
+    def vector_failed(self, ex): #array state no longer follows tt_sec_obj_list, frames are evaluated rule by rule until it is rebuilt
+        if not self.tt_vector_stale:
+            Log.logger.warning(f'vectorised trail through skipped, evaluating rule by rule: {ex}')
+        self.tt_vector_stale = True
+        self.prev_frame_arrays = None
+
+    def load_vector_points(self, point_sec_idx_list, point_status_list, point_mode_list): #load changed points into vectorised detector state
+        if self.tt_vector is not None and not self.tt_vector_stale:
+            try:
+                self.tt_vector.load_points(point_sec_idx_list, point_status_list, point_mode_list)
+            except Exception as ex: #e.g. StateCodeOverflow
+                self.vector_failed(ex)
+
+    def load_vector_sections(self, sections): #load changed sections into vectorised detector state
+        if self.tt_vector is not None and not self.tt_vector_stale:
+            try:
+                self.tt_vector.load_sections(sections)
+            except Exception as ex: #e.g. StateCodeOverflow
+                self.vector_failed(ex)
+
+    def load_vector_frame(self, frame): #load frame into vectorised detector, None if detector is not available or frame can not be encoded
+        if self.tt_vector is None:
+            return None
+        try:
+            if self.tt_vector_stale: #tt_sec_obj_list already holds this frame
+                self.tt_vector.load_state(self.tt_sec_obj_list)
+                self.tt_vector_stale = False
+                Log.logger.info(f'vectorised trail through state rebuilt')
+            return self.tt_vector.load_frame(frame)
+        except Exception as ex: #e.g. StateCodeOverflow or non numeric axle count
+            self.vector_failed(ex)
+            return None
+
+    def detect_vector(self, frame_arrays): #vectorised detection of a full frame, None if frame has to be evaluated rule by rule
+        if frame_arrays is None:
+            return None
+        try:
+            prev_frame_arrays = self.prev_frame_arrays
+            if prev_frame_arrays is None and self.prev_frame is not None: #previous frame was evaluated incrementally
+                prev_frame_arrays = self.tt_vector.frame_arrays(self.prev_frame)
+            return self.tt_vector.detect(frame_arrays, prev_frame_arrays)
+        except Exception as ex: #e.g. previous frame holds a value without code
+            self.vector_failed(ex)
+            return None
 
     def find_torpedo_status(self, section_json_data): #by using objects of tt_sec_obj_list it is finding torpedo status.
         '''find torpedo status'''
         try:
-            section_list = {}
-            json_data = json.loads(section_json_data)
+            frame = section_frame(section_json_data) #accepts SectionFrame or JSON string
+            section_list = frame.section_index #section_id -> SectionState
 
             Log.logger.info(f'find torpedo status called')
             Log.logger.info(f'{len(self.tt_sec_obj_list)}')
 
-            for json_idx in range(len(json_data['sections'])):
-                section_list[json_data['sections'][json_idx]
-                             ['section_id']] = json_data['sections'][json_idx]
-
-            for sec_idx in range(len(self.tt_sec_obj_list)): #updating tt_sec_obj_list objects from passed section_json_data
-                for json_sec_idx in range(len(json_data['sections'])):
-                    if self.tt_sec_obj_list[sec_idx].section_id == json_data['sections'][json_sec_idx]['section_id']:
-                        self.tt_sec_obj_list[sec_idx].section_status = json_data['sections'][json_sec_idx]['section_status']
-                        self.tt_sec_obj_list[sec_idx].direction = json_data['sections'][json_sec_idx]['direction']
-                        self.tt_sec_obj_list[sec_idx].torpedo_axle_count = json_data['sections'][json_sec_idx]['torpedo_axle_count']
-                        self.tt_sec_obj_list[sec_idx].error_code = json_data['sections'][json_sec_idx]['error_code']
-                        self.tt_sec_obj_list[sec_idx].engine_axle_count = json_data['sections'][json_sec_idx]['engine_axle_count']
-                        self.tt_sec_obj_list[sec_idx].speed = json_data['sections'][json_sec_idx]['speed']
-                        self.tt_sec_obj_list[sec_idx].first_axle = json_data['sections'][json_sec_idx]['first_axle']
-
-                        if self.tt_sec_obj_list[sec_idx].section_id in ['S1', 'S2', 'S3', 'S4', 'S20', 'S21', 'S22']: #for section id of tt_sec_obj_list matches with ['S1', 'S2', 'S3', 'S4', 'S20', 'S21', 'S22'], update torpedo status from passed data.
-                            self.tt_sec_obj_list[sec_idx].torpedo_status = json_data['sections'][json_sec_idx]['torpedo_status']
-                            if self.tt_sec_obj_list[sec_idx].torpedo_status != "none":
-                                Log.logger.info(f'{self.tt_sec_obj_list[sec_idx].section_id}, {self.tt_sec_obj_list[sec_idx].torpedo_status}')
-                            else:
-                                pass
-                        else:
-                            pass
+            delta = frame_delta(self.prev_frame, frame) #None for first frame after start or reload
+            torpedo_delta = frame_delta(self.prev_torpedo_frame, frame) #detect_trail_through frames in between are not evaluated here
+            if delta is not None and len(delta.changed) > len(frame.sections) * DELTA_FULL_EVALUATION_RATIO:
+                delta = None #most of the frame changed, all sections are evaluated
+            self.update_sections(frame.sections if delta is None else delta.changed) #unchanged sections already hold their values
+            frame_arrays = None
+            if delta is None: #keep vectorised detector state in step with tt_sec_obj_list
+                frame_arrays = self.load_vector_frame(frame)
+            else:
+                self.load_vector_sections(delta.changed)
+
+            for sec_idx in self.torpedo_status_source_idx: #payload torpedo status, derived status of previous frame is overwritten
+                frame_section = section_list.get(self.tt_sec_obj_list[sec_idx].section_id)
+                if frame_section is not None:
+                    self.tt_sec_obj_list[sec_idx].torpedo_status = frame_section.torpedo_status
+                    if self.tt_sec_obj_list[sec_idx].torpedo_status != "none":
+                        Log.logger.info(f'{self.tt_sec_obj_list[sec_idx].section_id}, {self.tt_sec_obj_list[sec_idx].torpedo_status}')
                     else:
                         pass
-            
-            for sec_idx in range(len(self.tt_sec_obj_list)):
+                else:
+                    pass
+
+            '''only changed sections and their neighbours can change torpedo status'''
+            for sec_idx in self.affected_sections(torpedo_delta, delta):
                 left_normal_sec_id = self.tt_sec_obj_list[sec_idx].left_normal
                 left_reverse_sec_id = self.tt_sec_obj_list[sec_idx].left_reverse
                 right_normal_sec_id = self.tt_sec_obj_list[sec_idx].right_normal
                 right_reverse_sec_id = self.tt_sec_obj_list[sec_idx].right_reverse
                     
-                if self.tt_sec_obj_list[sec_idx].section_id not in ['S1', 'S2', 'S3', 'S4', 'S20', 'S21', 'S22']:
+                if self.tt_sec_obj_list[sec_idx].section_id not in TORPEDO_STATUS_SOURCE_SECTION_SET:
                     if self.tt_sec_obj_list[sec_idx].section_status != "cleared" and self.tt_sec_obj_list[sec_idx].direction == "in":
                         if right_normal_sec_id != "NONE":
-                            if len(self.prev_section_list)!= 0 and (section_list[right_normal_sec_id]["torpedo_axle_count"] != self.prev_section_list[right_normal_sec_id]["torpedo_axle_count"]):
-                                for rn_sec_idx in range(len(self.tt_sec_obj_list)):
-                                    if self.tt_sec_obj_list[rn_sec_idx].section_id == self.tt_sec_obj_list[sec_idx].right_normal:
-                                        if self.tt_sec_obj_list[rn_sec_idx].torpedo_status != "none":
-                                            self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[rn_sec_idx].torpedo_status
-                                        else:
-                                            pass
+                            if self.axle_count_changed(section_list, right_normal_sec_id):
+                                rn_sec_idx = self.topology.right_normal[sec_idx] #O(1) neighbour lookup
+                                if rn_sec_idx != NO_SECTION:
+                                    if self.tt_sec_obj_list[rn_sec_idx].torpedo_status != "none":
+                                        self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[rn_sec_idx].torpedo_status
                                     else:
                                         pass
+                                else:
+                                    pass
                             else:
                                 pass
                         else:
                             pass
 
                         if right_reverse_sec_id != "NONE":
-                            if len(self.prev_section_list)!= 0 and (section_list[right_reverse_sec_id]["torpedo_axle_count"] != self.prev_section_list[right_reverse_sec_id]["torpedo_axle_count"]):
-                                for rr_sec_idx in range(len(self.tt_sec_obj_list)):
-                                    if self.tt_sec_obj_list[rr_sec_idx].section_id == self.tt_sec_obj_list[sec_idx].right_reverse:
-                                        if self.tt_sec_obj_list[rr_sec_idx].torpedo_status != "none":
-                                            self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[rr_sec_idx].torpedo_status
-                                        else:
-                                            pass
+                            if self.axle_count_changed(section_list, right_reverse_sec_id):
+                                rr_sec_idx = self.topology.right_reverse[sec_idx] #O(1) neighbour lookup
+                                if rr_sec_idx != NO_SECTION:
+                                    if self.tt_sec_obj_list[rr_sec_idx].torpedo_status != "none":
+                                        self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[rr_sec_idx].torpedo_status
                                     else:
                                         pass
+                                else:
+                                    pass
                             else:
                                 pass
                         else:
@@ -319,32 +399,32 @@ class Trailthrough:
                     pass
 
 
-                if self.tt_sec_obj_list[sec_idx].section_id not in ['S1', 'S2', 'S3', 'S4']:
+                if self.tt_sec_obj_list[sec_idx].section_id not in TORPEDO_STATUS_OUT_SKIP_SECTION_SET:
                     if self.tt_sec_obj_list[sec_idx].section_status != "cleared" and self.tt_sec_obj_list[sec_idx].direction == "out":
                         if left_normal_sec_id != "NONE":
-                            if len(self.prev_section_list)!= 0 and (section_list[left_normal_sec_id]["torpedo_axle_count"] != self.prev_section_list[left_normal_sec_id]["torpedo_axle_count"]):
-                                for ln_sec_idx in range(len(self.tt_sec_obj_list)):
-                                    if self.tt_sec_obj_list[ln_sec_idx].section_id == self.tt_sec_obj_list[sec_idx].left_normal:
-                                        if self.tt_sec_obj_list[ln_sec_idx].torpedo_status != "none" and self.tt_sec_obj_list[sec_idx].torpedo_axle_count >= 6 :
-                                            self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[ln_sec_idx].torpedo_status
-                                        else:
-                                            pass
+                            if self.axle_count_changed(section_list, left_normal_sec_id):
+                                ln_sec_idx = self.topology.left_normal[sec_idx] #O(1) neighbour lookup
+                                if ln_sec_idx != NO_SECTION:
+                                    if self.tt_sec_obj_list[ln_sec_idx].torpedo_status != "none" and self.tt_sec_obj_list[sec_idx].torpedo_axle_count >= 6 :
+                                        self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[ln_sec_idx].torpedo_status
                                     else:
                                         pass
+                                else:
+                                    pass
                             else:
                                 pass
                         else:
                             pass
                         if left_reverse_sec_id != "NONE":
-                            if len(self.prev_section_list)!= 0 and (section_list[left_reverse_sec_id]["torpedo_axle_count"] != self.prev_section_list[left_reverse_sec_id]["torpedo_axle_count"]):
-                                for lr_sec_idx in range(len(self.tt_sec_obj_list)):
-                                    if self.tt_sec_obj_list[lr_sec_idx].section_id == self.tt_sec_obj_list[sec_idx].left_reverse:
-                                        if self.tt_sec_obj_list[lr_sec_idx].torpedo_status != "none" and self.tt_sec_obj_list[sec_idx].torpedo_axle_count >= 6 :
-                                            self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[lr_sec_idx].torpedo_status
-                                        else:
-                                            pass
+                            if self.axle_count_changed(section_list, left_reverse_sec_id):
+                                lr_sec_idx = self.topology.left_reverse[sec_idx] #O(1) neighbour lookup
+                                if lr_sec_idx != NO_SECTION:
+                                    if self.tt_sec_obj_list[lr_sec_idx].torpedo_status != "none" and self.tt_sec_obj_list[sec_idx].torpedo_axle_count >= 6 :
+                                        self.tt_sec_obj_list[sec_idx].torpedo_status = self.tt_sec_obj_list[lr_sec_idx].torpedo_status
                                     else:
                                         pass
+                                else:
+                                    pass
                             else:
                                 pass
                         else:
@@ -368,6 +448,9 @@ class Trailthrough:
             #                    f'DIR: {self.tt_sec_obj_list[sec_idx].direction}')
             
             self.prev_section_list = section_list
+            self.prev_frame = frame
+            self.prev_torpedo_frame = frame
+            self.prev_frame_arrays = frame_arrays
            
             '''return new section message with torpedo status'''
             json_section_msg = self.construct_section_json_msg()
@@ -0,0 +1,85 @@
+'''
+*****************************************************************************
+*File : scc_tt_rules.py
+*Module : SCC
+*Purpose : Trail through rule table compiled from pms_config and layout_section_connections
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+from typing import NamedTuple
+sys.path.insert(1, "./common")
+
+'''Import SCC packages '''
+from scc_topology import *
+
+POINT_SIDE_LEFT = "left" #diverging route on left side, point is trailed by trains moving out
+POINT_SIDE_RIGHT = "right" #diverging route on right side, point is trailed by trains moving in
+POINT_SIDE_DIRECTION = {POINT_SIDE_LEFT: "out", POINT_SIDE_RIGHT: "in"}
+
+
+class TrailThroughRule(NamedTuple): #one point section / neighbour pair checked for trail through
+    section_id: str #point section
+    sec_idx: int
+    neighbour_id: str #section the train comes from
+    neighbour_idx: int
+    point_side: str #POINT_SIDE_LEFT or POINT_SIDE_RIGHT
+    direction: str #train direction which trails the point
+    conflict_point_status: str #point position which is run through, "fault" always conflicts
+
+
+class TrailThroughRuleTable:
+    '''flat, read only list of trail through rules in section index order'''
+
+    def __init__(self, rule_list):
+        self.rules = tuple(sorted(rule_list, key=lambda rule: rule.sec_idx)) #stable, keeps normal before reverse
+        self.section_ids = tuple(dict.fromkeys(rule.section_id for rule in self.rules)) #point sections, in rule order
+        self.left_section_ids = frozenset(
+            rule.section_id for rule in self.rules if rule.point_side == POINT_SIDE_LEFT)
+        self.right_section_ids = frozenset(
+            rule.section_id for rule in self.rules if rule.point_side == POINT_SIDE_RIGHT)
+
+        neighbour_rule_dict = {} #neighbour section id -> rule indices, a rule can only fire when its neighbour changed
+        for rule_idx, rule in enumerate(self.rules):
+            neighbour_rule_dict.setdefault(rule.neighbour_id, []).append(rule_idx)
+        self.neighbour_rule_idx = {
+            neighbour_id: tuple(rule_idx_list) for neighbour_id, rule_idx_list in neighbour_rule_dict.items()}
+
+    def __len__(self):
+        return len(self.rules)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def rules_of_neighbours(self, neighbour_id_list): #rules watching any of passed neighbour sections, in rule order
+        rule_idx_set = set()
+        for neighbour_id in neighbour_id_list:
+            rule_idx_set.update(self.neighbour_rule_idx.get(neighbour_id, ()))
+        return [self.rules[rule_idx] for rule_idx in sorted(rule_idx_set)]
+
+
+def compile_trail_through_rules(topology): #derive trail through rules of every point section of topology
+    '''compile trail through rule table from section topology'''
+    rule_list = []
+    for sec_idx, section_id in enumerate(topology.section_ids):
+        if topology.point_ids[sec_idx] == "none": #pms_config has no point on this section
+            continue
+
+        for point_side, normal_idx, reverse_idx in [
+                (POINT_SIDE_LEFT, topology.left_normal[sec_idx], topology.left_reverse[sec_idx]),
+                (POINT_SIDE_RIGHT, topology.right_normal[sec_idx], topology.right_reverse[sec_idx])]:
+            if reverse_idx == NO_SECTION: #no diverging route on this side, point does not face it
+                continue
+
+            direction = POINT_SIDE_DIRECTION[point_side]
+            if normal_idx != NO_SECTION: #train from normal route runs through a point set to reverse
+                rule_list.append(TrailThroughRule(
+                    section_id, sec_idx, topology.section_ids[normal_idx], normal_idx,
+                    point_side, direction, "reverse"))
+            rule_list.append(TrailThroughRule( #train from reverse route runs through a point set to normal
+                section_id, sec_idx, topology.section_ids[reverse_idx], reverse_idx,
+                point_side, direction, "normal"))
+    return TrailThroughRuleTable(rule_list)
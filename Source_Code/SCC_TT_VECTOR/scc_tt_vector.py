@@ -0,0 +1,159 @@
+'''
+*****************************************************************************
+*File : scc_tt_vector.py
+*Module : SCC
+*Purpose : NumPy trail through rule table evaluated over all rules of a frame
+*Author : Sumankumar Panchal
+*Copyright : Copyright 2021, Lab to Market Innovations Private Limited
+*****************************************************************************
+'''
+
+'''Import python packages'''
+import sys
+from itertools import repeat
+from operator import attrgetter, is_not
+from typing import NamedTuple
+sys.path.insert(1, "./common")
+
+try:
+    import numpy as np
+except ImportError: #detector is disabled, Trailthrough uses its scalar loop
+    np = None
+
+'''Import SCC packages '''
+from scc_section_frame import *
+from scc_topology import *
+from scc_tt_rules import *
+from scc_state import *
+
+
+SECTION_STATUS_FIELD = attrgetter("section_status")
+DIRECTION_FIELD = attrgetter("direction")
+TORPEDO_AXLE_COUNT_FIELD = attrgetter("torpedo_axle_count")
+MISSING_SECTION_STATE = SECTION_STATE_DEFAULT._replace(section_id="missing") #placeholder of a section absent from the frame
+
+
+class FrameArrays(NamedTuple): #section values of one frame, indexed by topology section index
+    present: object #bool array, section is part of the frame
+    section_status: object #uint8 SECTION_STATUS codes
+    direction: object #uint8 DIRECTION codes
+    torpedo_axle_count: object #float64 axle counts
+
+
+def numpy_available(): #True if NumPy could be imported
+    return np is not None
+
+
+class TrailThroughVector:
+    '''trail through rule table of Trailthrough.find_trail_through_sections as boolean array expressions'''
+
+    def __init__(self, topology, rule_table):
+        self.topology = topology
+        self.rule_table = rule_table
+        total_sec = len(topology)
+
+        '''persistent state of tt_sec_obj_list, kept in step by load_frame and load_points, code 0 is "none" as in Sec()'''
+        self.section_status = np.zeros(total_sec, dtype=np.uint8)
+        self.direction = np.zeros(total_sec, dtype=np.uint8)
+        self.point_status = np.zeros(total_sec, dtype=np.uint8)
+        self.point_mode = np.zeros(total_sec, dtype=np.uint8)
+
+        '''one array element per rule'''
+        self.rule_sec_idx = np.array([rule.sec_idx for rule in rule_table], dtype=np.int64)
+        self.rule_neighbour_idx = np.array([rule.neighbour_idx for rule in rule_table], dtype=np.int64)
+        self.rule_direction = np.array([DIRECTION.encode(rule.direction) for rule in rule_table], dtype=np.uint8)
+        self.rule_conflict = np.array(
+            [POINT_STATUS.encode(rule.conflict_point_status) for rule in rule_table], dtype=np.uint8)
+        self.rule_section_ids = tuple(rule.section_id for rule in rule_table)
+
+        '''point sections and their neighbours, the only sections read from a frame'''
+        self.relevant_idx = np.unique(np.concatenate([self.rule_sec_idx, self.rule_neighbour_idx]))
+        self.relevant_ids = tuple(topology.section_ids[sec_idx] for sec_idx in self.relevant_idx)
+
+    def frame_arrays(self, frame): #frame values of relevant sections as arrays, persistent section state is not touched
+        '''convert section frame into arrays'''
+        total_sec = len(self.topology)
+        present = np.zeros(total_sec, dtype=bool)
+        section_status = np.zeros(total_sec, dtype=np.uint8)
+        direction = np.zeros(total_sec, dtype=np.uint8)
+        torpedo_axle_count = np.zeros(total_sec, dtype=np.float64)
+
+        '''section state of relevant sections, read and encoded without a Python level loop'''
+        state_list = list(map(frame.section_index.get, self.relevant_ids, repeat(MISSING_SECTION_STATE)))
+        relevant_present = np.fromiter(map(is_not, state_list, repeat(MISSING_SECTION_STATE)),
+                                       dtype=bool, count=len(state_list))
+        frame_status = list(map(SECTION_STATUS.code_dict.get, map(SECTION_STATUS_FIELD, state_list)))
+        frame_direction = list(map(DIRECTION.code_dict.get, map(DIRECTION_FIELD, state_list)))
+        if None in frame_status or None in frame_direction: #value not seen before, assign new code
+            frame_status = list(map(SECTION_STATUS.encode, map(SECTION_STATUS_FIELD, state_list)))
+            frame_direction = list(map(DIRECTION.encode, map(DIRECTION_FIELD, state_list)))
+
+        present[self.relevant_idx] = relevant_present
+        section_status[self.relevant_idx] = frame_status
+        direction[self.relevant_idx] = frame_direction
+        torpedo_axle_count[self.relevant_idx] = np.fromiter(
+            map(TORPEDO_AXLE_COUNT_FIELD, state_list), dtype=np.float64, count=len(state_list))
+        return FrameArrays(present, section_status, direction, torpedo_axle_count)
+
+    def load_frame(self, frame): #frame values of relevant sections as arrays, also copies them into persistent section state
+        '''load section frame into arrays'''
+        frame_arrays = self.frame_arrays(frame)
+        present = frame_arrays.present
+        self.section_status[present] = frame_arrays.section_status[present]
+        self.direction[present] = frame_arrays.direction[present]
+        return frame_arrays
+
+    def load_state(self, sec_obj_list): #rebuild persistent state from Sec objects indexed by topology section index
+        '''load section and point state of tt_sec_obj_list into arrays'''
+        section_status = [SECTION_STATUS.encode(sec_obj.section_status) for sec_obj in sec_obj_list] #all values are encoded before any array is written
+        direction = [DIRECTION.encode(sec_obj.direction) for sec_obj in sec_obj_list]
+        point_status = [POINT_STATUS.encode(sec_obj.point_status) for sec_obj in sec_obj_list]
+        point_mode = [POINT_MODE.encode(sec_obj.point_mode) for sec_obj in sec_obj_list]
+        self.section_status[:] = section_status
+        self.direction[:] = direction
+        self.point_status[:] = point_status
+        self.point_mode[:] = point_mode
+
+    def load_sections(self, sections): #persistent state of changed sections only, sections unknown to topology are skipped
+        if len(sections) != 0:
+            sec_idx = np.fromiter(map(self.topology.section_index.get, map(SECTION_ID_FIELD, sections), repeat(NO_SECTION)),
+                                  dtype=np.int64, count=len(sections))
+            section_status = list(map(SECTION_STATUS.code_dict.get, map(SECTION_STATUS_FIELD, sections)))
+            direction = list(map(DIRECTION.code_dict.get, map(DIRECTION_FIELD, sections)))
+            if None in section_status or None in direction: #value not seen before, assign new code
+                section_status = list(map(SECTION_STATUS.encode, map(SECTION_STATUS_FIELD, sections)))
+                direction = list(map(DIRECTION.encode, map(DIRECTION_FIELD, sections)))
+
+            known = sec_idx != NO_SECTION
+            self.section_status[sec_idx[known]] = np.array(section_status, dtype=np.uint8)[known]
+            self.direction[sec_idx[known]] = np.array(direction, dtype=np.uint8)[known]
+
+    def load_points(self, point_sec_idx_list, point_status_list, point_mode_list): #point state of point sections
+        if len(point_sec_idx_list) != 0:
+            point_sec_idx = np.array(point_sec_idx_list, dtype=np.int64)
+            point_status = [POINT_STATUS.encode(point_status) for point_status in point_status_list]
+            point_mode = [POINT_MODE.encode(point_mode) for point_mode in point_mode_list]
+            self.point_status[point_sec_idx] = point_status
+            self.point_mode[point_sec_idx] = point_mode
+
+    def detect(self, frame_arrays, prev_arrays):
+        '''return trail through section id list in rule order, prev_arrays is None for the first frame'''
+        if prev_arrays is None: #no previous frame, axle count change can not be checked
+            return []
+
+        sec_idx = self.rule_sec_idx
+        neighbour_idx = self.rule_neighbour_idx
+        active = (self.section_status[sec_idx] == SECTION_STATUS_OCCUPIED) & \
+            (self.direction[sec_idx] == self.rule_direction)
+        neighbour_occupied = frame_arrays.present[neighbour_idx] & \
+            (frame_arrays.section_status[neighbour_idx] == SECTION_STATUS_OCCUPIED) & \
+            (frame_arrays.direction[neighbour_idx] == self.rule_direction)
+        moved = prev_arrays.present[neighbour_idx] & \
+            (frame_arrays.torpedo_axle_count[neighbour_idx] != prev_arrays.torpedo_axle_count[neighbour_idx])
+
+        point_status = self.point_status[sec_idx]
+        conflict = ((point_status == self.rule_conflict) & (self.point_mode[sec_idx] != POINT_MODE_MANUAL)) | \
+            (point_status == POINT_STATUS_FAULT)
+
+        fire = active & neighbour_occupied & moved & conflict
+        return [self.rule_section_ids[rule_idx] for rule_idx in np.flatnonzero(fire)]